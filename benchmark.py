@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+"""
+Benchmark del calcolatore: misura il throughput (combinazioni esaminate al secondo)
+della ricerca con la traccia dei miglioramenti attiva e disattiva, sugli stessi
+parametri e con lo stesso pool di processi, e confronta i tempi (o il throughput) di
+più strategie sugli stessi dati.
+"memory" misura la memoria occupata da una ricetta come lista di quantità e come
+PackedRecipe, in memoria e serializzata con pickle (come viaggia tra i processi).
+"feasibility" misura l'anteprima di fattibilità mostrata dalla finestra mentre si
+spostano gli slider: costruzione delle tabelle dei valori raggiungibili e singola anteprima.
+"startup" avvia la finestra di main.py in modalità offscreen e termina con errore se il
+primo disegno arriva oltre STARTUP_BUDGET secondi.
+La suite ("suite") esegue tutte le strategie su un catalogo fisso di scenari, scrive i
+risultati in JSON e termina con errore se una strategia trova un ottimo diverso da quello
+della strategia di riferimento.
+Uso: python benchmark.py [trace [numero di ingredienti sbloccati] [strategia] [ripetizioni]]
+     python benchmark.py compare [numero di ingredienti sbloccati] [strategie separate da virgole] [ripetizioni]
+     python benchmark.py throughput [numero di ingredienti sbloccati] [strategie separate da virgole] [ripetizioni]
+     python benchmark.py memory [numero di ricette]
+     python benchmark.py feasibility [ripetizioni]
+     python benchmark.py startup [ripetizioni]
+     python benchmark.py suite [file JSON] [strategie separate da virgole] [massimo di ingredienti sbloccati]
+                               [--reference strategia]
+"""
+
+import json
+import logging
+import os
+import pickle
+import platform
+import random
+import subprocess
+import sys
+import tracemalloc
+from time import perf_counter
+
+try:
+    import resource
+except ImportError:  # Windows: il picco di memoria non viene misurato
+    resource = None
+
+from calculator import (BOUND_EPSILON, INGREDIENTI_ORDINE_SBLOCCO, MAX_QUANTITY, MAX_TOTAL_UNITS, STRATEGIES,
+                        TRACE, PackedRecipe, SolverPool, configure_logging, feasibility_preview,
+                        find_optimal_combination, ingredienti, logger, numpy_available, reachable_tables)
+
+# Range larghi: molte combinazioni valide e molti miglioramenti del best
+BENCHMARK_RANGES = {"gusto": (0, 30), "colore": (0, 30), "gradazione": (0, 30), "schiuma": (0, 30)}
+
+# Range del confronto tra strategie: abbastanza stretti da scartare buona parte delle combinazioni
+COMPARE_RANGES = {"gusto": (2, 6), "colore": (1, 5), "gradazione": (2, 6), "schiuma": (1, 5)}
+
+def run_search(unlocked, strategy, pool, repetitions):
+    """
+    Esegue la ricerca più volte e restituisce il miglior throughput e le statistiche
+    dell'ultima esecuzione.
+    """
+    best_rate = 0.0
+    stats = None
+    for _ in range(repetitions):
+        _, _, stats = find_optimal_combination([], BENCHMARK_RANGES, unlocked, strategy=strategy, pool=pool)
+        if stats["execution_time"] > 0:
+            best_rate = max(best_rate, stats["examined_combinations"] / stats["execution_time"])
+    return best_rate, stats
+
+def benchmark_trace(num_unlocked=6, strategy="bounded", repetitions=3):
+    """
+    Confronta il throughput con la traccia (livello TRACE) disattivata e attiva.
+    Con la traccia attiva il log viene scritto su un handler nullo, per misurare
+    il costo della raccolta dei miglioramenti e non quello del terminale.
+    """
+    unlocked = [ingredienti.index(ingr) for ingr in INGREDIENTI_ORDINE_SBLOCCO[:num_unlocked]]
+    with SolverPool() as pool:
+        pool.get()
+        logger.setLevel(logging.WARNING)
+        rate_off, stats_off = run_search(unlocked, strategy, pool, repetitions)
+
+        handlers = logger.handlers
+        logger.handlers = [logging.NullHandler()]
+        logger.setLevel(TRACE)
+        try:
+            rate_on, stats_on = run_search(unlocked, strategy, pool, repetitions)
+        finally:
+            logger.handlers = handlers
+            logger.setLevel(logging.WARNING)
+
+    print(f"Strategia: {strategy}, ingredienti sbloccati: {num_unlocked}, ripetizioni: {repetitions}")
+    print(f"Combinazioni esaminate: {stats_off['examined_combinations']:,}")
+    print(f"Traccia disattivata: {rate_off:,.0f} combinazioni/s")
+    print(f"Traccia attiva:      {rate_on:,.0f} combinazioni/s "
+          f"({stats_on['improvements']:,} miglioramenti registrati)")
+    if rate_on > 0:
+        print(f"Rapporto: {rate_off / rate_on:.2f}x")
+    return rate_off, rate_on
+
+def benchmark_strategies(num_unlocked=5, strategies=("flat", "meet_in_the_middle"), repetitions=1):
+    """
+    Esegue le strategie sugli stessi ingredienti e range (COMPARE_RANGES) e ne confronta
+    il tempo migliore; verifica anche che trovino la stessa ricetta con lo stesso score.
+    La riduzione degli ingredienti è disattivata, così si misurano i soli motori di ricerca.
+    """
+    unlocked = [ingredienti.index(ingr) for ingr in INGREDIENTI_ORDINE_SBLOCCO[:num_unlocked]]
+    timings = {}
+    results = {}
+    with SolverPool() as pool:
+        pool.get()
+        for strategy in strategies:
+            best_time = None
+            for _ in range(repetitions):
+                quantities, _, stats = find_optimal_combination([], COMPARE_RANGES, unlocked,
+                                                                strategy=strategy, pool=pool, preprocess=False)
+                if best_time is None or stats["execution_time"] < best_time:
+                    best_time = stats["execution_time"]
+            timings[strategy] = best_time
+            results[strategy] = (quantities, stats["best_score"])
+
+    print(f"Ingredienti sbloccati: {num_unlocked}, ripetizioni: {repetitions}")
+    reference = strategies[0]
+    for strategy in strategies:
+        speedup = timings[reference] / timings[strategy] if timings[strategy] > 0 else float('inf')
+        print(f"{strategy:>20}: {timings[strategy]:8.3f} s  ({speedup:.1f}x rispetto a {reference}), "
+              f"score {results[strategy][1]}")
+    agree = all(results[strategy] == results[reference] for strategy in strategies)
+    print("Risultati identici" if agree else "ATTENZIONE: le strategie trovano risultati diversi")
+    return timings, agree
+
+def benchmark_throughput(num_unlocked=6, strategies=("flat", "odometer"), repetitions=3):
+    """
+    Confronta il throughput (combinazioni esaminate al secondo) delle strategie che
+    scorrono lo spazio "appiattito", sugli stessi ingredienti e range (COMPARE_RANGES) e
+    senza riduzione degli ingredienti: tutte esaminano le stesse combinazioni, quindi
+    il rapporto tra i throughput è il rapporto tra i costi per combinazione.
+    """
+    unlocked = [ingredienti.index(ingr) for ingr in INGREDIENTI_ORDINE_SBLOCCO[:num_unlocked]]
+    rates = {}
+    results = {}
+    with SolverPool() as pool:
+        pool.get()
+        for strategy in strategies:
+            best_rate = 0.0
+            for _ in range(repetitions):
+                quantities, _, stats = find_optimal_combination([], COMPARE_RANGES, unlocked,
+                                                                strategy=strategy, pool=pool, preprocess=False)
+                if stats["execution_time"] > 0:
+                    best_rate = max(best_rate, stats["examined_combinations"] / stats["execution_time"])
+            rates[strategy] = best_rate
+            results[strategy] = (quantities, stats["best_score"], stats["examined_combinations"],
+                                 stats["valid_combinations"])
+
+    print(f"Ingredienti sbloccati: {num_unlocked}, combinazioni: {results[strategies[0]][2]:,}, "
+          f"ripetizioni: {repetitions}")
+    reference = strategies[0]
+    for strategy in strategies:
+        ratio = rates[strategy] / rates[reference] if rates[reference] > 0 else float('inf')
+        print(f"{strategy:>10}: {rates[strategy]:12,.0f} combinazioni/s  ({ratio:.2f}x rispetto a {reference})")
+    agree = all(results[strategy] == results[reference] for strategy in strategies)
+    print("Risultati identici" if agree else "ATTENZIONE: le strategie trovano risultati diversi")
+    return rates, agree
+
+def random_recipes(count, seed=0):
+    """
+    Genera count ricette casuali (liste di quantità) con tutti gli ingredienti
+    utilizzabili e al massimo MAX_TOTAL_UNITS unità, in modo riproducibile.
+    """
+    rng = random.Random(seed)
+    recipes = []
+    for _ in range(count):
+        quantities = [0] * len(ingredienti)
+        for _ in range(rng.randint(1, MAX_TOTAL_UNITS)):
+            ingr_idx = rng.randrange(len(ingredienti))
+            if quantities[ingr_idx] < MAX_QUANTITY:
+                quantities[ingr_idx] += 1
+        recipes.append(quantities)
+    return recipes
+
+def allocated_bytes(build):
+    """
+    Memoria (in byte) ancora allocata dall'oggetto restituito da build(), misurata con tracemalloc.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return after - before
+
+def benchmark_recipe_memory(count=100000):
+    """
+    Confronta la memoria per ricetta delle liste di quantità e delle PackedRecipe:
+    byte allocati per count ricette tenute in memoria (come in TopK o nella frontiera
+    di Pareto) e byte della serializzazione pickle di una ricetta (come viaggia dai
+    worker al processo principale).
+    """
+    recipes = random_recipes(count)
+    list_bytes = allocated_bytes(lambda: [list(quantities) for quantities in recipes]) / count
+    packed_bytes = allocated_bytes(lambda: [PackedRecipe.from_quantities(quantities)
+                                            for quantities in recipes]) / count
+    list_pickle = sum(len(pickle.dumps(quantities)) for quantities in recipes[:1000]) / min(count, 1000)
+    packed_pickle = sum(len(pickle.dumps(PackedRecipe.from_quantities(quantities)))
+                        for quantities in recipes[:1000]) / min(count, 1000)
+
+    print(f"Ricette: {count:,}, ingredienti: {len(ingredienti)}")
+    print(f"{'lista':>12}: {list_bytes:8.1f} byte in memoria, {list_pickle:6.1f} byte con pickle")
+    print(f"{'PackedRecipe':>12}: {packed_bytes:8.1f} byte in memoria, {packed_pickle:6.1f} byte con pickle")
+    print(f"Riduzione: {list_bytes / packed_bytes:.1f}x in memoria, {list_pickle / packed_pickle:.1f}x con pickle")
+    return {"list": list_bytes, "packed": packed_bytes, "list_pickle": list_pickle, "packed_pickle": packed_pickle}
+
+# Tempo massimo (in secondi dall'avvio di main.py, import compresi) entro cui la finestra
+# deve essere disegnata la prima volta in modalità offscreen
+STARTUP_BUDGET = 1.0
+
+# Tempo massimo (in secondi) concesso a ogni processo di benchmark_startup
+STARTUP_TIMEOUT = 60
+
+# Programma eseguito in un processo nuovo da benchmark_startup: main.py viene importato
+# per primo, così nei tempi rientrano anche gli import di Qt e del calcolatore
+STARTUP_PROBE = """
+import json
+import sys
+import main
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+main.setup_application(app)
+window = main.MainWindow()
+times = {}
+window.startupFinished.connect(lambda startup_times: (times.update(startup_times), app.quit()))
+QTimer.singleShot(30000, app.quit)
+window.show()
+app.exec()
+window.close()
+print(json.dumps(times))
+"""
+
+def benchmark_startup(repetitions=3, budget=STARTUP_BUDGET, timeout=STARTUP_TIMEOUT):
+    """
+    Misura l'avvio a freddo della finestra (ogni ripetizione in un processo nuovo, con
+    QT_QPA_PLATFORM=offscreen): tempi di costruzione, primo disegno e avvio completo
+    riportati da MainWindow.startupFinished, più il tempo del processo. Restituisce i
+    tempi migliori e se il primo disegno rientra in budget. Un processo che non termina
+    entro timeout secondi solleva subprocess.TimeoutExpired.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    runs = []
+    for _ in range(repetitions):
+        start = perf_counter()
+        completed = subprocess.run([sys.executable, "-c", STARTUP_PROBE], capture_output=True, text=True,
+                                   check=True, cwd=directory, env=env, timeout=timeout)
+        times = json.loads(completed.stdout.strip().splitlines()[-1])
+        times["process"] = perf_counter() - start
+        runs.append(times)
+    best = {name: min(run[name] for run in runs) for name in ("window", "first_paint", "ready", "process")}
+
+    print(f"Avvio a freddo offscreen, migliore di {repetitions} ripetizioni:")
+    print(f"  finestra costruita: {best['window']:.3f} s")
+    print(f"  primo disegno:      {best['first_paint']:.3f} s (budget {budget:.3f} s)")
+    print(f"  avvio completo:     {best['ready']:.3f} s")
+    print(f"  processo:           {best['process']:.3f} s")
+    within_budget = best["first_paint"] <= budget
+    print("Avvio entro il budget" if within_budget else "ATTENZIONE: primo disegno oltre il budget")
+    return best, within_budget
+
+# Range tipici di alcuni stili di birra, usati dagli scenari della suite
+BEER_STYLES = {
+    "lager": {"gusto": (3, 5), "colore": (0, 3), "gradazione": (3, 6), "schiuma": (4, 7)},
+    "weizen": {"gusto": (4, 7), "colore": (1, 4), "gradazione": (3, 6), "schiuma": (6, 9)},
+    "stout": {"gusto": (6, 9), "colore": (7, 10), "gradazione": (4, 7), "schiuma": (3, 6)},
+    "strong_ale": {"gusto": (5, 8), "colore": (3, 6), "gradazione": (7, 10), "schiuma": (2, 5)}
+}
+
+# Numero di ingredienti sbloccati (prefissi di INGREDIENTI_ORDINE_SBLOCCO) degli scenari
+SUITE_SIZES = (2, 4, 6, 8, 12, 16, 24, 32)
+
+# Insiemi di ingredienti obbligatori: ogni insieme entra negli scenari in cui è sbloccato
+REQUIRED_SETS = ((), ("Lievito Standard",), ("Gruit", "Malto Marrone"), ("Miele", "Lievito Forte", "Pepe"))
+
+# Massimo di ingredienti sbloccati per cui ogni strategia viene eseguita: oltre, il tempo
+# (o la memoria) richiesto renderebbe la suite inutilizzabile. "anytime" (il riferimento)
+# copre tutte le dimensioni, ma con 24 e 32 ingredienti ogni scenario richiede minuti
+# anche con molti processi; "meet_in_the_middle" supera già i 5 GB con 24 ingredienti
+ENGINE_MAX_UNLOCKED = {
+    "exact": 16,
+    "meet_in_the_middle": 16,
+    "anytime": 32,
+    "branch_and_bound": 12,
+    "bounded": 6,
+    "flat": 6,
+    "odometer": 6,
+    "numpy": 8,
+    "index": 6
+}
+
+# Strategia di riferimento della suite: copre tutte le dimensioni di SUITE_SIZES e le altre
+# strategie devono trovare il suo stesso score
+SUITE_REFERENCE = "anytime"
+
+# Strategie della suite; "index" richiede l'indice precalcolato
+SUITE_ENGINES = ("exact", "meet_in_the_middle", "anytime", "branch_and_bound", "bounded", "flat", "odometer",
+                 "numpy")
+
+def benchmark_scenarios(max_unlocked=max(SUITE_SIZES)):
+    """
+    Catalogo degli scenari della suite: per ogni dimensione di SUITE_SIZES (fino a
+    max_unlocked), ogni stile di BEER_STYLES e ogni insieme di REQUIRED_SETS già sbloccato.
+    Ogni scenario è un dizionario con "name", "num_unlocked", "style", "ranges" e "required".
+    """
+    scenarios = []
+    for size in SUITE_SIZES:
+        if size > max_unlocked:
+            continue
+        unlocked = INGREDIENTI_ORDINE_SBLOCCO[:size]
+        for style, ranges in BEER_STYLES.items():
+            for required in REQUIRED_SETS:
+                if not all(ingr in unlocked for ingr in required):
+                    continue
+                scenarios.append({
+                    "name": f"{size}-{style}-{len(required)}",
+                    "num_unlocked": size,
+                    "style": style,
+                    "ranges": ranges,
+                    "required": list(required)
+                })
+    return scenarios
+
+def benchmark_feasibility(repetitions=20):
+    """
+    Tempi dell'anteprima di fattibilità per numero di ingredienti sbloccati (scenari della
+    suite, con i range degli stili di birra): costruzione delle tabelle dei valori
+    raggiungibili (al cambio degli ingredienti) e anteprima con le tabelle già pronte
+    (al cambio dei range), in millisecondi.
+    """
+    timings = {}
+    for size in SUITE_SIZES:
+        usable = [ingredienti.index(ingr) for ingr in INGREDIENTI_ORDINE_SBLOCCO[:size]]
+        build, preview = float('inf'), float('inf')
+        for _ in range(repetitions):
+            reachable_tables.cache_clear()
+            start = perf_counter()
+            reachable_tables(tuple(sorted(usable)), ())
+            build = min(build, perf_counter() - start)
+            for ranges in BEER_STYLES.values():
+                start = perf_counter()
+                feasibility_preview(usable, [], ranges)
+                preview = min(preview, perf_counter() - start)
+        timings[size] = (build * 1000, preview * 1000)
+        print(f"{size:>3} ingredienti: tabelle {build * 1000:7.2f} ms, anteprima {preview * 1000:6.3f} ms")
+    return timings
+
+def peak_rss_kb():
+    """
+    Picco di memoria residente (in KB) del processo corrente e dei suoi figli già terminati
+    (i worker del pool), il maggiore dei due; None se non misurabile.
+    """
+    if resource is None:
+        return None
+    peaks = [resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    # Su macOS ru_maxrss è in byte, altrove in KB
+    scale = 1024 if sys.platform == "darwin" else 1
+    return max(peaks) // scale
+
+def run_scenario(scenario, strategy):
+    """
+    Esegue uno scenario con una strategia e ne restituisce le misure: tempo reale della
+    chiamata (senza l'avvio del pool), tempo di ricerca, combinazioni esaminate al secondo,
+    picco di memoria e ottimo trovato. Viene eseguita in un processo dedicato (vedi
+    run_isolated), così il picco di memoria riguarda solo questa ricerca.
+    """
+    unlocked = [ingredienti.index(ingr) for ingr in INGREDIENTI_ORDINE_SBLOCCO[:scenario["num_unlocked"]]]
+    # Dal JSON i range arrivano come liste
+    ranges = {param: tuple(bounds) for param, bounds in scenario["ranges"].items()}
+    with SolverPool() as pool:
+        pool.get()
+        start = perf_counter()
+        quantities, _, stats = find_optimal_combination(scenario["required"], ranges, unlocked,
+                                                        strategy=strategy, pool=pool)
+        wall_time = perf_counter() - start
+    return {
+        "scenario": scenario["name"],
+        "strategy": strategy,
+        "used_strategy": stats["strategy"],
+        "wall_time": wall_time,
+        "execution_time": stats["execution_time"],
+        "examined": stats["examined_combinations"],
+        "rate": stats["examined_combinations"] / stats["execution_time"] if stats["execution_time"] > 0 else None,
+        "peak_rss_kb": peak_rss_kb(),
+        "best_score": stats["best_score"],
+        "quantities": list(quantities) if quantities else None
+    }
+
+def run_isolated(scenario, strategy):
+    """
+    Esegue run_scenario in un nuovo interprete e ne legge il risultato JSON dallo stdout.
+    """
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "run-one",
+                                json.dumps({"scenario": scenario, "strategy": strategy})],
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.splitlines()[-1])
+
+def benchmark_suite(output_path="benchmark_results.json", engines=SUITE_ENGINES, max_unlocked=max(SUITE_SIZES),
+                    reference_engine=SUITE_REFERENCE):
+    """
+    Esegue ogni strategia di engines su ogni scenario di benchmark_scenarios(max_unlocked),
+    saltando quelle oltre ENGINE_MAX_UNLOCKED (e "numpy" senza NumPy). In ogni scenario
+    viene eseguita per prima reference_engine, anche se non è in engines: le altre devono
+    trovare il suo stesso score (a meno di BOUND_EPSILON). Si confrontano solo gli score,
+    perché a parità di score strategie diverse possono restituire ricette diverse.
+    Scrive i risultati in output_path e restituisce il numero di disaccordi.
+    """
+    unknown = [engine for engine in (reference_engine, *engines) if engine not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Strategie sconosciute: {', '.join(unknown)}")
+    engines = (reference_engine, *(engine for engine in engines if engine != reference_engine))
+    results = []
+    disagreements = 0
+    for scenario in benchmark_scenarios(max_unlocked):
+        reference = None
+        for engine in engines:
+            if engine != reference_engine and (scenario["num_unlocked"] > ENGINE_MAX_UNLOCKED.get(engine, 0) or (
+                    engine == "numpy" and not numpy_available())):
+                continue
+            result = run_isolated(scenario, engine)
+            if reference is None:
+                reference = result
+            reference_score, score = reference["best_score"], result["best_score"]
+            result["reference"] = reference_engine
+            result["agrees"] = (score is None) == (reference_score is None) and (
+                score is None or abs(score - reference_score) <= BOUND_EPSILON)
+            disagreements += not result["agrees"]
+            results.append(result)
+            rate = f"{result['rate']:,.0f}/s" if result["rate"] is not None else "-"
+            print(f"{scenario['name']:>18} {engine:>20}: {result['wall_time']:8.3f} s  {rate:>14}  "
+                  f"{(result['peak_rss_kb'] or 0) / 1024:7.1f} MB  score {score}"
+                  + ("" if result["agrees"] else f"  DISACCORDO con {reference_engine} ({reference_score})"))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy_available(),
+        "engines": list(engines),
+        "reference": reference_engine,
+        "max_unlocked": max_unlocked,
+        "disagreements": disagreements,
+        "results": results
+    }
+    with open(output_path, "w", encoding="utf-8") as out:
+        json.dump(report, out, indent=2)
+    print(f"{len(results)} esecuzioni, {disagreements} disaccordi; risultati in {output_path}")
+    return disagreements
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark del calcolatore di ricette")
+    commands = parser.add_subparsers(dest="command")
+    trace_parser = commands.add_parser("trace", help="throughput con la traccia dei miglioramenti attiva e disattiva "
+                                                     "(comando di default)")
+    trace_parser.add_argument("num_unlocked", nargs="?", type=int, default=6, help="ingredienti sbloccati (default 6)")
+    trace_parser.add_argument("strategy", nargs="?", default="bounded", choices=STRATEGIES,
+                              help="strategia (default bounded)")
+    trace_parser.add_argument("repetitions", nargs="?", type=int, default=3, help="ripetizioni (default 3)")
+    compare_parser = commands.add_parser("compare", help="confronta i tempi di più strategie")
+    compare_parser.add_argument("num_unlocked", nargs="?", type=int, default=5, help="ingredienti sbloccati (default 5)")
+    compare_parser.add_argument("strategies", nargs="?", default="flat,meet_in_the_middle",
+                                help="strategie separate da virgole (default flat,meet_in_the_middle)")
+    compare_parser.add_argument("repetitions", nargs="?", type=int, default=1, help="ripetizioni (default 1)")
+    throughput_parser = commands.add_parser("throughput", help="confronta il throughput di più strategie")
+    throughput_parser.add_argument("num_unlocked", nargs="?", type=int, default=6,
+                                   help="ingredienti sbloccati (default 6)")
+    throughput_parser.add_argument("strategies", nargs="?", default="flat,odometer",
+                                   help="strategie separate da virgole (default flat,odometer)")
+    throughput_parser.add_argument("repetitions", nargs="?", type=int, default=3, help="ripetizioni (default 3)")
+    memory_parser = commands.add_parser("memory", help="memoria di una ricetta come lista e come PackedRecipe")
+    memory_parser.add_argument("count", nargs="?", type=int, default=100000, help="numero di ricette (default 100000)")
+    feasibility_parser = commands.add_parser("feasibility", help="tempi dell'anteprima di fattibilità")
+    feasibility_parser.add_argument("repetitions", nargs="?", type=int, default=20, help="ripetizioni (default 20)")
+    startup_parser = commands.add_parser("startup", help="avvio a freddo della finestra, con errore oltre il budget")
+    startup_parser.add_argument("repetitions", nargs="?", type=int, default=3, help="ripetizioni (default 3)")
+    suite_parser = commands.add_parser("suite", help="tutte le strategie sul catalogo di scenari, con errore "
+                                                     "se una strategia trova un ottimo diverso dal riferimento")
+    suite_parser.add_argument("output", nargs="?", default="benchmark_results.json",
+                              help="file JSON dei risultati (default benchmark_results.json)")
+    suite_parser.add_argument("engines", nargs="?", default=",".join(SUITE_ENGINES),
+                              help="strategie separate da virgole (default tutte quelle della suite)")
+    suite_parser.add_argument("max_unlocked", nargs="?", type=int, default=max(SUITE_SIZES),
+                              help=f"massimo di ingredienti sbloccati (default {max(SUITE_SIZES)})")
+    suite_parser.add_argument("--reference", default=SUITE_REFERENCE, choices=STRATEGIES,
+                              help=f"strategia di riferimento per lo score (default {SUITE_REFERENCE})")
+    run_one_parser = commands.add_parser("run-one", help="esegue uno scenario (uso interno della suite)")
+    run_one_parser.add_argument("task", help="scenario e strategia in JSON")
+    args = parser.parse_args()
+
+    configure_logging("WARNING")
+    if args.command == "run-one":
+        task = json.loads(args.task)
+        print(json.dumps(run_scenario(task["scenario"], task["strategy"])))
+    elif args.command == "throughput":
+        benchmark_throughput(args.num_unlocked, tuple(args.strategies.split(",")), args.repetitions)
+    elif args.command == "memory":
+        benchmark_recipe_memory(args.count)
+    elif args.command == "feasibility":
+        benchmark_feasibility(args.repetitions)
+    elif args.command == "startup":
+        _, within_budget = benchmark_startup(args.repetitions)
+        sys.exit(0 if within_budget else 1)
+    elif args.command == "suite":
+        sys.exit(1 if benchmark_suite(args.output, tuple(args.engines.split(",")), args.max_unlocked,
+                                      args.reference) else 0)
+    elif args.command == "compare":
+        benchmark_strategies(args.num_unlocked, tuple(args.strategies.split(",")), args.repetitions)
+    elif args.command == "trace":
+        benchmark_trace(args.num_unlocked, args.strategy, args.repetitions)
+    else:
+        benchmark_trace()
@@ -3,40 +3,276 @@
 Calculator per trovare la combinazione ottimale di ingredienti (fino ad un totale di 25 unità)
 in base ai parametri "gusto", "colore", "gradazione" e "schiuma", con penalità in caso di valori fuori
 dei range previsti.
-Lo spazio delle combinazioni viene "appiattito" e diviso in modo equo tra 8 worker.
+Lo spazio delle combinazioni viene esplorato con una ricerca ricorsiva a somma limitata
+(solo combinazioni con totale <= 25), suddivisa in molti piccoli chunk distribuiti
+dinamicamente tra i worker; resta disponibile anche la strategia originale, che "appiattisce"
+lo spazio degli indici.
+Coefficienti e costi degli ingredienti vengono letti da VarietiesCSV.csv (vedi IngredientTable).
 Questo file viene consultato dall'interfaccia grafica per gestire i parametri richiesti di calcolo.
 """
 
+import csv
+import importlib.util
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from heapq import heappush, heapreplace
+from functools import lru_cache
+from time import perf_counter
+
+@lru_cache(maxsize=None)
+def load_numpy():
+    """
+    Importa NumPy al primo uso e lo restituisce, oppure None se non è installato.
+    NumPy è opzionale (serve alla strategia "numpy" e accelera i filtri dell'indice) e
+    costa circa 0.1 secondi di import: caricarlo con il modulo rallenterebbe l'avvio
+    della GUI anche quando non viene usato.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def numpy_available():
+    """
+    True se NumPy è installato, senza importarlo.
+    """
+    return importlib.util.find_spec("numpy") is not None
+
+# Log della ricerca: di default non viene stampato nulla (vedi configure_logging).
+#   INFO:  statistiche iniziali e finali;
+#   DEBUG: range in uso e tempi dei singoli worker;
+#   TRACE: ogni miglioramento del best trovato dai worker.
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+logger = logging.getLogger("calculator")
+logger.addHandler(logging.NullHandler())
+
 # Limite massimo di unità per ciascun ingrediente
 MAX_QUANTITY = 5
 
-# Coefficienti per ogni ingrediente
-coefficients = {
-    'gusto': [0.4, 0.8, 1.6, 0.8, 2.0, 1.0, 2.5, -1.0, 0.5, 1.0, 2.0,
-              1.5, 1.5, 0.5, -0.5, 1.5, 0.3, 1.5, 0.8, 1.2, 1.6,
-              0.5, 1.0, 1.5, 1.0, 1.0, 1.0, 1.5, -0.5, -1.0, 0.0, 0.5],
-    'colore': [0.3, 1.2, 2.0, -0.3, 1.0, 3.0, 0.5, -0.5, 1.0, 0.3, 2.0,
-               1.0, 1.5, 0.0, -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
-               -0.3, 0.0, 0.0, 2.0, 0.0, 1.0, -1.0, 0.0, -1.0, 0.0, -1.0],
-    'gradazione': [1.0, 0.5, 0.0, 0.4, -0.5, -1.0, 0.5, 2.0, 1.5, 1.0, 0.5,
-                   0.5, 0.5, -1.0, 0.0, -1.0, 2.0, 0.5, 0.0, 0.0, 0.0, 0.0,
-                   -0.2, 0.0, 0.0, 0.0, 0.0, 0.0, -1.0, 0.0, 1.0, 0.2],
-    'schiuma': [0.5, 0.8, 0.0, 2.0, 1.5, 0.5, 0.5, -1.0, -0.5, 0.0, 0.5,
-                0.5, 0.0, -0.5, 0.0, 0.0, 0.5, 1.0, 0.5, 0.5, 1.0, 0.0,
-                -0.5, 0.0, 0.0, -1.0, -1.0, 0.0, 1.5, 0.0, 0.0, 2.0]
+# Limite massimo di unità totali in una ricetta
+MAX_TOTAL_UNITS = 25
+
+# Bit per ingrediente nelle ricette impacchettate (PackedRecipe): bastano per quantità fino a 7
+RECIPE_BITS = 3
+RECIPE_MASK = (1 << RECIPE_BITS) - 1
+
+# File con i dati delle varietà del gioco (nomi inglesi) e corrispondenza con i nomi italiani
+VARIETIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "VarietiesCSV.csv")
+VARIETY_NAMES = {
+    'Pale Malt': 'Malto Chiaro', 'Amber Malt': 'Malto Ambrato', 'Brown Malt': 'Malto Marrone',
+    'Wheat Malt': 'Malto di Frumento', 'Rye Malt': 'Malto di Segale', 'Roasted Malt': 'Malto Tostato',
+    'Smoked Malt': 'Malto Affumicato', 'Sugar': 'Zucchero', 'Brown Candied Sugar': 'Zucchero Scuro Candito',
+    'Honey': 'Miele', 'Berries': 'Bacche', 'Grapes': 'Uva', 'Cherries': 'Ciliegie',
+    'Standard Yeast': 'Lievito Standard', 'Lager Yeast': 'Lievito Lager', 'Estery Yeast': 'Lievito Estereo',
+    'Strong Yeast': 'Lievito Forte', 'Wild Yeast': 'Lievito Selvaggio', 'Classic Hops': 'Luppolo Classico',
+    'Cascadus Hops': 'Luppolo Cascadus', 'Magnum Hops': 'Luppolo Magnum', 'Gruit': 'Gruit',
+    'Eucaliptus': 'Eucalipto', 'Coriander Seeds': 'Semi di Coriandolo', 'Orange Peel': 'Scorza di Arancia',
+    'Coffee': 'Caffè', 'Pepper': 'Pepe', 'Pumpkin': 'Zucca', 'Wheat Starch': 'Fecola di Frumento',
+    'Corn Flakes': 'Fiocchi di Mais', 'Yeast Nutritionals': 'Nutrienti per Lievito',
+    'Unmalted Wheat': 'Fiocchi di Frumento'
+}
+
+# Colonne della tabella degli ingredienti: colonna del CSV e divisore
+# (nel CSV le virtù sono espresse in decimi)
+TABLE_COLUMNS = {
+    'gusto': ("Flavor", 10), 'colore': ("Color", 10), 'gradazione': ("Strength", 10),
+    'schiuma': ("Foam", 10), 'cost_low': ("Cost/Unit Low", 1),
+    'cost_normal': ("Cost/Unit Normal", 1), 'cost_high': ("Cost/Unit High", 1),
+    'gourmet': ("Gourmet Probability Bonus/Unit", 1),
+    'popularity': ("Popularity Probability Bonus/Unit", 1),
+    'generic': ("Generic Probability Bonus/Unit", 1)
 }
 
+# Prefisso delle colonne con la probabilità per unità di ciascun tratto
+# (coppie "Trait N" / "Probability" del CSV)
+TRAIT_PREFIX = "trait_"
+
+# Fasce di prezzo per unità presenti nel CSV
+COST_TIERS = ("low", "normal", "high")
+
+# Intestazione della copia binaria della tabella degli ingredienti
+TABLE_MAGIC = b"AATBL2\n"
+
+def default_cache_dir():
+    """
+    Cartella di cache dell'applicazione (risultati, indici e tabella degli ingredienti).
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ale-abbey-calculator")
+
+class Ingredient:
+    """
+    Record di un ingrediente: posizione nella tabella, nome italiano, varietà del CSV,
+    un attributo per ogni colonna di TABLE_COLUMNS e le probabilità per unità dei tratti.
+    """
+    __slots__ = ("index", "name", "variety", "traits") + tuple(TABLE_COLUMNS)
+
+    def __init__(self, index, name, variety, values, traits):
+        self.index = index
+        self.name = name
+        self.variety = variety
+        self.traits = traits
+        for column, value in zip(TABLE_COLUMNS, values):
+            setattr(self, column, value)
+
+    def __repr__(self):
+        return f"Ingredient({self.index}, {self.name!r})"
+
+class IngredientTable:
+    """
+    Tabella degli ingredienti in formato colonnare: ogni colonna di TABLE_COLUMNS (e una
+    colonna TRAIT_PREFIX + nome per ogni tratto) è un array('d') indicizzato come
+    'ingredienti', così i valutatori leggono i coefficienti per indice.
+    I record Ingredient vengono creati solo quando richiesti.
+    """
+    __slots__ = ("names", "varieties", "columns", "source")
+
+    def __init__(self, names, varieties, columns, source):
+        self.names = names
+        self.varieties = varieties
+        self.columns = columns
+        self.source = source
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        traits = {trait: self.columns[TRAIT_PREFIX + trait][index] for trait in self.traits()
+                  if self.columns[TRAIT_PREFIX + trait][index]}
+        return Ingredient(index, self.names[index], self.varieties[index],
+                          [self.columns[column][index] for column in TABLE_COLUMNS], traits)
+
+    def index(self, name):
+        return self.names.index(name)
+
+    def traits(self):
+        """
+        Nomi dei tratti presenti nella tabella, in ordine alfabetico.
+        """
+        return [column[len(TRAIT_PREFIX):] for column in self.columns if column.startswith(TRAIT_PREFIX)]
+
+    def matrix(self, columns):
+        """
+        Restituisce le colonne indicate come matrice NumPy (ingredienti x colonne).
+        """
+        np = load_numpy()
+        return np.array([self.columns[column] for column in columns], dtype=np.float64).T
+
+def parse_ingredient_table(data, source):
+    """
+    Costruisce la tabella dal contenuto del CSV delle varietà (le righe nell'ordine del file).
+    """
+    reader = csv.reader(io.StringIO(data.decode("utf-8")))
+    header = next(reader)
+    # Le colonne "Probability" si ripetono: ognuna segue la sua colonna "Trait N"
+    trait_positions = [pos for pos, name in enumerate(header) if name.startswith("Trait ")]
+    rows = list(reader)
+    names, varieties = [], []
+    columns = {column: array('d') for column in TABLE_COLUMNS}
+    trait_values = {}
+    for row_index, row in enumerate(rows):
+        variety = row[header.index("Variety")]
+        if variety not in VARIETY_NAMES:
+            raise ValueError(f"Varietà sconosciuta nel CSV: {variety}")
+        names.append(VARIETY_NAMES[variety])
+        varieties.append(variety)
+        for column, (name, divisor) in TABLE_COLUMNS.items():
+            columns[column].append(float(row[header.index(name)]) / divisor)
+        for pos in trait_positions:
+            if row[pos]:
+                # Lo stesso tratto può comparire più volte per un ingrediente: le probabilità si sommano
+                values = trait_values.setdefault(row[pos], array('d', [0.0]) * len(rows))
+                values[row_index] += float(row[pos + 1])
+    for trait in sorted(trait_values):
+        columns[TRAIT_PREFIX + trait] = trait_values[trait]
+    return IngredientTable(names, varieties, columns, source)
+
+def write_ingredient_table(path, table):
+    """
+    Scrive la copia binaria della tabella: TABLE_MAGIC, una riga JSON di intestazione
+    (impronta del CSV, nomi, varietà e colonne) e poi i byte di ogni colonna.
+    """
+    header = {
+        "source": table.source,
+        "byteorder": sys.byteorder,
+        "names": table.names,
+        "varieties": table.varieties,
+        "columns": list(table.columns)
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as handle:
+        handle.write(TABLE_MAGIC)
+        handle.write(json.dumps(header).encode() + b"\n")
+        for column in table.columns.values():
+            column.tofile(handle)
+
+def read_ingredient_table(path, source):
+    """
+    Legge la copia binaria della tabella; restituisce None se manca, non è valida o è stata
+    scritta da un CSV (o con colonne) diverso da quello attuale.
+    """
+    try:
+        with open(path, "rb") as handle:
+            if handle.readline() != TABLE_MAGIC:
+                return None
+            header = json.loads(handle.readline())
+            if header["source"] != source or header["columns"][:len(TABLE_COLUMNS)] != list(TABLE_COLUMNS):
+                return None
+            columns = {}
+            for column in header["columns"]:
+                values = array('d')
+                values.fromfile(handle, len(header["names"]))
+                if header["byteorder"] != sys.byteorder:
+                    values.byteswap()
+                columns[column] = values
+    except (OSError, ValueError, KeyError, EOFError):
+        return None
+    return IngredientTable(header["names"], header["varieties"], columns, source)
+
+def load_ingredient_table(path=VARIETIES_CSV, cache_path=None):
+    """
+    Carica la tabella degli ingredienti dal CSV delle varietà. La tabella già costruita
+    viene conservata in forma binaria in cache_path (di default nella cartella di cache)
+    e riletta finché il contenuto del CSV non cambia.
+    """
+    with open(path, "rb") as handle:
+        data = handle.read()
+    source = hashlib.sha1(data).hexdigest()
+    if cache_path is None:
+        cache_path = os.path.join(default_cache_dir(), "ingredients.bin")
+    table = read_ingredient_table(cache_path, source)
+    if table is None:
+        table = parse_ingredient_table(data, source)
+        try:
+            write_ingredient_table(cache_path, table)
+        except OSError as exc:
+            logger.debug(f"Impossibile salvare la tabella degli ingredienti: {exc}")
+    return table
+
+# Tabella degli ingredienti, nell'ordine delle righe di VarietiesCSV.csv
+INGREDIENT_TABLE = load_ingredient_table()
+
 # Lista completa degli ingredienti
-ingredienti = [
-    'Malto Chiaro', 'Malto Ambrato', 'Malto Marrone', 'Malto di Frumento',
-    'Malto di Segale', 'Malto Tostato', 'Malto Affumicato', 'Zucchero',
-    'Zucchero Scuro Candito', 'Miele', 'Bacche', 'Uva', 'Ciliegie',
-    'Lievito Standard', 'Lievito Lager', 'Lievito Estereo', 'Lievito Forte',
-    'Lievito Selvaggio', 'Luppolo Classico', 'Luppolo Cascadus', 'Luppolo Magnum',
-    'Gruit', 'Eucalipto', 'Semi di Coriandolo', 'Scorza di Arancia', 'Caffè',
-    'Pepe', 'Zucca', 'Fecola di Frumento', 'Fiocchi di Mais', 'Nutrienti per Lievito',
-    'Fiocchi di Frumento'
-]
+ingredienti = INGREDIENT_TABLE.names
+
+# Coefficienti per ogni ingrediente (colonne della tabella, indicizzate come 'ingredienti')
+coefficients = {param: INGREDIENT_TABLE.columns[param] for param in ['gusto', 'colore', 'gradazione', 'schiuma']}
+
+# Tutti i coefficienti sono multipli di 0.1: i valori si calcolano in decimi interi, così
+# somme e controlli sui range sono esatti e non dipendono dagli arrotondamenti dei float
+coefficient_tenths = {param: tuple(round(coef * 10) for coef in coefficients[param])
+                      for param in ['gusto', 'colore', 'gradazione', 'schiuma']}
 
 # Ordine in cui vengono sbloccati gli ingredienti nel gioco
 INGREDIENTI_ORDINE_SBLOCCO = [
@@ -54,6 +290,63 @@ INGREDIENTI_ORDINE_SBLOCCO = [
 ALWAYS_AVAILABLE = ['Malto Chiaro', 'Lievito Standard']
 UNLOCKABLE_INGREDIENTS = [ingr for ingr in INGREDIENTI_ORDINE_SBLOCCO if ingr not in ALWAYS_AVAILABLE]
 
+# Ogni quante combinazioni (o nodi) i worker controllano se la ricerca è stata annullata
+CANCEL_CHECK_INTERVAL = 4096
+
+# Intervallo minimo (in secondi) tra due messaggi di avanzamento dello stesso processo
+PROGRESS_INTERVAL = 0.25
+
+# Evento di annullamento e coda dei messaggi di avanzamento condivisi con i processi
+# del pool (impostati da init_worker)
+_cancel_event = None
+_progress_sink = None
+_last_progress = 0.0
+
+class SearchCancelled(Exception):
+    """
+    Sollevata all'interno di una ricerca ricorsiva per interromperla quando viene annullata.
+    """
+
+def init_worker(cancel_event, progress_sink=None):
+    """
+    Inizializzatore dei processi del pool: registra l'evento di annullamento condiviso
+    e la destinazione dei messaggi di avanzamento (una coda, o una funzione se la
+    ricerca gira nel processo chiamante).
+    """
+    global _cancel_event, _progress_sink
+    _cancel_event = cancel_event
+    _progress_sink = progress_sink
+
+def report_progress(params, stats, best_score, best_quantities, force=False):
+    """
+    Invia lo stato di avanzamento di un chunk (combinazioni esaminate e miglior risultato
+    trovato finora), al massimo una volta ogni PROGRESS_INTERVAL secondi per processo.
+    """
+    global _last_progress
+    if _progress_sink is None:
+        return
+    now = perf_counter()
+    if not force and now - _last_progress < PROGRESS_INTERVAL:
+        return
+    _last_progress = now
+    message = {
+        "search_id": params.get("search_id"),
+        "chunk_id": params["worker_id"],
+        "examined": stats["examined"],
+        "best_score": best_score,
+        "best_quantities": best_quantities
+    }
+    if callable(_progress_sink):
+        _progress_sink(message)
+    else:
+        _progress_sink.put(message)
+
+def search_cancelled():
+    """
+    Ritorna True se la ricerca corrente è stata annullata.
+    """
+    return _cancel_event is not None and _cancel_event.is_set()
+
 def index_to_combination(index, length, base):
     """
     Converte un indice (in base 10) in una combinazione 
@@ -66,41 +359,211 @@ def index_to_combination(index, length, base):
         index //= base
     return combo
 
+def calculate_tenths(quantities):
+    """
+    Calcola i valori (gusto, colore, gradazione, schiuma) in decimi interi,
+    come somma di quantità * coefficienti in decimi: lista di 4 interi.
+    """
+    gusto, colore = coefficient_tenths['gusto'], coefficient_tenths['colore']
+    gradazione, schiuma = coefficient_tenths['gradazione'], coefficient_tenths['schiuma']
+    values = [0, 0, 0, 0]
+    for i, qty in enumerate(quantities):
+        if qty:
+            values[0] += qty * gusto[i]
+            values[1] += qty * colore[i]
+            values[2] += qty * gradazione[i]
+            values[3] += qty * schiuma[i]
+    return values
+
+def tenths_to_values(tenths):
+    """
+    Converte i valori in decimi interi nel dizionario dei valori usato dal resto del programma.
+    """
+    return {param: tenths[k] / 10 for k, param in enumerate(['gusto', 'colore', 'gradazione', 'schiuma'])}
+
 def calculate_values(quantities):
     """
     Calcola i valori virtuali (gusto, colore, gradazione, schiuma) 
     come somma di quantità * coefficienti.
+    La somma avviene in decimi interi (vedi calculate_tenths): la stessa ricetta dà
+    sempre esattamente gli stessi valori, in qualunque ordine vengano sommati.
     """
-    values = {'gusto': 0, 'colore': 0, 'gradazione': 0, 'schiuma': 0}
-    for i, qty in enumerate(quantities):
-        values['gusto']      += qty * coefficients['gusto'][i]
-        values['colore']     += qty * coefficients['colore'][i]
-        values['gradazione'] += qty * coefficients['gradazione'][i]
-        values['schiuma']    += qty * coefficients['schiuma'][i]
-    return values
+    return tenths_to_values(calculate_tenths(quantities))
 
-def calculate_score(values, ranges):
+class PackedRecipe:
     """
-    Calcola lo score basandosi sulla vicinanza dei valori ai range desiderati
-    e applica una tolleranza di 0.05. 
-    Modifica il controllo dell'upper bound per permettere, ad esempio, che 
-    un range 1-3 includa valori fino a 3.99 (ossia, < 4.0).
-    Valori fuori dal range sono penalizzati di -10000.
+    Ricetta impacchettata in un solo intero, RECIPE_BITS bit per ingrediente
+    (l'ingrediente i occupa i bit da RECIPE_BITS * i): con 32 ingredienti sono 96 bit
+    invece di una lista di 32 riferimenti. Si comporta come la lista delle quantità
+    (lunghezza, indici, slice, iterazione, confronto con le liste), quindi può stare
+    ovunque ci si aspetti 'quantities'; i valori vengono calcolati solo su richiesta.
+    """
+    __slots__ = ("bits",)
+
+    def __init__(self, bits=0):
+        self.bits = bits
+
+    @classmethod
+    def from_quantities(cls, quantities):
+        """
+        Impacchetta una sequenza di quantità (una PackedRecipe viene restituita così com'è).
+        """
+        if isinstance(quantities, cls):
+            return quantities
+        bits = 0
+        for i, qty in enumerate(quantities):
+            if qty:
+                bits |= int(qty) << (RECIPE_BITS * i)
+        return cls(bits)
+
+    def __len__(self):
+        return len(ingredienti)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(ingredienti)))]
+        if index < 0:
+            index += len(ingredienti)
+        if not 0 <= index < len(ingredienti):
+            raise IndexError("indice di ingrediente fuori dalla ricetta")
+        return (self.bits >> (RECIPE_BITS * index)) & RECIPE_MASK
+
+    def __iter__(self):
+        bits = self.bits
+        for _ in range(len(ingredienti)):
+            yield bits & RECIPE_MASK
+            bits >>= RECIPE_BITS
+
+    def __eq__(self, other):
+        if isinstance(other, PackedRecipe):
+            return self.bits == other.bits
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __reduce__(self):
+        # Tra i processi del pool viaggia solo l'intero
+        return (PackedRecipe, (self.bits,))
+
+    def __repr__(self):
+        return f"PackedRecipe({self.tolist()})"
+
+    def tolist(self):
+        return list(self)
+
+    def tenths(self):
+        """
+        Valori della ricetta in decimi interi (vedi calculate_tenths).
+        """
+        return calculate_tenths(self)
+
+    def values(self):
+        """
+        Dizionario dei valori della ricetta, calcolato al momento.
+        """
+        return tenths_to_values(calculate_tenths(self))
+
+def pack_quantities(quantities):
+    """
+    Impacchetta quantities se presente (None resta None).
+    """
+    return PackedRecipe.from_quantities(quantities) if quantities is not None else None
+
+def recipe_to_json(obj):
+    """
+    Funzione 'default' per json.dumps: le ricette impacchettate diventano liste.
+    """
+    if isinstance(obj, PackedRecipe):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def score_from_tenths(tenths, ranges):
+    """
+    Score di calculate_score per valori in decimi interi.
+    Un range low-high accetta i valori da low * 10 a (high + 1) * 10 - 1 decimi,
+    cioè [low, high + 1.0); i valori fuori dal range sono penalizzati di -10000.
     """
-    tolerance = 0.05
     score = 0
-    for param in ['gusto', 'colore', 'gradazione', 'schiuma']:
+    for k, param in enumerate(['gusto', 'colore', 'gradazione', 'schiuma']):
         low, high = ranges[param]
-        current = values[param]
-        # Modifica: consenti valori < (high + 1.0) anziché <= high
-        if (low - tolerance) <= current < (high + 1.0):
-            score += current * 10
-            normalized = (current - low) / (high - low) if (high - low) != 0 else 1
+        current = tenths[k]
+        if low * 10 <= current < (high + 1) * 10:
+            score += current
+            normalized = (current - low * 10) / ((high - low) * 10) if (high - low) != 0 else 1
             score += normalized * 100
         else:
             score -= 10000
     return score
 
+# Tolleranza sul lower bound dei range: un valore fino a 0.05 sotto low è ancora nel range
+SCORE_TOLERANCE = 0.05
+
+def values_to_tenths(values, ranges):
+    """
+    Valori in decimi interi, per virtù nell'ordine gusto, colore, gradazione, schiuma.
+    Un valore in [low - SCORE_TOLERANCE, high + 1.0) viene riportato dentro il box del
+    range (vedi tenths_box), quindi resta nel range anche se arrotondato fuori; gli
+    altri vengono solo arrotondati e restano fuori. Per i multipli di 0.1 restituiti da
+    calculate_values è un semplice arrotondamento: la tolleranza è minore di mezzo decimo.
+    """
+    tenths = []
+    for param in ['gusto', 'colore', 'gradazione', 'schiuma']:
+        low, high = ranges[param]
+        current = values[param]
+        if low - SCORE_TOLERANCE <= current < high + 1.0:
+            tenths.append(min(max(round(current * 10), low * 10), (high + 1) * 10 - 1))
+        else:
+            tenths.append(round(current * 10))
+    return tenths
+
+def calculate_score(values, ranges):
+    """
+    Calcola lo score basandosi sulla vicinanza dei valori ai range desiderati
+    e applica una tolleranza di 0.05 (SCORE_TOLERANCE) sul lower bound.
+    L'upper bound è allargato di 1.0: ad esempio un range 1-3 include valori fino
+    a 3.9 (ossia, < 4.0).
+    Valori fuori dal range sono penalizzati di -10000.
+    I valori sono multipli di 0.1 (vedi calculate_values): il confronto con i range
+    avviene sui decimi interi, quindi è esatto (vedi values_to_tenths e score_from_tenths).
+    """
+    return score_from_tenths(values_to_tenths(values, ranges), ranges)
+
+def load_costs(tier="normal"):
+    """
+    Costo per unità di ogni ingrediente (nell'ordine di 'ingredienti') nella fascia di prezzo
+    indicata, dalle colonne "Cost/Unit <Low|Normal|High>" del CSV delle varietà.
+    """
+    if tier not in COST_TIERS:
+        raise ValueError(f"Fascia di prezzo sconosciuta: {tier}")
+    return tuple(INGREDIENT_TABLE.columns["cost_" + tier])
+
+def recipe_cost(quantities, costs):
+    """
+    Costo totale di una ricetta (vale per ogni grandezza lineare per unità, come i bonus).
+    """
+    return sum(qty * cost for qty, cost in zip(quantities, costs))
+
+def gourmet_bonuses():
+    """
+    Bonus alla probabilità gourmet per unità di ogni ingrediente.
+    """
+    return tuple(INGREDIENT_TABLE.columns["gourmet"])
+
+def trait_chances(trait=None):
+    """
+    Probabilità per unità di ogni ingrediente di dare il tratto indicato
+    (con trait None, la somma delle probabilità di tutti i tratti).
+    """
+    traits = INGREDIENT_TABLE.traits()
+    if trait is not None and trait not in traits:
+        raise ValueError(f"Tratto sconosciuto: {trait}")
+    selected = [trait] if trait is not None else traits
+    return tuple(sum(INGREDIENT_TABLE.columns[TRAIT_PREFIX + name][i] for name in selected)
+                 for i in range(len(INGREDIENT_TABLE)))
+
 def meets_required(quantities, required_indices):
     """
     Ritorna True se, per tutti gli indici in required_indices,
@@ -124,6 +587,167 @@ def normalize_ranges(ranges):
     else:
         raise ValueError("Tipo non valido per il parametro ranges.")
 
+def values_in_ranges(values, ranges):
+    """
+    Verifica che i valori rientrino nei range specificati.
+    Come in calculate_score, l'upper bound è esclusivo ma allargato di 1.0 e il lower
+    bound ha una tolleranza di 0.05: un range 1-3 accetta valori in [0.95, 4).
+    Il controllo avviene sui decimi interi (vedi values_to_tenths).
+    """
+    return tenths_in_box(values_to_tenths(values, ranges), tenths_box(ranges))
+
+def tenths_box(ranges):
+    """
+    Box dei range in decimi interi, per virtù nell'ordine gusto, colore, gradazione, schiuma:
+    coppie (minimo, massimo) entrambe incluse, cioè da low * 10 a (high + 1) * 10 - 1.
+    """
+    return [(ranges[param][0] * 10, (ranges[param][1] + 1) * 10 - 1)
+            for param in ['gusto', 'colore', 'gradazione', 'schiuma']]
+
+def tenths_in_box(tenths, box):
+    """
+    True se i valori in decimi interi rientrano nel box (vedi tenths_box).
+    """
+    return all(low <= value <= high for value, (low, high) in zip(tenths, box))
+
+def configure_logging(level="INFO"):
+    """
+    Abilita il log della ricerca su stderr al livello indicato (nome o valore numerico,
+    ad esempio "INFO", "DEBUG" o "TRACE"); con "WARNING" il log torna silenzioso.
+    """
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    if not any(isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.NullHandler)
+               for handler in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(level)
+
+def record_improvement(improvements, stats, quantities, score):
+    """
+    Registra nel buffer del worker un miglioramento del best (solo se la traccia è attiva):
+    i miglioramenti vengono restituiti insieme al risultato del chunk e riportati
+    in forma aggregata dal processo principale, senza scritture concorrenti su stdout.
+    """
+    if improvements is not None:
+        improvements.append((stats["examined"], score, quantities))
+
+class TopK:
+    """
+    Le migliori k ricette distinte viste da un worker, in un heap di dimensione fissa:
+    vince lo score più alto e, a parità di score, la ricetta con indice più basso
+    (key è la lista delle quantità nell'ordine delle variabili), come per il best.
+    Le ricette sono conservate impacchettate (PackedRecipe) e i valori vengono
+    ricalcolati solo per le k restituite da results().
+    """
+    __slots__ = ("k", "heap")
+
+    def __init__(self, k):
+        self.k = k
+        self.heap = []
+
+    def threshold(self):
+        """
+        Score sotto cui una ricetta non può più entrare tra le migliori k.
+        """
+        return self.heap[0][0] if len(self.heap) >= self.k else -float('inf')
+
+    def offer(self, score, key, quantities):
+        entry = (score, tuple(-qty for qty in key))
+        if len(self.heap) < self.k:
+            heappush(self.heap, entry + (PackedRecipe.from_quantities(quantities),))
+        elif entry > self.heap[0][:2]:
+            heapreplace(self.heap, entry + (PackedRecipe.from_quantities(quantities),))
+
+    def results(self):
+        """
+        Le ricette in ordine, dalla migliore: lista di (score, quantities, values).
+        """
+        return [(score, recipe, recipe.values()) for score, _, recipe in sorted(self.heap, reverse=True)]
+
+class SkylineIndex:
+    """
+    Albero di Fenwick bidimensionale sul massimo: per una griglia di righe x colonne
+    risponde in O(log righe * log colonne) a "massimo valore inserito in una cella con
+    riga >= r e colonna >= c". Usato da pareto_frontier per i controlli di dominanza.
+    """
+    __slots__ = ("rows", "cols", "tree")
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.tree = [[-float('inf')] * (cols + 1) for _ in range(rows + 1)]
+
+    def update(self, row, col, value):
+        # Gli indici vengono invertiti: "riga >= r" diventa un prefisso dell'albero
+        i = self.rows - row
+        while i <= self.rows:
+            tree_row = self.tree[i]
+            j = self.cols - col
+            while j <= self.cols:
+                if tree_row[j] < value:
+                    tree_row[j] = value
+                j += j & -j
+            i += i & -i
+
+    def query(self, row, col):
+        best = -float('inf')
+        i = self.rows - row
+        while i > 0:
+            tree_row = self.tree[i]
+            j = self.cols - col
+            while j > 0:
+                if tree_row[j] > best:
+                    best = tree_row[j]
+                j -= j & -j
+            i -= i & -i
+        return best
+
+# Obiettivi della frontiera di Pareto: score, gourmet e tratti vanno massimizzati, il costo minimizzato
+PARETO_OBJECTIVES = ("score", "cost", "gourmet", "trait_chance")
+
+# Massimo di ingredienti utilizzabili (sbloccati e sempre disponibili) per cui la finestra
+# calcola la frontiera di Pareto. Con quattro obiettivi un sottoalbero non si può scartare
+# per dominanza (il costo minimo raggiungibile è quello della ricetta parziale, mentre score,
+# gourmet e tratti possono ancora crescere): vanno visitate tutte le ricette valide, che
+# crescono di circa 6 volte per ingrediente. Con 8 ingredienti bastano pochi secondi, con
+# 10 servono già minuti.
+PARETO_MAX_INGREDIENTS = 8
+
+def pareto_frontier(points):
+    """
+    Ricette non dominate tra 'points', tuple (score, cost, gourmet, trait_chance, key,
+    quantities) con key la lista delle quantità nell'ordine delle variabili e quantities
+    la ricetta impacchettata (PackedRecipe).
+    Una ricetta è dominata se un'altra non è peggiore in nessun obiettivo e migliore in
+    almeno uno; tra ricette con gli stessi obiettivi resta quella con key minore.
+    Le ricette vengono prima raggruppate per (costo, gourmet, tratti) tenendo lo score
+    migliore, poi visitate per costo crescente: una ricetta è dominata se tra quelle già
+    accettate ce n'è una con gourmet, tratti e score non inferiori (SkylineIndex).
+    Restituisce la frontiera ordinata per score decrescente.
+    """
+    groups = {}
+    for point in points:
+        group = point[1:4]
+        current = groups.get(group)
+        if current is None or (point[0], current[4]) > (current[0], point[4]):
+            groups[group] = point
+    gourmet_levels = sorted({group[1] for group in groups})
+    trait_levels = sorted({group[2] for group in groups})
+    gourmet_rank = {value: rank for rank, value in enumerate(gourmet_levels)}
+    trait_rank = {value: rank for rank, value in enumerate(trait_levels)}
+    skyline = SkylineIndex(len(gourmet_levels), len(trait_levels))
+    frontier = []
+    for point in sorted(groups.values(), key=lambda point: (point[1], -point[2], -point[3], -point[0])):
+        row, col = gourmet_rank[point[2]], trait_rank[point[3]]
+        if skyline.query(row, col) >= point[0]:
+            continue
+        skyline.update(row, col, point[0])
+        frontier.append(point)
+    frontier.sort(key=lambda point: (-point[0], point[1], -point[2], -point[3], point[4]))
+    return frontier
+
 def worker_process(params):
     """
     Worker che elabora un intervallo dello spazio "appiattito" delle combinazioni.
@@ -134,9 +758,10 @@ def worker_process(params):
     end_index     = params["end_index"]
     variable_indices = params["variable_indices"]   # Indici degli ingredienti sbloccati
     required_indices = params["required_indices"]       # Indici degli ingredienti obbligatori
-    total_units_constraint = 25
+    total_units_constraint = MAX_TOTAL_UNITS
     ranges = normalize_ranges(params["ranges"])
-    worker_id = params["worker_id"]
+    improvements = [] if params.get("trace") else None   # Miglioramenti del best, se tracciati
+    top = TopK(params["top_k"]) if params.get("top_k", 1) > 1 else None
 
     best_score = -float('inf')
     best_quantities = None
@@ -150,8 +775,14 @@ def worker_process(params):
     }
     base = MAX_QUANTITY + 1
     total_vars = len(variable_indices)
+    box = tenths_box(ranges)
 
     for idx in range(start_index, end_index):
+        if (idx - start_index) % CANCEL_CHECK_INTERVAL == 0:
+            if search_cancelled():
+                stats["cancelled"] = 1
+                break
+            report_progress(params, stats, best_score, best_quantities)
         # Genera una combinazione relativa agli ingredienti sbloccati
         combo = index_to_combination(idx, total_vars, base)
         # Inizializza il vettore delle quantità per tutti gli ingredienti a 0
@@ -170,141 +801,2970 @@ def worker_process(params):
             stats["skipped_required"] += 1
             continue
 
-        values = calculate_values(quantities)
+        tenths = calculate_tenths(quantities)
         # Verifica che i valori rientrino nei range specificati
-        valid = True
-        for param in ['gusto', 'colore', 'gradazione', 'schiuma']:
-            low, high = ranges[param]
-            # Modifica: consentire valori < (high + 1.0)
-            if not (low <= values[param] < high + 1.0):
-                valid = False
-                break
-        if not valid:
+        if not tenths_in_box(tenths, box):
             stats["skipped_range"] += 1
             continue
 
         stats["valid"] += 1
-        score = calculate_score(values, ranges)
+        score = score_from_tenths(tenths, ranges)
+        if top is not None and score >= top.threshold():
+            top.offer(score, combo, quantities)
         if score > best_score:
             best_score = score
-            best_quantities = quantities.copy()
-            best_values = values.copy()
-            # Stampa di debug del nuovo best trovato (opzionale)
-            print(f"\nNew best combination found (Worker {worker_id}):")
-            for i, qty in enumerate(quantities):
-                if qty > 0:
-                    print(f"{ingredienti[i]}: {qty}")
-            values_str = ", ".join(f"{k.capitalize()}={values[k]:.2f}" for k in values)
-            print(f"Values: {values_str}")
-            print(f"Score: {score:.2f}")
+            best_quantities = PackedRecipe.from_quantities(quantities)
+            best_values = tenths_to_values(tenths)
+            record_improvement(improvements, stats, best_quantities, score)
     
-    return {"best_score": best_score, "best_quantities": best_quantities, "best_values": best_values, "stats": stats}
+    return {"best_score": best_score, "best_quantities": best_quantities, "best_values": best_values,
+            "stats": stats, "improvements": improvements, "top": top.results() if top else None}
 
-def find_optimal_combination(required_ingredients, ranges, unlocked_ingredients):
+def odometer_worker_process(params):
     """
-    Cerca la combinazione ottimale che rispetti:
-      - Totale unità <= 25;
-      - Almeno una unità per ogni ingrediente richiesto;
-      - Valori (gusto, colore, gradazione, schiuma) nei range specificati.
-    Lo spazio delle combinazioni teoriche viene calcolato in base al numero di ingredienti sbloccati,
-    e suddiviso in 8 worker. Vengono stampate le statistiche iniziali (inclusi i range usati)
-    prima di iniziare la ricerca.
+    Worker dello spazio "appiattito" che, invece di decodificare ogni indice e ricalcolare i
+    valori da zero, scorre le combinazioni come un contachilometri: tra un indice e il
+    successivo cambia di una unità l'ultima cifra (e, con il riporto, azzera quelle finite
+    a MAX_QUANTITY), quindi totale, ingredienti obbligatori mancanti e valori in decimi
+    interi si aggiornano sommando il contributo delle sole cifre cambiate (in media poco
+    più di una per combinazione). Risultato e statistiche sono identici a quelli di
+    worker_process.
     """
-    from multiprocessing import Pool
-    from time import time
+    start_index = params["start_index"]
+    end_index = params["end_index"]
+    variable_indices = params["variable_indices"]
+    required_indices = params["required_indices"]
+    ranges = normalize_ranges(params["ranges"])
+    improvements = [] if params.get("trace") else None   # Miglioramenti del best, se tracciati
+    top = TopK(params["top_k"]) if params.get("top_k", 1) > 1 else None
 
-    ranges = normalize_ranges(ranges)
+    best_score = -float('inf')
+    best_quantities = None
+    best_values = None
+    stats = {
+        "examined": 0,
+        "skipped_total": 0,
+        "skipped_required": 0,
+        "skipped_range": 0,
+        "valid": 0
+    }
+    base = MAX_QUANTITY + 1
+    total_vars = len(variable_indices)
+    tenths = coefficients_in_tenths()
+    (low_g, high_g), (low_c, high_c), (low_a, high_a), (low_s, high_s) = tenths_box(ranges)
+    unit_g, unit_c, unit_a, unit_s = ([tenths[k][ingr_idx] for ingr_idx in variable_indices] for k in range(4))
+    required = [ingr_idx in required_indices for ingr_idx in variable_indices]
 
-    # Debug: stampa dei range usati per il calcolo
-    print("DEBUG: Range in uso:")
-    for param, (low, high) in ranges.items():
-        print(f"  {param.capitalize()}: {low} - {high}  (valori accettati: [{low}, {high + 1.0}))")
-
-    # Combina gli ingredienti sbloccati con quelli sempre disponibili.
-    # Per preservare l'ordine della GUI, usa l'ordine di unlocked_ingredients
-    usable_indices = []
-    for idx in unlocked_ingredients:
-        if idx not in usable_indices:
-            usable_indices.append(idx)
-    for ingr in ALWAYS_AVAILABLE:
-        idx = ingredienti.index(ingr)
-        if idx not in usable_indices:
-            usable_indices.append(idx)
+    # Stato iniziale: la combinazione di start_index
+    combo = index_to_combination(start_index, total_vars, base)
+    quantities = [0] * len(ingredienti)
+    for pos, ingr_idx in enumerate(variable_indices):
+        quantities[ingr_idx] = combo[pos]
+    used = sum(combo)
+    missing = sum(1 for ingr_idx in required_indices if quantities[ingr_idx] == 0)
+    gusto = sum(qty * unit for qty, unit in zip(combo, unit_g))
+    colore = sum(qty * unit for qty, unit in zip(combo, unit_c))
+    gradazione = sum(qty * unit for qty, unit in zip(combo, unit_a))
+    schiuma = sum(qty * unit for qty, unit in zip(combo, unit_s))
 
-    # Determina gli indici degli ingredienti richiesti.
-    required_indices = []
-    for ing in required_ingredients:
-        if isinstance(ing, int):
-            required_indices.append(ing)
+    for idx in range(start_index, end_index):
+        if (idx - start_index) % CANCEL_CHECK_INTERVAL == 0:
+            if search_cancelled():
+                stats["cancelled"] = 1
+                break
+            report_progress(params, stats, best_score, best_quantities)
+        stats["examined"] += 1
+
+        if used > MAX_TOTAL_UNITS:
+            stats["skipped_total"] += 1
+        elif missing:
+            stats["skipped_required"] += 1
+        elif not (low_g <= gusto <= high_g and low_c <= colore <= high_c
+                  and low_a <= gradazione <= high_a and low_s <= schiuma <= high_s):
+            stats["skipped_range"] += 1
         else:
-            try:
-                required_indices.append(ingredienti.index(ing))
-            except ValueError:
-                pass
+            stats["valid"] += 1
+            tenths = [gusto, colore, gradazione, schiuma]
+            score = score_from_tenths(tenths, ranges)
+            if top is not None and score >= top.threshold():
+                top.offer(score, combo, quantities)
+            if score > best_score:
+                best_score = score
+                best_quantities = quantities.copy()
+                best_values = tenths_to_values(tenths)
+                record_improvement(improvements, stats, best_quantities, score)
 
-    total_vars = len(usable_indices)
+        # Passa all'indice successivo aggiornando solo le cifre che cambiano
+        pos = total_vars - 1
+        while pos >= 0:
+            qty = combo[pos]
+            if qty < MAX_QUANTITY:
+                combo[pos] = qty + 1
+                quantities[variable_indices[pos]] = qty + 1
+                used += 1
+                gusto += unit_g[pos]
+                colore += unit_c[pos]
+                gradazione += unit_a[pos]
+                schiuma += unit_s[pos]
+                if qty == 0 and required[pos]:
+                    missing -= 1
+                break
+            combo[pos] = 0
+            quantities[variable_indices[pos]] = 0
+            used -= MAX_QUANTITY
+            gusto -= MAX_QUANTITY * unit_g[pos]
+            colore -= MAX_QUANTITY * unit_c[pos]
+            gradazione -= MAX_QUANTITY * unit_a[pos]
+            schiuma -= MAX_QUANTITY * unit_s[pos]
+            if required[pos]:
+                missing += 1
+            pos -= 1
+
+    return {"best_score": best_score, "best_quantities": best_quantities, "best_values": best_values,
+            "stats": stats, "improvements": improvements, "top": top.results() if top else None}
+
+def coefficient_matrix():
+    """
+    Restituisce i coefficienti in decimi interi come matrice NumPy int16 32x4
+    (ingredienti x virtù), con le colonne nell'ordine gusto, colore, gradazione, schiuma.
+    """
+    np = load_numpy()
+    return np.array(coefficients_in_tenths(), dtype=np.int16).T
+
+def numpy_worker_process(params):
+    """
+    Worker vettorizzato con NumPy per lo spazio "appiattito" delle combinazioni.
+    Decodifica un blocco di indici in una matrice di quantità (int8), calcola i valori in
+    decimi interi (int32) con la matrice dei coefficienti e applica vincoli e score come
+    operazioni su array. I controlli sui range sono esatti e lo score segue le stesse
+    operazioni di score_from_tenths: valori e score coincidono bit per bit con il percorso
+    scalare e vince la stessa combinazione.
+    """
+    np = load_numpy()
+    start_index   = params["start_index"]
+    end_index     = params["end_index"]
+    variable_indices = params["variable_indices"]
+    required_indices = params["required_indices"]
+    ranges = normalize_ranges(params["ranges"])
+    improvements = [] if params.get("trace") else None   # Miglioramenti del best, se tracciati
+    top = TopK(params["top_k"]) if params.get("top_k", 1) > 1 else None
+    block_size = params.get("block_size", 65536)
+
+    best_score = -float('inf')
+    best_quantities = None
+    best_values = None
+    stats = {
+        "examined": 0,
+        "skipped_total": 0,
+        "skipped_required": 0,
+        "skipped_range": 0,
+        "valid": 0
+    }
     base = MAX_QUANTITY + 1
-    total_theoretical = base ** total_vars
+    total_vars = len(variable_indices)
+    matrix = coefficient_matrix()
+    box = tenths_box(ranges)
+    param_names = ['gusto', 'colore', 'gradazione', 'schiuma']
+    # Colonne della matrice delle quantità da sommare, in ordine di ingrediente
+    columns = sorted((ingr_idx, pos) for pos, ingr_idx in enumerate(variable_indices))
+    required_positions = [pos for pos, ingr_idx in enumerate(variable_indices) if ingr_idx in required_indices]
+    missing_required = any(idx not in variable_indices for idx in required_indices)
 
-    print("=== Statistiche Iniziali ===")
-    print(f"Ingredienti sbloccati totali: {total_vars}")
-    print(f"Ingredienti richiesti: {len(required_indices)}")
-    print(f"Combinazioni teoriche: {total_theoretical:,}")
-    print("============================\n")
-    
-    num_workers = 8
-    partition_size = total_theoretical // num_workers
+    for block_start in range(start_index, end_index, block_size):
+        if search_cancelled():
+            stats["cancelled"] = 1
+            break
+        report_progress(params, stats, best_score, best_quantities)
+        block_end = min(block_start + block_size, end_index)
+        index = np.arange(block_start, block_end, dtype=np.int64)
+        combos = np.empty((block_end - block_start, total_vars), dtype=np.int8)
+        for pos in range(total_vars - 1, -1, -1):
+            combos[:, pos] = index % base
+            index //= base
+        stats["examined"] += len(combos)
 
-    worker_params = []
-    for i in range(num_workers):
-        start_index = i * partition_size
-        end_index = (i + 1) * partition_size if i != num_workers - 1 else total_theoretical
-        params = {
-            "start_index": start_index,
-            "end_index": end_index,
-            "variable_indices": usable_indices,
-            "required_indices": required_indices,
-            "ranges": ranges,
-            "worker_id": i
-        }
-        worker_params.append(params)
-    
-    start_time = time()
-    with Pool(processes=num_workers) as pool:
-        results = pool.map(worker_process, worker_params)
-    end_time = time()
+        total_ok = combos.sum(axis=1, dtype=np.int32) <= MAX_TOTAL_UNITS
+        if missing_required:
+            required_ok = np.zeros(len(combos), dtype=bool)
+        else:
+            required_ok = np.all(combos[:, required_positions] >= 1, axis=1)
+        stats["skipped_total"] += int(np.count_nonzero(~total_ok))
+        stats["skipped_required"] += int(np.count_nonzero(total_ok & ~required_ok))
+        candidates = total_ok & required_ok
 
-    best_global_score = -float('inf')
-    best_global_quantities = None
-    best_global_values = None
-    total_stats = {"examined": 0, "skipped_total": 0, "skipped_required": 0, "skipped_range": 0, "valid": 0}
-    
-    for res in results:
-        if res["best_score"] > best_global_score:
-            best_global_score = res["best_score"]
-            best_global_quantities = res["best_quantities"]
-            best_global_values = res["best_values"]
-        for key in total_stats:
-            total_stats[key] += res["stats"][key]
-    
-    # Rinomina le chiavi per rispettare quanto aspettato da main.py
-    total_stats["examined_combinations"] = total_stats.pop("examined")
-    total_stats["valid_combinations"] = total_stats.pop("valid")
-    
-    total_stats.update({
-        "total_combinations": total_theoretical,
-        "execution_time": end_time - start_time,
-        "best_score": best_global_score if best_global_score > -float('inf') else None
-    })
-    
-    print("\nSearch statistics:")
-    print("-" * 30)
-    print(f"Total theoretical combinations: {total_theoretical:,}")
-    print(f"Examined combinations: {total_stats['examined_combinations']:,}")
-    print(f"Skipped for total > 25: {total_stats['skipped_total']:,}")
-    print(f"Skipped for missing required ingredients: {total_stats['skipped_required']:,}")
-    print(f"Skipped for values out of range: {total_stats['skipped_range']:,}")
-    print(f"Valid combinations: {total_stats['valid_combinations']:,}")
-    print(f"Execution time: {total_stats['execution_time']:.2f} seconds")
-    
-    return best_global_quantities, best_global_values, total_stats
+        values = np.zeros((len(combos), 4), dtype=np.int32)
+        for ingr_idx, pos in columns:
+            values += combos[:, pos:pos + 1] * matrix[ingr_idx].astype(np.int32)
+
+        in_range = candidates.copy()
+        score = np.zeros(len(combos), dtype=np.float64)
+        for k, (low, high) in enumerate(box):
+            current = values[:, k]
+            in_range &= (low <= current) & (current <= high)
+            score += current
+            low, high = ranges[param_names[k]]
+            if (high - low) != 0:
+                score += ((current - low * 10) / ((high - low) * 10)) * 100
+            else:
+                score += 1 * 100
+        stats["skipped_range"] += int(np.count_nonzero(candidates & ~in_range))
+        valid_count = int(np.count_nonzero(in_range))
+        stats["valid"] += valid_count
+        if not valid_count:
+            continue
+
+        # argmax restituisce il primo massimo: a parità di score vince l'indice più basso
+        winner = int(np.argmax(np.where(in_range, score, -np.inf)))
+        if score[winner] > best_score:
+            best_score = float(score[winner])
+            best_quantities = [0] * len(ingredienti)
+            for pos, ingr_idx in enumerate(variable_indices):
+                best_quantities[ingr_idx] = int(combos[winner, pos])
+            best_values = calculate_values(best_quantities)
+            record_improvement(improvements, stats, best_quantities, best_score)
+        if top is not None:
+            # Solo le righe che possono entrare tra le migliori k, in ordine di indice
+            rows = np.flatnonzero(in_range & (score >= top.threshold()))
+            if len(rows) > top.k:
+                kth = np.partition(score[rows], len(rows) - top.k)[len(rows) - top.k]
+                rows = rows[score[rows] >= kth]
+            for row in rows.tolist():
+                quantities = [0] * len(ingredienti)
+                for pos, ingr_idx in enumerate(variable_indices):
+                    quantities[ingr_idx] = int(combos[row, pos])
+                top.offer(float(score[row]), combos[row].tolist(), quantities)
+
+    return {"best_score": best_score, "best_quantities": best_quantities, "best_values": best_values,
+            "stats": stats, "improvements": improvements, "top": top.results() if top else None}
+
+def count_bounded_combinations(lower_bounds, max_total=MAX_TOTAL_UNITS):
+    """
+    Conta le combinazioni in cui ogni variabile i vale tra lower_bounds[i] e MAX_QUANTITY
+    e il totale delle unità non supera max_total.
+    È la dimensione effettiva dello spazio esplorato dalla ricerca a somma limitata.
+    """
+    ways = [0] * (max_total + 1)
+    ways[0] = 1
+    for low in lower_bounds:
+        new_ways = [0] * (max_total + 1)
+        for total, count in enumerate(ways):
+            if count:
+                for qty in range(low, MAX_QUANTITY + 1):
+                    if total + qty > max_total:
+                        break
+                    new_ways[total + qty] += count
+        ways = new_ways
+    return sum(ways)
+
+def bounded_prefixes(lower_bounds, depth, max_total=MAX_TOTAL_UNITS):
+    """
+    Genera, in ordine lessicografico, tutte le assegnazioni delle prime 'depth' variabili
+    che lasciano abbastanza unità per i minimi delle variabili successive.
+    Ogni prefisso diventa un task indipendente della ricerca a somma limitata.
+    """
+    tail_min = sum(lower_bounds[depth:])
+    prefixes = [[]]
+    for pos in range(depth):
+        extended = []
+        for prefix in prefixes:
+            used = sum(prefix)
+            # Unità minime ancora necessarie per le variabili successive del prefisso
+            needed = sum(lower_bounds[pos + 1:depth]) + tail_min
+            for qty in range(lower_bounds[pos], MAX_QUANTITY + 1):
+                if used + qty + needed > max_total:
+                    break
+                extended.append(prefix + [qty])
+        prefixes = extended
+    return prefixes
+
+def bounded_worker_process(params):
+    """
+    Worker della ricerca a somma limitata.
+    Parte da un prefisso già fissato (quantità delle prime variabili) e completa le
+    variabili rimanenti in modo ricorsivo, generando solo combinazioni con totale <= 25
+    e con almeno una unità per ogni ingrediente obbligatorio.
+    Le combinazioni vengono visitate nello stesso ordine della strategia "appiattita",
+    quindi a parità di score vince la stessa combinazione.
+    """
+    prefix = params["prefix"]
+    variable_indices = params["variable_indices"]   # Indici degli ingredienti sbloccati
+    lower_bounds = params["lower_bounds"]           # 1 per gli obbligatori, 0 altrimenti
+    ranges = normalize_ranges(params["ranges"])
+    improvements = [] if params.get("trace") else None   # Miglioramenti del best, se tracciati
+    top = TopK(params["top_k"]) if params.get("top_k", 1) > 1 else None
+
+    best = {"score": -float('inf'), "quantities": None, "values": None}
+    stats = {
+        "examined": 0,
+        "skipped_total": 0,
+        "skipped_required": 0,
+        "skipped_range": 0,
+        "valid": 0
+    }
+    total_vars = len(variable_indices)
+
+    # Unità minime richieste dalle variabili da 'pos' in poi
+    suffix_min = [0] * (total_vars + 1)
+    for pos in range(total_vars - 1, -1, -1):
+        suffix_min[pos] = suffix_min[pos + 1] + lower_bounds[pos]
+
+    quantities = [0] * len(ingredienti)
+    for pos, qty in enumerate(prefix):
+        quantities[variable_indices[pos]] = qty
+
+    box = tenths_box(ranges)
+
+    def evaluate():
+        stats["examined"] += 1
+        tenths = calculate_tenths(quantities)
+        if not tenths_in_box(tenths, box):
+            stats["skipped_range"] += 1
+            return
+        stats["valid"] += 1
+        score = score_from_tenths(tenths, ranges)
+        if top is not None and score >= top.threshold():
+            top.offer(score, [quantities[ingr_idx] for ingr_idx in variable_indices], quantities)
+        if score > best["score"]:
+            best["score"] = score
+            best["quantities"] = quantities.copy()
+            best["values"] = tenths_to_values(tenths)
+            record_improvement(improvements, stats, best["quantities"], score)
+
+    nodes = [0]
+
+    def visit(pos, remaining):
+        nodes[0] += 1
+        if nodes[0] % CANCEL_CHECK_INTERVAL == 0:
+            if search_cancelled():
+                raise SearchCancelled()
+            report_progress(params, stats, best["score"], best["quantities"])
+        if pos == total_vars:
+            evaluate()
+            return
+        ingr_idx = variable_indices[pos]
+        max_qty = min(MAX_QUANTITY, remaining - suffix_min[pos + 1])
+        for qty in range(lower_bounds[pos], max_qty + 1):
+            quantities[ingr_idx] = qty
+            visit(pos + 1, remaining - qty)
+        quantities[ingr_idx] = 0
+
+    remaining = MAX_TOTAL_UNITS - sum(prefix)
+    if remaining >= suffix_min[len(prefix)] and not search_cancelled():
+        try:
+            visit(len(prefix), remaining)
+        except SearchCancelled:
+            pass
+    if search_cancelled():
+        stats["cancelled"] = 1
+
+    return {"best_score": best["score"], "best_quantities": best["quantities"],
+            "best_values": best["values"], "stats": stats, "improvements": improvements,
+            "top": top.results() if top else None}
+
+# Margine usato nei bound sullo score per assorbire gli errori di arrotondamento dei float
+# (i valori delle virtù sono in decimi interi, quindi i controlli sui range sono esatti)
+BOUND_EPSILON = 1e-9
+
+def score_weights(ranges):
+    """
+    Per una combinazione che rispetta i range, calculate_score è lineare nei valori:
+    score = somma(peso[param] * valore[param]) + costante.
+    Restituisce (pesi, costante) usati dai bound della ricerca branch-and-bound.
+    """
+    weights = {}
+    constant = 0
+    for param in ['gusto', 'colore', 'gradazione', 'schiuma']:
+        low, high = ranges[param]
+        if high - low != 0:
+            weights[param] = 10 + 100 / (high - low)
+            constant -= 100 * low / (high - low)
+        else:
+            weights[param] = 10
+            constant += 100
+    return weights, constant
+
+def contribution_bounds(variable_indices, lower_bounds, unit_values, max_total=MAX_TOTAL_UNITS):
+    """
+    Calcola, per ogni posizione 'pos' e per ogni budget residuo di unità, il contributo minimo
+    e massimo che le variabili da 'pos' in poi possono dare a una grandezza lineare
+    (unit_values[i] è il contributo di una unità dell'ingrediente i).
+    Tiene conto dei minimi degli ingredienti obbligatori e del limite MAX_QUANTITY.
+    Restituisce (minimi, massimi) come liste [pos][budget]; un budget insufficiente per
+    i minimi vale +inf / -inf.
+    """
+    total_vars = len(variable_indices)
+    inf = float('inf')
+    minimum = [[0] * (max_total + 1) for _ in range(total_vars + 1)]
+    maximum = [[0] * (max_total + 1) for _ in range(total_vars + 1)]
+    for pos in range(total_vars - 1, -1, -1):
+        coef = unit_values[variable_indices[pos]]
+        for budget in range(max_total + 1):
+            best_min, best_max = inf, -inf
+            for qty in range(lower_bounds[pos], min(MAX_QUANTITY, budget) + 1):
+                best_min = min(best_min, qty * coef + minimum[pos + 1][budget - qty])
+                best_max = max(best_max, qty * coef + maximum[pos + 1][budget - qty])
+            minimum[pos][budget] = best_min
+            maximum[pos][budget] = best_max
+    return minimum, maximum
+
+@lru_cache(maxsize=8)
+def branch_and_bound_tables(variable_indices, lower_bounds, ranges_key):
+    """
+    Tabelle dei bound della ricerca branch-and-bound: intervalli raggiungibili da ogni virtù
+    (in decimi interi), coefficienti pesati dello score e loro massimo raggiungibile.
+    Sono uguali per tutti i chunk della stessa ricerca, quindi ogni processo le calcola una volta.
+    """
+    params_order = ['gusto', 'colore', 'gradazione', 'schiuma']
+    weights, _ = score_weights(dict(zip(params_order, ranges_key)))
+    virtue_bounds = [contribution_bounds(variable_indices, lower_bounds, coefficient_tenths[param])
+                     for param in params_order]
+    weighted_coefficients = [sum(weights[param] * coefficient_tenths[param][i] for param in params_order) / 10
+                             for i in range(len(ingredienti))]
+    _, weighted_max = contribution_bounds(variable_indices, lower_bounds, weighted_coefficients)
+    return virtue_bounds, weighted_coefficients, weighted_max
+
+def quantity_feasible(qty, unit, rest_bounds, budget, lows, highs):
+    """
+    True se 'qty' unità con contributi 'unit' (uno per virtù) sono compatibili con i range,
+    dato che le altre variabili con al più 'budget' unità raggiungono per ogni virtù
+    l'intervallo rest_bounds[k] = (minimi, massimi) indicizzati per budget.
+    Contributi e range [lows[k], highs[k]] (inclusi) sono in decimi interi.
+    È una condizione necessaria: ogni virtù viene controllata separatamente.
+    """
+    for k in range(4):
+        reach_min = qty * unit[k] + rest_bounds[k][0][budget]
+        reach_max = qty * unit[k] + rest_bounds[k][1][budget]
+        if reach_max < lows[k] or reach_min > highs[k]:
+            return False
+    return True
+
+def reduce_ingredients(usable_indices, required_indices, ranges, collapse=True):
+    """
+    Riduce gli ingredienti prima della ricerca, senza cambiare il risultato:
+      - sonda ogni quantità di ogni ingrediente con i bound della ricerca branch-and-bound
+        (le altre variabili sono combinate con tabelle per prefisso e suffisso): un
+        ingrediente che può comparire solo con 0 unità viene tolto, uno che non può
+        mancare diventa obbligatorio; si ripete finché cambia qualcosa;
+      - con collapse, gli ingredienti non obbligatori con gli stessi coefficienti sono
+        intercambiabili: dato il massimo numero di unità che il gruppo può usare insieme,
+        restano solo gli ultimi ingredienti (in ordine di indice) che bastano a contenerle.
+        A parità di score la ricetta con indice più basso mette le unità proprio negli
+        ultimi, quindi il vincitore non cambia; le alternative di top_k e gli obiettivi
+        di costo distinguono invece gli ingredienti, per cui vanno usati con collapse=False.
+    Non esiste una dominanza tra ingredienti valida in generale: i range limitano le virtù
+    anche dall'alto, quindi un ingrediente "migliore" in ogni virtù può uscire dal range.
+    Restituisce un dizionario con gli ingredienti ridotti ("usable", "required"), quelli
+    tolti ("removed", "collapsed"), quelli resi obbligatori ("forced"), "infeasible"
+    (True se nessuna ricetta può rispettare i range) e "factor", il rapporto tra le
+    combinazioni teoriche prima e dopo la riduzione.
+    """
+    ranges = normalize_ranges(ranges)
+    lows, highs = zip(*tenths_box(ranges))
+    columns = coefficients_in_tenths()
+    usable = sorted(usable_indices)
+    required = set(required_indices)
+    removed, forced, collapsed = [], [], []
+    infeasible = not required <= set(usable)
+
+    def space(indices, required):
+        size = 1
+        for idx in indices:
+            size *= MAX_QUANTITY + (0 if idx in required else 1)
+        return size
+
+    original_space = space(usable, required)
+    changed = not infeasible
+    while changed and not infeasible:
+        changed = False
+        lower_bounds = [1 if idx in required else 0 for idx in usable]
+        count = len(usable)
+        # suffix[k][pos]: variabili da pos in poi; prefix[k][count - pos]: variabili prima di pos
+        suffix = [contribution_bounds(usable, lower_bounds, column) for column in columns]
+        prefix = [contribution_bounds(usable[::-1], lower_bounds[::-1], column) for column in columns]
+        keep = []
+        for pos, idx in enumerate(usable):
+            rest_bounds = []
+            for k in range(4):
+                before, after = prefix[k], suffix[k]
+                minimum = [min(before[0][count - pos][b] + after[0][pos + 1][budget - b] for b in range(budget + 1))
+                           for budget in range(MAX_TOTAL_UNITS + 1)]
+                maximum = [max(before[1][count - pos][b] + after[1][pos + 1][budget - b] for b in range(budget + 1))
+                           for budget in range(MAX_TOTAL_UNITS + 1)]
+                rest_bounds.append((minimum, maximum))
+            unit = [column[idx] for column in columns]
+            feasible = [qty for qty in range(lower_bounds[pos], MAX_QUANTITY + 1)
+                        if quantity_feasible(qty, unit, rest_bounds, MAX_TOTAL_UNITS - qty, lows, highs)]
+            if not feasible:
+                infeasible = True
+                break
+            if feasible == [0]:
+                removed.append(idx)
+                changed = True
+                continue
+            if feasible[0] > 0 and idx not in required:
+                required.add(idx)
+                forced.append(idx)
+                changed = True
+            keep.append(idx)
+        else:
+            usable = keep
+
+    if collapse and not infeasible:
+        groups = {}
+        for idx in usable:
+            if idx not in required:
+                groups.setdefault(tuple(column[idx] for column in columns), []).append(idx)
+        for unit, members in groups.items():
+            if len(members) < 2:
+                continue
+            # Massimo numero di unità che il gruppo può usare insieme
+            rest = [idx for idx in usable if idx not in members]
+            lower_bounds = [1 if idx in required else 0 for idx in rest]
+            rest_bounds = []
+            for column in columns:
+                minimum, maximum = contribution_bounds(rest, lower_bounds, column)
+                rest_bounds.append((minimum[0], maximum[0]))
+            reserved = sum(lower_bounds)
+            total = max(qty for qty in range(min(MAX_TOTAL_UNITS - reserved, MAX_QUANTITY * len(members)) + 1)
+                        if quantity_feasible(qty, unit, rest_bounds, MAX_TOTAL_UNITS - qty, lows, highs))
+            needed = max(1, -(-total // MAX_QUANTITY))
+            if needed < len(members):
+                collapsed.append(members[:len(members) - needed])
+        dropped = {idx for group in collapsed for idx in group}
+        usable = [idx for idx in usable if idx not in dropped]
+
+    return {
+        "usable": usable,
+        "required": sorted(required),
+        "removed": removed,
+        "forced": forced,
+        "collapsed": collapsed,
+        "infeasible": infeasible,
+        "factor": original_space / space(usable, required) if not infeasible else float('inf')
+    }
+
+# Bit riservati a ogni conteggio nei polinomi di reachable_tables: bastano per le
+# (MAX_QUANTITY + 1) ** 32 ricette possibili
+REACHABLE_COUNT_BITS = 96
+
+@lru_cache(maxsize=16)
+def reachable_tables(usable_indices, required_indices):
+    """
+    Tabelle dei valori raggiungibili da ogni virtù con gli ingredienti usable_indices
+    (tuple ordinate) e gli obbligatori required_indices: per ogni virtù (origine,
+    cumulati), dove cumulati[e] è il numero di ricette (totale <= MAX_TOTAL_UNITS,
+    obbligatori con almeno un'unità) con la virtù, in decimi interi, minore di origine + e.
+    Il conteggio è un prodotto di polinomi per ingrediente: per ogni totale di unità un
+    intero di Python contiene i conteggi di tutti i valori, REACHABLE_COUNT_BITS bit
+    ciascuno, e aggiungere q unità diventa uno scorrimento di q * coefficiente posizioni.
+    Le quantità ammesse di un ingrediente sono consecutive, quindi il nuovo polinomio per
+    un totale si ottiene da quello del totale precedente (finestra scorrevole).
+    """
+    required = set(required_indices)
+    mask = (1 << REACHABLE_COUNT_BITS) - 1
+    digit_bytes = REACHABLE_COUNT_BITS // 8
+    tables = []
+    for column in coefficients_in_tenths():
+        # I coefficienti negativi vengono spostati a 0; lo spostamento dipende solo dalle unità
+        shift = min([0] + [column[idx] for idx in usable_indices])
+        polynomials = [0] * (MAX_TOTAL_UNITS + 1)
+        polynomials[0] = 1
+        if required <= set(usable_indices):
+            for idx in usable_indices:
+                step = (column[idx] - shift) * REACHABLE_COUNT_BITS
+                lowest = 1 if idx in required else 0
+                updated = [0] * (MAX_TOTAL_UNITS + 1)
+                # window: somma su qty da lowest a MAX_QUANTITY di polynomials[used - qty] << qty * step
+                window = 0
+                for used in range(MAX_TOTAL_UNITS + 1):
+                    window <<= step
+                    if used >= lowest:
+                        window += polynomials[used - lowest] << (lowest * step)
+                    if used > MAX_QUANTITY:
+                        window -= polynomials[used - MAX_QUANTITY - 1] << ((MAX_QUANTITY + 1) * step)
+                    updated[used] = window
+                polynomials = updated
+        else:
+            polynomials[0] = 0
+        # Riporta tutti i totali alla stessa origine, shift * MAX_TOTAL_UNITS
+        combined = sum(polynomial << (-shift * (MAX_TOTAL_UNITS - used) * REACHABLE_COUNT_BITS)
+                       for used, polynomial in enumerate(polynomials))
+        data = combined.to_bytes(-(-combined.bit_length() // 8), "little")
+        cumulative = [0]
+        for start in range(0, len(data), digit_bytes):
+            cumulative.append(cumulative[-1] + (int.from_bytes(data[start:start + digit_bytes], "little") & mask))
+        tables.append((shift * MAX_TOTAL_UNITS, cumulative))
+    return tables
+
+def count_in_tenths(table, low, high):
+    """
+    Numero di ricette con la virtù di 'table' (vedi reachable_tables) tra low e high
+    decimi, estremi inclusi.
+    """
+    origin, cumulative = table
+    first = min(max(low - origin, 0), len(cumulative) - 1)
+    last = min(max(high - origin + 1, 0), len(cumulative) - 1)
+    return cumulative[last] - cumulative[first] if last > first else 0
+
+def feasibility_preview(usable_indices, required_indices, ranges):
+    """
+    Anteprima della fattibilità dei range, calcolata dalle tabelle dei valori raggiungibili
+    (vedi reachable_tables) senza enumerare le ricette:
+      - "recipes": ricette possibili con gli ingredienti e gli obbligatori scelti;
+      - "in_range": per virtù, le ricette con quella virtù nel suo range;
+      - "max_feasible": il minimo di "in_range", un limite superiore alle ricette che
+        rispettano tutti i range insieme (il conteggio esatto richiede una ricerca);
+      - "infeasible": True se nessuna ricetta può rispettare i range;
+      - "intervals": per virtù, (minimo, massimo) raggiungibile, o None senza ricette;
+      - "reachable": per virtù, i valori interi v tali che qualche ricetta ha la virtù
+        tra v e v + 0.9, cioè i range [v, v] soddisfacibili da soli.
+    Le tabelle dipendono solo dagli ingredienti e restano in cache: al cambio dei range
+    l'anteprima costa poche operazioni per virtù.
+    """
+    ranges = normalize_ranges(ranges)
+    tables = reachable_tables(tuple(sorted(usable_indices)), tuple(sorted(required_indices)))
+    params_order = ['gusto', 'colore', 'gradazione', 'schiuma']
+    recipes = tables[0][1][-1]
+    preview = {"recipes": recipes, "in_range": {}, "intervals": {}, "reachable": {}}
+    for param, table, (low, high) in zip(params_order, tables, tenths_box(ranges)):
+        origin, cumulative = table
+        preview["in_range"][param] = count_in_tenths(table, low, high)
+        if recipes == 0:
+            preview["intervals"][param] = None
+            preview["reachable"][param] = []
+            continue
+        first = bisect_right(cumulative, 0) - 1
+        last = bisect_left(cumulative, recipes) - 1
+        preview["intervals"][param] = ((origin + first) / 10, (origin + last) / 10)
+        preview["reachable"][param] = [value for value in range((origin + first) // 10, (origin + last) // 10 + 1)
+                                       if count_in_tenths(table, value * 10, value * 10 + 9)]
+    preview["max_feasible"] = min(preview["in_range"].values())
+    preview["infeasible"] = preview["max_feasible"] == 0
+    return preview
+
+def branch_and_bound_worker_process(params):
+    """
+    Worker della ricerca branch-and-bound.
+    Esplora lo stesso albero della ricerca a somma limitata, ma per ogni assegnazione parziale
+    calcola l'intervallo raggiungibile da ciascuna virtù con le unità rimaste: se anche il
+    miglior completamento non può rientrare in [low, high + 1.0) il sottoalbero viene scartato.
+    Scarta inoltre i sottoalberi il cui score massimo teorico non supera il migliore già trovato.
+    Con params["objective"] si può ottimizzare, invece dello score:
+      - "min_cost": il costo minimo (params["costs"] per unità di ogni ingrediente);
+      - "weighted": score - params["cost_weight"] * costo.
+    In questi casi "best_score" è il valore dell'obiettivo e i sottoalberi vengono scartati
+    anche con il costo minimo raggiungibile dalle unità rimaste.
+    Con params["seed_score"] (lo score di una ricetta già trovata, ad esempio dall'euristica)
+    vengono scartati da subito i sottoalberi che non possono raggiungerlo; quelli che possono
+    pareggiarlo restano, così a parità di score vince comunque la ricetta con indice più basso.
+    """
+    prefix = params["prefix"]
+    variable_indices = params["variable_indices"]
+    lower_bounds = params["lower_bounds"]
+    ranges = normalize_ranges(params["ranges"])
+    improvements = [] if params.get("trace") else None   # Miglioramenti del best, se tracciati
+    top = TopK(params["top_k"]) if params.get("top_k", 1) > 1 else None
+    seed_floor = params.get("seed_score", -float('inf')) - 2 * BOUND_EPSILON
+
+    params_order = ['gusto', 'colore', 'gradazione', 'schiuma']
+    best = {"score": -float('inf'), "quantities": None, "values": None}
+    stats = {
+        "examined": 0,
+        "skipped_total": 0,
+        "skipped_required": 0,
+        "skipped_range": 0,
+        "valid": 0,
+        "pruned_range": 0,
+        "pruned_score": 0,
+        "pruned_cost": 0
+    }
+    total_vars = len(variable_indices)
+
+    suffix_min = [0] * (total_vars + 1)
+    for pos in range(total_vars - 1, -1, -1):
+        suffix_min[pos] = suffix_min[pos + 1] + lower_bounds[pos]
+
+    # Bound per ciascuna virtù e per la parte lineare dello score
+    weights, constant = score_weights(ranges)
+    virtue_bounds, weighted_coefficients, weighted_max = branch_and_bound_tables(
+        tuple(variable_indices), tuple(lower_bounds), tuple(ranges[param] for param in params_order))
+    # Valori parziali e range in decimi interi: i controlli sui range sono esatti
+    lows, highs = zip(*tenths_box(ranges))
+    param_weights = [weights[param] / 10 for param in params_order]
+    columns = [coefficient_tenths[param] for param in params_order]
+
+    # Bound del costo e della parte lineare di score - cost_weight * costo
+    objective = params.get("objective", "score")
+    cost_weight = params.get("cost_weight", 0.0)
+    costs = params.get("costs")
+    if objective != "score":
+        cost_min, _ = contribution_bounds(variable_indices, lower_bounds, costs)
+        net_coefficients = [weighted_coefficients[i] - cost_weight * costs[i] for i in range(len(ingredienti))]
+        _, net_max = contribution_bounds(variable_indices, lower_bounds, net_coefficients)
+
+    quantities = [0] * len(ingredienti)
+    partial = [0] * 4
+    partial_weighted = 0.0
+    partial_cost = 0.0
+    for pos, qty in enumerate(prefix):
+        ingr_idx = variable_indices[pos]
+        quantities[ingr_idx] = qty
+        for k in range(4):
+            partial[k] += qty * columns[k][ingr_idx]
+        partial_weighted += qty * weighted_coefficients[ingr_idx]
+        if costs is not None:
+            partial_cost += qty * costs[ingr_idx]
+
+    def evaluate():
+        # Alle foglie i valori parziali sono quelli della ricetta completa
+        stats["examined"] += 1
+        if not tenths_in_box(partial, zip(lows, highs)):
+            stats["skipped_range"] += 1
+            return
+        stats["valid"] += 1
+        score = score_from_tenths(partial, ranges)
+        if objective == "min_cost":
+            score = -recipe_cost(quantities, costs)
+        elif objective == "weighted":
+            score -= cost_weight * recipe_cost(quantities, costs)
+        if top is not None and score >= top.threshold():
+            top.offer(score, [quantities[ingr_idx] for ingr_idx in variable_indices], quantities)
+        if score > best["score"]:
+            best["score"] = score
+            best["quantities"] = quantities.copy()
+            best["values"] = tenths_to_values(partial)
+            record_improvement(improvements, stats, best["quantities"], score)
+
+    def promising(pos, remaining, partial_weighted, partial_cost):
+        # Ogni virtù deve poter rientrare nel proprio range; lo score massimo ottenibile
+        # è limitato sia dalla parte lineare sia dagli upper bound dei range.
+        capped = constant
+        for k in range(4):
+            reach_min = partial[k] + virtue_bounds[k][0][pos][remaining]
+            reach_max = partial[k] + virtue_bounds[k][1][pos][remaining]
+            if reach_max < lows[k] or reach_min > highs[k]:
+                stats["pruned_range"] += 1
+                return False
+            capped += param_weights[k] * min(reach_max, highs[k])
+        upper = min(partial_weighted + weighted_max[pos][remaining] + constant, capped)
+        if objective != "score":
+            # Il costo delle unità rimaste non può scendere sotto cost_min
+            reach_cost = partial_cost + cost_min[pos][remaining]
+            if objective == "min_cost":
+                upper = -reach_cost
+            else:
+                upper = min(upper - cost_weight * reach_cost,
+                            partial_weighted - cost_weight * partial_cost + net_max[pos][remaining] + constant)
+        if upper + BOUND_EPSILON <= (top.threshold() if top is not None else max(best["score"], seed_floor)):
+            stats["pruned_cost" if objective != "score" else "pruned_score"] += 1
+            return False
+        return True
+
+    nodes = [0]
+
+    def visit(pos, remaining, partial_weighted, partial_cost):
+        nodes[0] += 1
+        if nodes[0] % CANCEL_CHECK_INTERVAL == 0:
+            if search_cancelled():
+                raise SearchCancelled()
+            report_progress(params, stats, best["score"], best["quantities"])
+        if pos == total_vars:
+            evaluate()
+            return
+        if not promising(pos, remaining, partial_weighted, partial_cost):
+            return
+        ingr_idx = variable_indices[pos]
+        unit = [column[ingr_idx] for column in columns]
+        unit_cost = costs[ingr_idx] if costs is not None else 0.0
+        max_qty = min(MAX_QUANTITY, remaining - suffix_min[pos + 1])
+        for qty in range(lower_bounds[pos], max_qty + 1):
+            quantities[ingr_idx] = qty
+            for k in range(4):
+                partial[k] += qty * unit[k]
+            visit(pos + 1, remaining - qty, partial_weighted + qty * weighted_coefficients[ingr_idx],
+                  partial_cost + qty * unit_cost)
+            for k in range(4):
+                partial[k] -= qty * unit[k]
+        quantities[ingr_idx] = 0
+
+    remaining = MAX_TOTAL_UNITS - sum(prefix)
+    if remaining >= suffix_min[len(prefix)] and not search_cancelled():
+        try:
+            visit(len(prefix), remaining, partial_weighted, partial_cost)
+        except SearchCancelled:
+            pass
+    if search_cancelled():
+        stats["cancelled"] = 1
+
+    return {"best_score": best["score"], "best_quantities": best["quantities"],
+            "best_values": best["values"], "stats": stats, "improvements": improvements,
+            "top": top.results() if top else None}
+
+def pareto_worker_process(params):
+    """
+    Worker della frontiera di Pareto (score, costo, bonus gourmet, probabilità dei tratti).
+    Visita le ricette come la ricerca branch-and-bound, scartando i sottoalberi in cui una
+    virtù non può rientrare nel proprio range, e per ogni ricetta valida tiene solo la
+    migliore per ogni terna (costo, gourmet, tratti): restituisce in "frontier" le
+    ricette non dominate del chunk (vedi pareto_frontier).
+    params contiene i valori per unità "costs", "gourmet" e "trait_chances".
+    """
+    prefix = params["prefix"]
+    variable_indices = params["variable_indices"]
+    lower_bounds = params["lower_bounds"]
+    ranges = normalize_ranges(params["ranges"])
+    costs, gourmet, traits = params["costs"], params["gourmet"], params["trait_chances"]
+
+    params_order = ['gusto', 'colore', 'gradazione', 'schiuma']
+    best = {"score": -float('inf'), "quantities": None, "values": None}
+    groups = {}
+    stats = {
+        "examined": 0,
+        "skipped_total": 0,
+        "skipped_required": 0,
+        "skipped_range": 0,
+        "valid": 0,
+        "pruned_range": 0
+    }
+    total_vars = len(variable_indices)
+
+    suffix_min = [0] * (total_vars + 1)
+    for pos in range(total_vars - 1, -1, -1):
+        suffix_min[pos] = suffix_min[pos + 1] + lower_bounds[pos]
+
+    virtue_bounds, _, _ = branch_and_bound_tables(
+        tuple(variable_indices), tuple(lower_bounds), tuple(ranges[param] for param in params_order))
+    lows, highs = zip(*tenths_box(ranges))
+    columns = [coefficient_tenths[param] for param in params_order]
+
+    quantities = [0] * len(ingredienti)
+    partial = [0] * 4
+    for pos, qty in enumerate(prefix):
+        ingr_idx = variable_indices[pos]
+        quantities[ingr_idx] = qty
+        for k in range(4):
+            partial[k] += qty * columns[k][ingr_idx]
+
+    def evaluate():
+        stats["examined"] += 1
+        if not tenths_in_box(partial, zip(lows, highs)):
+            stats["skipped_range"] += 1
+            return
+        stats["valid"] += 1
+        score = score_from_tenths(partial, ranges)
+        group = (recipe_cost(quantities, costs), recipe_cost(quantities, gourmet),
+                 recipe_cost(quantities, traits))
+        current = groups.get(group)
+        # Le ricette arrivano in ordine di key: a parità di score resta la prima
+        if current is None or score > current[0]:
+            groups[group] = (score,) + group + ([quantities[ingr_idx] for ingr_idx in variable_indices],
+                                                PackedRecipe.from_quantities(quantities))
+        if score > best["score"]:
+            best["score"] = score
+            best["quantities"] = quantities.copy()
+            best["values"] = tenths_to_values(partial)
+
+    def promising(pos, remaining):
+        for k in range(4):
+            reach_min = partial[k] + virtue_bounds[k][0][pos][remaining]
+            reach_max = partial[k] + virtue_bounds[k][1][pos][remaining]
+            if reach_max < lows[k] or reach_min > highs[k]:
+                stats["pruned_range"] += 1
+                return False
+        return True
+
+    nodes = [0]
+
+    def visit(pos, remaining):
+        nodes[0] += 1
+        if nodes[0] % CANCEL_CHECK_INTERVAL == 0:
+            if search_cancelled():
+                raise SearchCancelled()
+            report_progress(params, stats, best["score"], best["quantities"])
+        if pos == total_vars:
+            evaluate()
+            return
+        if not promising(pos, remaining):
+            return
+        ingr_idx = variable_indices[pos]
+        unit = [column[ingr_idx] for column in columns]
+        max_qty = min(MAX_QUANTITY, remaining - suffix_min[pos + 1])
+        for qty in range(lower_bounds[pos], max_qty + 1):
+            quantities[ingr_idx] = qty
+            for k in range(4):
+                partial[k] += qty * unit[k]
+            visit(pos + 1, remaining - qty)
+            for k in range(4):
+                partial[k] -= qty * unit[k]
+        quantities[ingr_idx] = 0
+
+    remaining = MAX_TOTAL_UNITS - sum(prefix)
+    if remaining >= suffix_min[len(prefix)] and not search_cancelled():
+        try:
+            visit(len(prefix), remaining)
+        except SearchCancelled:
+            pass
+    if search_cancelled():
+        stats["cancelled"] = 1
+
+    return {"best_score": best["score"], "best_quantities": best["quantities"],
+            "best_values": best["values"], "stats": stats, "improvements": None,
+            "frontier": pareto_frontier(groups.values())}
+
+def coefficients_in_tenths():
+    """
+    I coefficienti in decimi interi (vedi coefficient_tenths), una lista per virtù
+    nell'ordine gusto, colore, gradazione, schiuma.
+    """
+    return [list(coefficient_tenths[param]) for param in ['gusto', 'colore', 'gradazione', 'schiuma']]
+
+def layered_state_search(order, lower_bounds, place_values, box, bounds, objective=None, beam_width=None):
+    """
+    Programmazione dinamica sugli stati raggiungibili (unità usate, gusto, colore, gradazione,
+    schiuma), con i valori delle virtù in decimi interi.
+    'order' sono le variabili nell'ordine di elaborazione, 'place_values' il peso di ciascuna
+    nell'indice "appiattito": per ogni stato si conserva solo l'assegnazione con indice più
+    basso, che è anche quella che vincerebbe a parità di score nella ricerca esaustiva.
+    Gli stati da cui nessun completamento può rientrare in 'box' (o superare il bound di
+    'objective') vengono scartati; con 'beam_width' si conservano solo gli stati più promettenti
+    di ogni livello (ricerca euristica, non esatta).
+    Restituisce (stati finali {stato: indice}, statistiche).
+    """
+    virtue_min = [table[0] for table in bounds]
+    virtue_max = [table[1] for table in bounds]
+    tenths = coefficients_in_tenths()
+    lows = [low for low, _ in box]
+    highs = [high for _, high in box]
+    stats = {"dp_states": 0, "dp_peak_states": 1}
+
+    states = {(0, 0, 0, 0, 0): 0}
+    for step, (ingr_idx, position) in enumerate(order):
+        unit = [tenths[k][ingr_idx] for k in range(4)]
+        place = place_values[position]
+        next_step = step + 1
+        new_states = {}
+        for visited, ((used, *values), index) in enumerate(states.items()):
+            if visited % CANCEL_CHECK_INTERVAL == 0 and search_cancelled():
+                raise SearchCancelled()
+            for qty in range(lower_bounds[position], min(MAX_QUANTITY, MAX_TOTAL_UNITS - used) + 1):
+                remaining = MAX_TOTAL_UNITS - used - qty
+                reached = [values[k] + qty * unit[k] for k in range(4)]
+                feasible = True
+                for k in range(4):
+                    if (reached[k] + virtue_max[k][next_step][remaining] < lows[k]
+                            or reached[k] + virtue_min[k][next_step][remaining] > highs[k]):
+                        feasible = False
+                        break
+                if not feasible:
+                    continue
+                if objective is not None and not objective(reached, next_step, remaining):
+                    continue
+                key = (used + qty, *reached)
+                new_index = index + qty * place
+                old_index = new_states.get(key)
+                if old_index is None or new_index < old_index:
+                    new_states[key] = new_index
+        if beam_width is not None and len(new_states) > beam_width:
+            # Conserva gli stati con il miglior score ottenibile (a parità, l'indice più basso)
+            ranked = sorted(new_states.items(),
+                            key=lambda item: (-objective.upper_bound(item[0][1:], next_step, MAX_TOTAL_UNITS - item[0][0]), item[1]))
+            new_states = dict(ranked[:beam_width])
+        states = new_states
+        stats["dp_states"] += len(states)
+        stats["dp_peak_states"] = max(stats["dp_peak_states"], len(states))
+    return states, stats
+
+class ScoreBound:
+    """
+    Bound sullo score usato dalla programmazione dinamica: dato uno stato parziale
+    (valori in decimi, variabili già elaborate, unità rimaste) stima lo score massimo
+    raggiungibile; se è sotto 'threshold' lo stato viene scartato.
+    """
+    def __init__(self, ranges, bounds, weighted_max, threshold=-float('inf')):
+        self.weights, self.constant = score_weights(ranges)
+        self.param_weights = [self.weights[param] / 10 for param in ['gusto', 'colore', 'gradazione', 'schiuma']]
+        self.virtue_max = [table[1] for table in bounds]
+        self.caps = [(ranges[param][1] + 1) * 10 for param in ['gusto', 'colore', 'gradazione', 'schiuma']]
+        self.weighted_max = weighted_max
+        self.threshold = threshold
+
+    def upper_bound(self, values, step, remaining):
+        linear = sum(self.param_weights[k] * values[k] for k in range(4)) + self.weighted_max[step][remaining] / 10
+        capped = sum(self.param_weights[k] * min(values[k] + self.virtue_max[k][step][remaining], self.caps[k])
+                     for k in range(4))
+        return min(linear, capped) + self.constant
+
+    def __call__(self, values, step, remaining):
+        return self.upper_bound(values, step, remaining) >= self.threshold
+
+def state_search_tables(variable_indices, lower_bounds, ranges):
+    """
+    Ordine delle variabili e tabelle dei bound (in decimi) per layered_state_search e
+    ScoreBound: le variabili vengono elaborate partendo da quelle con coefficienti più
+    grandi, così gli intervalli raggiungibili dalle variabili rimaste si restringono prima.
+    Restituisce (order, bounds, weighted_max).
+    """
+    params_order = ['gusto', 'colore', 'gradazione', 'schiuma']
+    tenths = coefficients_in_tenths()
+    order = sorted(((ingr_idx, pos) for pos, ingr_idx in enumerate(variable_indices)),
+                   key=lambda item: (-sum(abs(tenths[k][item[0]]) for k in range(4)), item[1]))
+    ordered_indices = [ingr_idx for ingr_idx, _ in order]
+    ordered_lower = [lower_bounds[pos] for _, pos in order]
+    bounds = [contribution_bounds(ordered_indices, ordered_lower, tenths[k]) for k in range(4)]
+    weights, _ = score_weights(ranges)
+    weighted_tenths = [sum(weights[param] * tenths[k][i] for k, param in enumerate(params_order))
+                       for i in range(len(ingredienti))]
+    _, weighted_max = contribution_bounds(ordered_indices, ordered_lower, weighted_tenths)
+    return order, bounds, weighted_max
+
+def exact_worker_process(params):
+    """
+    Solver esatto basato sulla programmazione dinamica sugli stati raggiungibili
+    (vedi layered_state_search), senza enumerare le combinazioni.
+    Le variabili vengono elaborate partendo da quelle con coefficienti più grandi, così gli
+    intervalli raggiungibili dalle variabili rimaste si restringono prima e i bound tagliano
+    più stati. Una prima passata a fascio (beam search) trova una buona combinazione, il cui
+    score diventa la soglia sotto cui la passata esatta scarta gli stati.
+    La passata esatta viene eseguita anche quando la combinazione trovata a fascio
+    raggiunge lo score massimo teorico: con la soglia a quello score visita solo gli
+    stati ottimi e sceglie, tra più ricette con lo stesso score, quella con indice più
+    basso, come le altre strategie.
+    Lo score degli stati finali viene infine calcolato con calculate_values/calculate_score.
+    Con top_k > 1 le migliori k sono scelte tra gli stati finali: ricette diverse con gli
+    stessi valori occupano un solo stato, quindi ne compare solo quella con indice più basso.
+    """
+    variable_indices = params["variable_indices"]
+    lower_bounds = params["lower_bounds"]
+    ranges = normalize_ranges(params["ranges"])
+    improvements = [] if params.get("trace") else None   # Miglioramenti del best, se tracciati
+    top = TopK(params["top_k"]) if params.get("top_k", 1) > 1 else None
+    beam_width = params.get("beam_width", 2000)
+
+    total_vars = len(variable_indices)
+    place_values = [(MAX_QUANTITY + 1) ** (total_vars - 1 - pos) for pos in range(total_vars)]
+    order, bounds, weighted_max = state_search_tables(variable_indices, lower_bounds, ranges)
+    box = tenths_box(ranges)
+
+    best = {"score": -float('inf'), "quantities": None, "values": None}
+    stats = {
+        "examined": 0,
+        "skipped_total": 0,
+        "skipped_required": 0,
+        "skipped_range": 0,
+        "valid": 0,
+        "dp_states": 0,
+        "dp_peak_states": 0
+    }
+
+    def collect(states):
+        # Combinazioni finali valide, dalla migliore
+        candidates = []
+        for index in states.values():
+            stats["examined"] += 1
+            combo = index_to_combination(index, total_vars, MAX_QUANTITY + 1)
+            quantities = [0] * len(ingredienti)
+            for pos, ingr_idx in enumerate(variable_indices):
+                quantities[ingr_idx] = combo[pos]
+            values = calculate_values(quantities)
+            if not values_in_ranges(values, ranges):
+                stats["skipped_range"] += 1
+                continue
+            stats["valid"] += 1
+            candidates.append((calculate_score(values, ranges), -index, quantities, values))
+        candidates.sort(key=lambda item: item[:2], reverse=True)
+        return candidates
+
+    def run(objective, width):
+        states, dp_stats = layered_state_search(order, lower_bounds, place_values, box, bounds,
+                                                objective=objective, beam_width=width)
+        stats["dp_states"] += dp_stats["dp_states"]
+        stats["dp_peak_states"] = max(stats["dp_peak_states"], dp_stats["dp_peak_states"])
+        return collect(states)
+
+    # Con top_k > 1 la soglia è lo score della k-esima combinazione della passata a fascio
+    k = top.k if top is not None else 1
+    if sum(lower_bounds) <= MAX_TOTAL_UNITS:
+        bound = ScoreBound(ranges, bounds, weighted_max)
+        threshold = -float('inf')
+        seed = []
+        try:
+            if beam_width:
+                seed = run(bound, beam_width)
+                if seed:
+                    report_progress(params, stats, seed[0][0], seed[0][2], force=True)
+                    if len(seed) >= k:
+                        threshold = seed[k - 1][0] - BOUND_EPSILON
+            final = run(ScoreBound(ranges, bounds, weighted_max, threshold), None)
+        except SearchCancelled:
+            # Annullata: restituisce il risultato della passata a fascio, se disponibile
+            stats["cancelled"] = 1
+            final = seed
+        if final:
+            best["score"], _, best["quantities"], best["values"] = final[0]
+            record_improvement(improvements, stats, best["quantities"], best["score"])
+            if top is not None:
+                for score, _, quantities, values in final[:k]:
+                    top.offer(score, [quantities[ingr_idx] for ingr_idx in variable_indices], quantities)
+
+    return {"best_score": best["score"], "best_quantities": best["quantities"],
+            "best_values": best["values"], "stats": stats, "improvements": improvements,
+            "top": top.results() if top else None}
+
+# Ampiezza del fascio della ricerca euristica: piccola, per rispondere in frazioni di secondo
+HEURISTIC_BEAM_WIDTH = 128
+
+# Ricette da cui parte la ricerca locale dell'euristica
+HEURISTIC_LOCAL_STARTS = 4
+
+def heuristic_worker_process(params):
+    """
+    Ricerca euristica veloce, senza garanzia di ottimalità:
+      - una passata a fascio (layered_state_search con HEURISTIC_BEAM_WIDTH stati per livello);
+      - una costruzione greedy che parte dai minimi obbligatori e aggiunge ogni volta l'unità
+        che più avvicina i valori ai range (e poi più aumenta lo score);
+      - una ricerca locale che, dalle ricette trovate, applica le mosse di una unità
+        (aggiunta, rimozione, spostamento tra due ingredienti) che aumentano di più lo score.
+    Le mosse lavorano sui valori in decimi; le ricette finali vengono valutate con
+    calculate_values/calculate_score. "upper_bound" è lo score massimo teorico (il bound
+    di ScoreBound sullo stato iniziale): nessuna ricetta può superarlo.
+    """
+    variable_indices = params["variable_indices"]
+    lower_bounds = params["lower_bounds"]
+    ranges = normalize_ranges(params["ranges"])
+    beam_width = params.get("beam_width", HEURISTIC_BEAM_WIDTH)
+
+    params_order = ['gusto', 'colore', 'gradazione', 'schiuma']
+    total_vars = len(variable_indices)
+    tenths = coefficients_in_tenths()
+    units = [[tenths[k][ingr_idx] for k in range(4)] for ingr_idx in variable_indices]
+    weights, _ = score_weights(ranges)
+    gains = [sum(weights[param] / 10 * unit[k] for k, param in enumerate(params_order)) for unit in units]
+    box = tenths_box(ranges)
+    lows = [low for low, _ in box]
+    highs = [high for _, high in box]
+
+    stats = {"examined": 0, "skipped_total": 0, "skipped_required": 0, "skipped_range": 0, "valid": 0}
+    found = []
+
+    def violation(values):
+        return sum(max(0, lows[k] - values[k]) + max(0, values[k] - highs[k]) for k in range(4))
+
+    def offer(combo):
+        stats["examined"] += 1
+        quantities = [0] * len(ingredienti)
+        for pos, ingr_idx in enumerate(variable_indices):
+            quantities[ingr_idx] = combo[pos]
+        values = calculate_values(quantities)
+        if not values_in_ranges(values, ranges):
+            stats["skipped_range"] += 1
+            return
+        stats["valid"] += 1
+        found.append((calculate_score(values, ranges), quantities, values))
+
+    def local_search(combo):
+        # Mosse di una unità finché lo score (lineare nel box) migliora
+        combo = list(combo)
+        values = [sum(combo[pos] * units[pos][k] for pos in range(total_vars)) for k in range(4)]
+        used = sum(combo)
+
+        def fits(delta_add, delta_remove):
+            for k in range(4):
+                value = values[k]
+                if delta_add is not None:
+                    value += units[delta_add][k]
+                if delta_remove is not None:
+                    value -= units[delta_remove][k]
+                if value < lows[k] or value > highs[k]:
+                    return False
+            return True
+
+        while not search_cancelled():
+            best_move, best_gain = None, BOUND_EPSILON
+            for add in [None] + list(range(total_vars)):
+                if add is not None and (combo[add] == MAX_QUANTITY):
+                    continue
+                for remove in [None] + list(range(total_vars)):
+                    if add == remove or (add is None and remove is None):
+                        continue
+                    if remove is not None and combo[remove] <= lower_bounds[remove]:
+                        continue
+                    if add is not None and remove is None and used == MAX_TOTAL_UNITS:
+                        continue
+                    gain = (gains[add] if add is not None else 0) - (gains[remove] if remove is not None else 0)
+                    if gain > best_gain and fits(add, remove):
+                        best_move, best_gain = (add, remove), gain
+            if best_move is None:
+                break
+            add, remove = best_move
+            for k in range(4):
+                values[k] += (units[add][k] if add is not None else 0) - (units[remove][k] if remove is not None else 0)
+            if add is not None:
+                combo[add] += 1
+                used += 1
+            if remove is not None:
+                combo[remove] -= 1
+                used -= 1
+        return combo
+
+    upper = -float('inf')
+    if sum(lower_bounds) <= MAX_TOTAL_UNITS:
+        order, bounds, weighted_max = state_search_tables(variable_indices, lower_bounds, ranges)
+        bound = ScoreBound(ranges, bounds, weighted_max)
+        upper = bound.upper_bound([0, 0, 0, 0], 0, MAX_TOTAL_UNITS)
+        starts = []
+        try:
+            place_values = [(MAX_QUANTITY + 1) ** (total_vars - 1 - pos) for pos in range(total_vars)]
+            states, _ = layered_state_search(order, lower_bounds, place_values, box, bounds,
+                                             objective=bound, beam_width=beam_width)
+            for index in states.values():
+                starts.append(index_to_combination(index, total_vars, MAX_QUANTITY + 1))
+        except SearchCancelled:
+            stats["cancelled"] = 1
+
+        # Greedy: prima rientra nei range, poi aumenta lo score
+        combo = list(lower_bounds)
+        values = [sum(combo[pos] * units[pos][k] for pos in range(total_vars)) for k in range(4)]
+        while sum(combo) < MAX_TOTAL_UNITS:
+            current = (violation(values), 0.0)
+            best_pos, best_key = None, current
+            for pos in range(total_vars):
+                if combo[pos] == MAX_QUANTITY:
+                    continue
+                reached = [values[k] + units[pos][k] for k in range(4)]
+                key = (violation(reached), -gains[pos])
+                if key < best_key and (key[0] < current[0] or key[1] < 0):
+                    best_pos, best_key = pos, key
+            if best_pos is None:
+                break
+            combo[best_pos] += 1
+            values = [values[k] + units[best_pos][k] for k in range(4)]
+        if violation(values) == 0:
+            starts.append(combo)
+
+        # La ricerca locale parte dalle migliori ricette trovate
+        starts.sort(key=lambda start: -sum(gains[pos] * start[pos] for pos in range(total_vars)))
+        for start in starts[:HEURISTIC_LOCAL_STARTS]:
+            offer(start)
+            offer(local_search(start))
+
+    found.sort(key=lambda item: item[0], reverse=True)
+    best_score, best_quantities, best_values = found[0] if found else (-float('inf'), None, None)
+    return {"best_score": best_score, "best_quantities": best_quantities, "best_values": best_values,
+            "stats": stats, "improvements": None, "top": None, "upper_bound": upper}
+
+def meet_in_the_middle_worker_process(params):
+    """
+    Solver "meet in the middle": divide gli ingredienti in due metà (nell'ordine delle
+    variabili), calcola con layered_state_search le sotto-ricette raggiungibili da ciascuna
+    (uno stato per unità e valori in decimi, con la sotto-ricetta di indice più basso) e
+    le unisce con interrogazioni per intervallo.
+    Gli stati della seconda metà sono raggruppati per gusto e ordinati per contributo allo
+    score: per ogni stato della prima metà (dal contributo più alto) si interrogano i soli
+    gruppi di gusto compatibili con il range, fermandosi appena la coppia non può più
+    raggiungere la soglia delle migliori top_k. Il box in decimi è esatto, quindi ogni
+    coppia che vi rientra è una ricetta valida.
+    A parità di score vince la coppia con indice più basso, cioè la ricetta con indice più
+    basso; con top_k > 1 ricette diverse con gli stessi stati contano una volta sola.
+    """
+    variable_indices = params["variable_indices"]
+    lower_bounds = params["lower_bounds"]
+    ranges = normalize_ranges(params["ranges"])
+    improvements = [] if params.get("trace") else None   # Miglioramenti del best, se tracciati
+    k = params.get("top_k", 1)
+    top = TopK(k) if k > 1 else None
+
+    params_order = ['gusto', 'colore', 'gradazione', 'schiuma']
+    total_vars = len(variable_indices)
+    split = total_vars // 2
+    halves = [list(range(split)), list(range(split, total_vars))]
+    tenths = coefficients_in_tenths()
+    box = tenths_box(ranges)
+    weights, constant = score_weights(ranges)
+    param_weights = [weights[param] / 10 for param in params_order]
+    base = MAX_QUANTITY + 1
+
+    best = {"score": -float('inf'), "quantities": None, "values": None}
+    stats = {
+        "examined": 0,
+        "skipped_total": 0,
+        "skipped_required": 0,
+        "skipped_range": 0,
+        "valid": 0,
+        "dp_states": 0,
+        "dp_peak_states": 0,
+        "mitm_left_states": 0,
+        "mitm_right_states": 0
+    }
+
+    def half_states(half, other):
+        # Stati di una metà: i bound delle variabili rimaste includono l'altra metà
+        positions = half + other
+        sequence = [variable_indices[pos] for pos in positions]
+        sequence_lower = [lower_bounds[pos] for pos in positions]
+        bounds = [contribution_bounds(sequence, sequence_lower, tenths[j]) for j in range(4)]
+        place_values = [0] * total_vars
+        for offset, pos in enumerate(half):
+            place_values[pos] = base ** (len(half) - 1 - offset)
+        order = [(variable_indices[pos], pos) for pos in half]
+        states, dp_stats = layered_state_search(order, lower_bounds, place_values, box, bounds)
+        stats["dp_states"] += dp_stats["dp_states"]
+        stats["dp_peak_states"] = max(stats["dp_peak_states"], dp_stats["dp_peak_states"])
+        return states
+
+    def quantities_of(left_index, right_index):
+        combo = (index_to_combination(left_index, len(halves[0]), base)
+                 + index_to_combination(right_index, len(halves[1]), base))
+        quantities = [0] * len(ingredienti)
+        for pos, ingr_idx in enumerate(variable_indices):
+            quantities[ingr_idx] = combo[pos]
+        return quantities
+
+    candidates = []
+    if sum(lower_bounds) <= MAX_TOTAL_UNITS:
+        try:
+            left = half_states(halves[0], halves[1])
+            right = half_states(halves[1], halves[0])
+        except SearchCancelled:
+            left, right = {}, {}
+            stats["cancelled"] = 1
+        stats["mitm_left_states"] = len(left)
+        stats["mitm_right_states"] = len(right)
+
+        # Seconda metà: gruppi per gusto, ciascuno dal contributo allo score più alto
+        groups = {}
+        for (used, *values), index in right.items():
+            weighted = sum(param_weights[j] * values[j] for j in range(4))
+            groups.setdefault(values[0], []).append((weighted, -index, used, values))
+        for group in groups.values():
+            group.sort(reverse=True)
+        gusto_keys = sorted(groups)
+        right_max = max((group[0][0] for group in groups.values()), default=-float('inf'))
+
+        lows = [low for low, _ in box]
+        highs = [high for _, high in box]
+        # Soglia: score (approssimato) della k-esima coppia trovata; le coppie entro
+        # BOUND_EPSILON dalla soglia restano candidate per gli spareggi
+        thresholds = []
+        threshold = -float('inf')
+        left_sorted = sorted(((sum(param_weights[j] * values[j] for j in range(4)), -index, used, values)
+                              for (used, *values), index in left.items()), reverse=True)
+        for visited, (left_weighted, neg_left, left_used, left_values) in enumerate(left_sorted):
+            if visited % 256 == 0:
+                if search_cancelled():
+                    stats["cancelled"] = 1
+                    break
+                report_progress(params, stats, best["score"], best["quantities"])
+            if left_weighted + right_max + constant < threshold - BOUND_EPSILON:
+                break
+            start = bisect_left(gusto_keys, lows[0] - left_values[0])
+            stop = bisect_right(gusto_keys, highs[0] - left_values[0])
+            for gusto in gusto_keys[start:stop]:
+                for right_weighted, neg_right, right_used, right_values in groups[gusto]:
+                    approx = left_weighted + right_weighted + constant
+                    if approx < threshold - BOUND_EPSILON:
+                        break
+                    stats["examined"] += 1
+                    if left_used + right_used > MAX_TOTAL_UNITS:
+                        stats["skipped_total"] += 1
+                        continue
+                    for j in range(4):
+                        total = left_values[j] + right_values[j]
+                        if total < lows[j] or total > highs[j]:
+                            stats["skipped_range"] += 1
+                            break
+                    else:
+                        stats["valid"] += 1
+                        candidates.append((approx, neg_left, neg_right))
+                        if len(thresholds) < k:
+                            heappush(thresholds, approx)
+                        elif approx > thresholds[0]:
+                            heapreplace(thresholds, approx)
+                        if len(thresholds) >= k:
+                            threshold = thresholds[0]
+
+    # Le candidate vicine alla soglia vengono valutate con calculate_values/calculate_score
+    candidates = [item for item in candidates if item[0] >= threshold - BOUND_EPSILON]
+    results = []
+    for _, neg_left, neg_right in candidates:
+        quantities = quantities_of(-neg_left, -neg_right)
+        values = calculate_values(quantities)
+        results.append((calculate_score(values, ranges), neg_left, neg_right, quantities, values))
+    results.sort(key=lambda item: item[:3], reverse=True)
+    if results:
+        best["score"], _, _, best["quantities"], best["values"] = results[0]
+        record_improvement(improvements, stats, best["quantities"], best["score"])
+        if top is not None:
+            for score, _, _, quantities, values in results[:k]:
+                top.offer(score, [quantities[ingr_idx] for ingr_idx in variable_indices], quantities)
+
+    return {"best_score": best["score"], "best_quantities": best["quantities"],
+            "best_values": best["values"], "stats": stats, "improvements": improvements,
+            "top": top.results() if top else None}
+
+# Numero di chunk per worker: chunk piccoli bilanciano il carico tra i processi
+CHUNKS_PER_WORKER = 16
+
+# Dimensione minima di un chunk della strategia "appiattita", per non sprecare
+# più tempo a distribuire il lavoro che a svolgerlo
+MIN_FLAT_CHUNK = 4096
+
+def run_chunk(task):
+    """
+    Esegue un chunk di lavoro in un processo del pool, annotando il risultato con
+    il pid del processo e il tempo impiegato (per le statistiche per worker).
+    """
+    worker_function, params = task
+    start = perf_counter()
+    result = worker_function(params)
+    # Il best viaggia impacchettato verso il processo principale
+    result["best_quantities"] = pack_quantities(result["best_quantities"])
+    result["chunk_id"] = params["worker_id"]
+    result["pid"] = os.getpid()
+    result["elapsed"] = perf_counter() - start
+    return result
+
+def worker_timings(results):
+    """
+    Aggrega per processo (pid) il numero di chunk elaborati e il tempo di lavoro.
+    """
+    timings = {}
+    for res in results:
+        entry = timings.setdefault(res["pid"], {"pid": res["pid"], "chunks": 0, "busy_time": 0.0})
+        entry["chunks"] += 1
+        entry["busy_time"] += res["elapsed"]
+    return sorted(timings.values(), key=lambda entry: entry["pid"])
+
+def log_improvements(results):
+    """
+    Riporta sul log (livello TRACE) i miglioramenti del best registrati dai chunk:
+    per ogni chunk il numero di miglioramenti e l'ultimo best, seguiti dalla
+    sequenza dei record globali. Restituisce il numero totale di miglioramenti.
+    """
+    total = 0
+    record = -float('inf')
+    for res in results:
+        improvements = res.get("improvements") or []
+        total += len(improvements)
+        if improvements:
+            examined, score, _ = improvements[-1]
+            logger.log(TRACE, f"Chunk {res['chunk_id']}: {len(improvements)} improvements, "
+                              f"best score {score:.2f} after {examined:,} combinations")
+        for examined, score, quantities in improvements:
+            if score > record:
+                record = score
+                recipe = ", ".join(f"{ingredienti[i]}={qty}" for i, qty in enumerate(quantities) if qty > 0)
+                logger.log(TRACE, f"  New record {score:.2f} (chunk {res['chunk_id']}): {recipe or '-'}")
+    logger.log(TRACE, f"Improvements recorded: {total:,}")
+    return total
+
+def warm_up_worker(_):
+    """
+    Task usato per attendere che i processi del pool siano pronti. Importa anche NumPy
+    (se installato), così la prima ricerca sull'indice non ne paga il caricamento.
+    """
+    load_numpy()
+    return os.getpid()
+
+class SolverPool:
+    """
+    Pool di processi di lunga durata, condiviso tra più chiamate a find_optimal_combination.
+    Il pool viene avviato alla prima ricerca (lazy) e poi riutilizzato, evitando di pagare
+    ogni volta l'avvio dei processi e la re-importazione di questo modulo; va chiuso con
+    shutdown() (ad esempio alla chiusura della finestra).
+    cancel() annulla la ricerca in corso: i worker controllano periodicamente l'evento
+    condiviso e restituiscono il migliore risultato trovato fino a quel momento.
+    cancel_search() fa lo stesso solo mentre i task sono in esecuzione (tra begin_search()
+    ed end_search()), così un annullamento richiesto a fine ricerca non ferma la successiva.
+    Durante la ricerca i worker inviano messaggi di avanzamento su progress_queue.
+    """
+    def __init__(self, num_workers=None):
+        from multiprocessing import Event, Queue
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self._pool = None
+        self.startup_time = None
+        self.cancel_event = Event()
+        self.progress_queue = Queue()
+        self.searches = 0
+        self._searching = False
+        self._search_lock = threading.Lock()
+
+    def is_running(self):
+        return self._pool is not None
+
+    def is_current(self, processes):
+        """
+        True se 'processes' (restituito da get()) è ancora il pool attivo, cioè non è
+        stato chiuso o terminato con shutdown().
+        """
+        return processes is not None and self._pool is processes
+
+    def get(self):
+        """
+        Restituisce (pool, tempo di avvio): il tempo è 0 se il pool era già attivo.
+        """
+        if self._pool is not None:
+            return self._pool, 0.0
+        from multiprocessing import Pool
+        start = perf_counter()
+        self._pool = Pool(processes=self.num_workers, initializer=init_worker,
+                          initargs=(self.cancel_event, self.progress_queue))
+        self._pool.map(warm_up_worker, range(self.num_workers))
+        self.startup_time = perf_counter() - start
+        return self._pool, self.startup_time
+
+    def next_search_id(self):
+        """
+        Identificativo della prossima ricerca, usato per scartare i messaggi di avanzamento
+        rimasti in coda da ricerche precedenti.
+        """
+        self.searches += 1
+        return self.searches
+
+    def cancel(self):
+        """
+        Richiede l'annullamento della ricerca in corso.
+        """
+        self.cancel_event.set()
+
+    def cancel_requested(self):
+        return self.cancel_event.is_set()
+
+    def reset_cancel(self):
+        self.cancel_event.clear()
+
+    def begin_search(self):
+        """
+        Segna l'inizio dell'esecuzione dei task, azzerando gli annullamenti precedenti.
+        """
+        with self._search_lock:
+            self.cancel_event.clear()
+            self._searching = True
+
+    def end_search(self):
+        with self._search_lock:
+            self._searching = False
+            self.cancel_event.clear()
+
+    def is_searching(self):
+        return self._searching
+
+    def cancel_search(self):
+        """
+        Come cancel(), ma senza effetto se i task della ricerca non sono in esecuzione.
+        """
+        with self._search_lock:
+            if self._searching:
+                self.cancel_event.set()
+
+    def shutdown(self, wait=True):
+        """
+        Chiude il pool. Con wait=False i processi vengono terminati subito,
+        senza attendere i chunk in corso.
+        """
+        if self._pool is None:
+            return
+        if wait:
+            self._pool.close()
+        else:
+            self._pool.terminate()
+            # Un processo terminato mentre scriveva può lasciare la coda inconsistente:
+            # il prossimo pool ne userà una nuova
+            from multiprocessing import Queue
+            self.progress_queue = Queue()
+        self._pool.join()
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+# Tempo massimo (in secondi) concesso ai worker per rispondere a un annullamento
+# prima che il pool venga terminato
+CANCEL_GRACE_PERIOD = 0.5
+
+class ProgressTracker:
+    """
+    Aggrega i messaggi di avanzamento dei chunk di una ricerca e, al massimo una volta
+    ogni PROGRESS_INTERVAL secondi, chiama progress_callback con un dizionario:
+      - "examined": combinazioni esaminate finora;
+      - "rate": combinazioni esaminate al secondo;
+      - "completed_chunks" / "num_chunks": chunk terminati e totali;
+      - "progress": frazione stimata del lavoro svolto (0-1);
+      - "eta": secondi stimati alla fine della ricerca (None se non stimabile);
+      - "best_score", "best_quantities": miglior risultato trovato finora;
+      - "upper_bound", "gap": lo score massimo dimostrato (se noto, vedi la strategia
+        "anytime") e la distanza del miglior risultato da esso (None se non noti).
+    Se search_space è noto la frazione si basa sulle combinazioni esaminate,
+    altrimenti sui chunk completati.
+    """
+    def __init__(self, progress_callback, num_chunks, search_space=None, search_id=None):
+        self.progress_callback = progress_callback
+        self.num_chunks = num_chunks
+        self.search_space = search_space
+        self.search_id = search_id
+        self.examined = {}
+        self.completed = 0
+        self.best_score = -float('inf')
+        self.best_quantities = None
+        self.upper_bound = None
+        self.start = perf_counter()
+        self.last_emit = 0.0
+
+    def update(self, message):
+        if message.get("search_id") != self.search_id:
+            return
+        # I messaggi possono arrivare dopo il risultato finale del chunk: il conteggio
+        # di ogni chunk è cumulativo, quindi si tiene il massimo
+        chunk_id = message["chunk_id"]
+        self.examined[chunk_id] = max(self.examined.get(chunk_id, 0), message["examined"])
+        self.offer(message["best_score"], message["best_quantities"])
+
+    def offer(self, score, quantities):
+        if quantities is not None and score > self.best_score:
+            self.best_score = score
+            self.best_quantities = quantities
+
+    def chunk_done(self, result):
+        self.completed += 1
+        self.examined[result["chunk_id"]] = result["stats"]["examined"]
+        self.offer(result["best_score"], result["best_quantities"])
+
+    def emit(self, force=False):
+        if self.progress_callback is None:
+            return
+        now = perf_counter()
+        if not force and now - self.last_emit < PROGRESS_INTERVAL:
+            return
+        self.last_emit = now
+        elapsed = now - self.start
+        examined = sum(self.examined.values())
+        if self.search_space:
+            progress = min(1.0, examined / self.search_space)
+        else:
+            progress = self.completed / self.num_chunks if self.num_chunks else 1.0
+        self.progress_callback({
+            "examined": examined,
+            "rate": examined / elapsed if elapsed > 0 else 0.0,
+            "completed_chunks": self.completed,
+            "num_chunks": self.num_chunks,
+            "progress": progress,
+            "eta": elapsed * (1 - progress) / progress if progress > 0 else None,
+            "elapsed": elapsed,
+            "best_score": self.best_score if self.best_quantities is not None else None,
+            "best_quantities": self.best_quantities,
+            "upper_bound": self.upper_bound,
+            "gap": (max(0.0, self.upper_bound - self.best_score)
+                    if self.upper_bound is not None and self.best_quantities is not None else None)
+        })
+
+def collect_results(solver_pool, tasks, tracker):
+    """
+    Distribuisce i task sul pool e raccoglie i risultati man mano che arrivano,
+    inoltrando al tracker i messaggi di avanzamento dei worker e controllando
+    periodicamente se la ricerca è stata annullata. Dopo un annullamento
+    i worker restituiscono subito il loro miglior risultato; quelli che non rispondono
+    entro CANCEL_GRACE_PERIOD vengono terminati insieme al pool (che verrà riavviato
+    alla ricerca successiva). Se il pool viene chiuso o terminato da fuori (ad esempio
+    alla chiusura della finestra) la raccolta si ferma con i risultati già arrivati.
+    """
+    from multiprocessing import TimeoutError
+    from queue import Empty
+
+    processes, _ = solver_pool.get()
+    iterator = processes.imap_unordered(run_chunk, tasks)
+    results = []
+    cancel_time = None
+    while len(results) < len(tasks):
+        try:
+            result = iterator.next(timeout=0.05)
+            results.append(result)
+            tracker.chunk_done(result)
+        except TimeoutError:
+            if not solver_pool.is_current(processes):
+                break
+            if solver_pool.cancel_requested():
+                if cancel_time is None:
+                    cancel_time = perf_counter()
+                elif perf_counter() - cancel_time > CANCEL_GRACE_PERIOD:
+                    solver_pool.shutdown(wait=False)
+                    break
+        while True:
+            try:
+                tracker.update(solver_pool.progress_queue.get_nowait())
+            except Empty:
+                break
+        tracker.emit()
+    tracker.emit(force=True)
+    return results
+
+# Versione del formato dei risultati in cache: va incrementata se cambia il significato
+# di una ricerca (ad esempio la regola di spareggio), così i vecchi risultati vengono ignorati
+CACHE_VERSION = 2
+
+def data_fingerprint():
+    """
+    Impronta dei dati da cui dipendono i risultati (coefficienti e limiti sulle quantità).
+    """
+    return hashlib.sha1(repr((MAX_QUANTITY, MAX_TOTAL_UNITS, coefficients)).encode()).hexdigest()
+
+def search_key(usable_indices, required_indices, ranges, top_k=1, objective=None):
+    """
+    Chiave canonica di una ricerca: ingredienti utilizzabili e obbligatori ordinati,
+    range normalizzati e un'impronta dei dati (coefficienti e limiti), in modo che
+    risultati calcolati con dati diversi non vengano mai riutilizzati.
+    objective descrive un obiettivo diverso dallo score (nome, fascia di prezzo e peso).
+    """
+    ranges = normalize_ranges(ranges)
+    fingerprint = f"{CACHE_VERSION}-{data_fingerprint()}"
+    key = {
+        "usable": sorted(set(usable_indices)),
+        "required": sorted(set(required_indices)),
+        "top_k": top_k,
+        "ranges": [[param, float(ranges[param][0]), float(ranges[param][1])]
+                   for param in ['gusto', 'colore', 'gradazione', 'schiuma']],
+        "data": fingerprint
+    }
+    if objective is not None:
+        key["objective"] = objective
+    return json.dumps(key, sort_keys=True)
+
+def default_cache_path():
+    """
+    Percorso predefinito del database dei risultati (nella cartella di cache dell'utente).
+    """
+    return os.path.join(default_cache_dir(), "results.sqlite3")
+
+class ResultCache:
+    """
+    Cache dei risultati di find_optimal_combination, indicizzata con search_key().
+    Un livello in memoria (LRU con al massimo maxsize voci) sta davanti a un database
+    SQLite su disco (path), che sopravvive ai riavvii dell'applicazione; con path=None
+    la cache resta solo in memoria. hits e misses contano le ricerche servite o meno
+    dalla cache. Se il database non si può aprire la cache resta solo in memoria.
+    Può essere usata da più thread.
+    """
+    def __init__(self, path=None, maxsize=256):
+        self.path = path
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+                self._db.commit()
+            except (OSError, sqlite3.Error) as exc:
+                # Senza un database utilizzabile la cache resta solo in memoria
+                logger.warning(f"Cache su disco non disponibile ({exc}): uso solo la memoria")
+                self._db = None
+
+    def _remember(self, key, payload):
+        self._memory[key] = payload
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Restituisce (quantities, values, stats) salvati per key, o None.
+        """
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    payload = row[0]
+                    self._remember(key, payload)
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        quantities, values, stats = json.loads(payload)
+        for entry in stats.get("top_combinations", []) + stats.get("pareto_frontier", []):
+            entry["quantities"] = PackedRecipe.from_quantities(entry["quantities"])
+        return pack_quantities(quantities), values, stats
+
+    def put(self, key, result):
+        """
+        Salva il risultato (quantities, values, stats) di una ricerca completata.
+        """
+        payload = json.dumps(list(result), default=recipe_to_json)
+        with self._lock:
+            self._remember(key, payload)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO results (key, result) VALUES (?, ?)", (key, payload))
+                self._db.commit()
+
+    def clear(self):
+        """
+        Svuota entrambi i livelli della cache.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+# Intestazione dei file dell'indice di fattibilità
+INDEX_MAGIC = b"AAIDX2\n"
+
+# Numero predefinito di ingredienti sbloccati fino a cui build-index costruisce l'indice.
+# L'indice contiene tutte le ricette, che crescono di circa 6 volte per ogni
+# ingrediente in più: è una cache per gli insiemi piccoli, oltre conviene cercare
+INDEX_MAX_UNLOCKED = 6
+
+def default_index_dir():
+    """
+    Cartella predefinita dei file dell'indice di fattibilità (accanto alla cache).
+    """
+    return os.path.join(default_cache_dir(), "index")
+
+def unlock_prefix_indices(num_unlocked):
+    """
+    Ingredienti utilizzabili (in ordine di indice) quando sono sbloccati i primi
+    num_unlocked ingredienti di UNLOCKABLE_INGREDIENTS.
+    """
+    names = set(UNLOCKABLE_INGREDIENTS[:num_unlocked]) | set(ALWAYS_AVAILABLE)
+    return sorted(ingredienti.index(name) for name in names)
+
+def build_feasibility_index(usable_indices):
+    """
+    Enumera tutte le ricette con totale <= MAX_TOTAL_UNITS sugli ingredienti usable_indices
+    e restituisce le colonne dell'indice (array), ordinate per gusto e poi per indice:
+      - "gusto", "colore", "gradazione", "schiuma": valori in decimi interi;
+      - "mask": bit 'pos' acceso se l'ingrediente usable_indices[pos] è presente;
+      - "q<pos>": quantità dell'ingrediente usable_indices[pos].
+    L'indice contiene tutte le ricette, anche quelle con lo stesso vettore di valori di
+    un'altra: con top_k > 1 le ricette a pari score compaiono tutte tra le migliori, come
+    nelle altre strategie. È quindi una cache di tutte le ricette (1.461.546 con 6
+    ingredienti sbloccati), utile solo per insiemi piccoli (vedi INDEX_MAX_UNLOCKED).
+    """
+    total_vars = len(usable_indices)
+    if total_vars > 64:
+        raise ValueError("L'indice supporta al massimo 64 ingredienti.")
+    tenths = coefficients_in_tenths()
+    gusto_unit = [tenths[0][ingr_idx] for ingr_idx in usable_indices]
+    base = MAX_QUANTITY + 1
+    rows = []
+
+    def visit(pos, remaining, gusto, index):
+        if pos == total_vars:
+            rows.append((gusto, index))
+            return
+        for qty in range(min(MAX_QUANTITY, remaining) + 1):
+            visit(pos + 1, remaining - qty, gusto + qty * gusto_unit[pos], index * base + qty)
+
+    visit(0, MAX_TOTAL_UNITS, 0, 0)
+
+    rows.sort()
+    return recipe_columns(usable_indices, [index for _, index in rows])
+
+def recipe_columns(usable_indices, recipes):
+    """
+    Colonne nel formato dell'indice di fattibilità per le ricette indicate come indici
+    "appiattiti" sugli ingredienti usable_indices, nell'ordine dato.
+    """
+    params_order = ['gusto', 'colore', 'gradazione', 'schiuma']
+    total_vars = len(usable_indices)
+    tenths = coefficients_in_tenths()
+    columns = {param: array('h') for param in params_order}
+    columns["mask"] = array('Q')
+    for pos in range(total_vars):
+        columns[f"q{pos}"] = array('B')
+    for index in recipes:
+        combo = index_to_combination(index, total_vars, MAX_QUANTITY + 1)
+        for k, param in enumerate(params_order):
+            columns[param].append(sum(qty * tenths[k][ingr_idx] for qty, ingr_idx in zip(combo, usable_indices)))
+        columns["mask"].append(sum(1 << pos for pos, qty in enumerate(combo) if qty))
+        for pos, qty in enumerate(combo):
+            columns[f"q{pos}"].append(qty)
+    return columns
+
+def write_feasibility_index(path, usable_indices, columns):
+    """
+    Scrive l'indice in formato colonnare: INDEX_MAGIC, una riga JSON di intestazione
+    (ingredienti, numero di righe, impronta dei dati, colonne e relativi tipi) e poi
+    i byte di ogni colonna, nell'ordine dell'intestazione.
+    """
+    header = {
+        "usable": list(usable_indices),
+        "count": len(columns["gusto"]),
+        "data": data_fingerprint(),
+        "byteorder": sys.byteorder,
+        "columns": [[name, column.typecode] for name, column in columns.items()]
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as handle:
+        handle.write(INDEX_MAGIC)
+        handle.write(json.dumps(header).encode() + b"\n")
+        for column in columns.values():
+            column.tofile(handle)
+
+@lru_cache(maxsize=4)
+def _load_feasibility_index(path, mtime):
+    with open(path, "rb") as handle:
+        if handle.readline() != INDEX_MAGIC:
+            return None
+        header = json.loads(handle.readline())
+        columns = {}
+        for name, typecode in header["columns"]:
+            column = array(typecode)
+            column.fromfile(handle, header["count"])
+            if header["byteorder"] != sys.byteorder:
+                column.byteswap()
+            columns[name] = column
+    return header, columns
+
+def load_feasibility_index(path):
+    """
+    Carica un indice scritto da write_feasibility_index, restituendo (intestazione, colonne).
+    Restituisce None se il file non esiste, non è un indice o è stato costruito con dati
+    diversi da quelli attuali. Gli indici caricati restano in memoria finché il file
+    non cambia.
+    """
+    try:
+        loaded = _load_feasibility_index(path, os.path.getmtime(path))
+    except (OSError, ValueError, EOFError):
+        return None
+    if loaded is None or loaded[0]["data"] != data_fingerprint():
+        return None
+    return loaded
+
+def feasibility_index_path(usable_indices, index_dir=None):
+    """
+    Percorso del file dell'indice costruito per usable_indices, se questi corrispondono
+    a un prefisso dell'ordine di sblocco e il file è valido; altrimenti None.
+    """
+    index_dir = index_dir or default_index_dir()
+    usable_indices = sorted(usable_indices)
+    for num_unlocked in range(len(UNLOCKABLE_INGREDIENTS) + 1):
+        if unlock_prefix_indices(num_unlocked) == usable_indices:
+            path = os.path.join(index_dir, f"prefix-{num_unlocked:02d}.idx")
+            loaded = load_feasibility_index(path)
+            if loaded is not None and loaded[0]["usable"] == usable_indices:
+                return path
+            return None
+    return None
+
+def build_index_files(max_unlocked=INDEX_MAX_UNLOCKED, index_dir=None):
+    """
+    Costruisce i file dell'indice per ogni prefisso dell'ordine di sblocco, da 0 fino a
+    max_unlocked ingredienti sbloccati, riportando righe, dimensione e tempo impiegato.
+    """
+    index_dir = index_dir or default_index_dir()
+    for num_unlocked in range(min(max_unlocked, len(UNLOCKABLE_INGREDIENTS)) + 1):
+        start = perf_counter()
+        usable_indices = unlock_prefix_indices(num_unlocked)
+        columns = build_feasibility_index(usable_indices)
+        path = os.path.join(index_dir, f"prefix-{num_unlocked:02d}.idx")
+        write_feasibility_index(path, usable_indices, columns)
+        logger.info(f"Indice con {num_unlocked} ingredienti sbloccati: {len(columns['gusto']):,} ricette, "
+                    f"{os.path.getsize(path) / 1024:,.0f} KiB, {perf_counter() - start:.2f} secondi")
+
+def select_rows(columns, rows):
+    """
+    Restituisce le colonne ristrette alle righe indicate (in ordine crescente).
+    """
+    np = load_numpy()
+    if np is not None:
+        rows = np.asarray(rows, dtype=np.int64)
+        return {name: array(column.typecode, np.frombuffer(column, dtype=column.typecode)[rows].tobytes())
+                for name, column in columns.items()}
+    return {name: array(column.typecode, (column[row] for row in rows)) for name, column in columns.items()}
+
+def index_worker_process(params):
+    """
+    Risponde a una ricerca usando l'indice di fattibilità invece di enumerare le combinazioni.
+    Le righe con il gusto nel range vengono trovate con una ricerca binaria sulla colonna
+    ordinata; le altre virtù e gli ingredienti obbligatori si filtrano sulle colonne
+    (con NumPy, se disponibile): il box in decimi è esatto, quindi ogni candidato è valido.
+    Lo score dei candidati viene poi calcolato con score_from_tenths in ordine di score
+    (approssimato) decrescente, fermandosi appena
+    nessun candidato rimasto può eguagliare il migliore; a parità di score vince la
+    ricetta con indice più basso, come nelle altre strategie.
+    Invece del file ("index_path") si possono passare direttamente le colonne
+    ("columns", sugli ingredienti "column_usable", non ordinate per gusto): è il caso
+    delle ricette conservate dalla risoluzione incrementale. Con "collect" il risultato
+    contiene anche le righe candidate ("rows"), cioè quelle nel box in decimi con gli
+    ingredienti obbligatori.
+    """
+    np = load_numpy()
+    if "index_path" in params:
+        header, columns = load_feasibility_index(params["index_path"])
+        column_usable = header["usable"]
+        sorted_by_gusto = True
+    else:
+        columns = params["columns"]
+        column_usable = params["column_usable"]
+        sorted_by_gusto = False
+    variable_indices = params["variable_indices"]
+    lower_bounds = params["lower_bounds"]
+    ranges = normalize_ranges(params["ranges"])
+    improvements = [] if params.get("trace") else None   # Miglioramenti del best, se tracciati
+    top = TopK(params["top_k"]) if params.get("top_k", 1) > 1 else None
+
+    params_order = ['gusto', 'colore', 'gradazione', 'schiuma']
+    # Le colonne sono costruite sugli ingredienti in ordine di indice: posizioni e maschera
+    # degli obbligatori vanno riportate su quell'ordine
+    index_pos = {ingr_idx: pos for pos, ingr_idx in enumerate(column_usable)}
+    required_mask = 0
+    for pos, ingr_idx in enumerate(variable_indices):
+        if lower_bounds[pos]:
+            required_mask |= 1 << index_pos[ingr_idx]
+    box = tenths_box(ranges)
+    weights, constant = score_weights(ranges)
+
+    best = {"score": -float('inf'), "quantities": None, "values": None, "key": None}
+    stats = {
+        "examined": 0,
+        "skipped_total": 0,
+        "skipped_required": 0,
+        "skipped_range": 0,
+        "valid": 0
+    }
+
+    if sorted_by_gusto:
+        first = bisect_left(columns["gusto"], box[0][0])
+        last = bisect_right(columns["gusto"], box[0][1])
+    else:
+        first, last = 0, len(columns["gusto"])
+    stats["examined"] = last - first
+    if np is not None:
+        block = {name: np.frombuffer(column, dtype=column.typecode)[first:last]
+                 for name, column in columns.items() if name in params_order or name == "mask"}
+        required_ok = (block["mask"] & np.uint64(required_mask)) == np.uint64(required_mask)
+        in_box = np.ones(last - first, dtype=bool)
+        for param, (low, high) in zip(params_order, box):
+            in_box &= (block[param] >= low) & (block[param] <= high)
+        stats["skipped_required"] = int(np.count_nonzero(~required_ok))
+        stats["skipped_range"] = int(np.count_nonzero(required_ok & ~in_box))
+        rows = np.flatnonzero(required_ok & in_box)
+        approx = sum(weights[param] * block[param][rows].astype(float) for param in params_order) / 10
+        order = np.argsort(-approx, kind="stable")
+        candidates = list(zip((approx[order] + constant).tolist(), (rows[order] + first).tolist()))
+        collected = (rows + first).tolist() if params.get("collect") else None
+    else:
+        candidates = []
+        for row in range(first, last):
+            if columns["mask"][row] & required_mask != required_mask:
+                stats["skipped_required"] += 1
+            elif not all(low <= columns[param][row] <= high for param, (low, high) in zip(params_order, box)):
+                stats["skipped_range"] += 1
+            else:
+                approx = sum(weights[param] * columns[param][row] for param in params_order) / 10
+                candidates.append((approx + constant, row))
+        collected = [row for _, row in candidates] if params.get("collect") else None
+        candidates.sort(key=lambda item: -item[0])
+
+    quantity_columns = [columns[f"q{pos}"] for pos in range(len(column_usable))]
+    rechecked = 0
+    for approx, row in candidates:
+        if approx < (top.threshold() if top is not None else best["score"]) - BOUND_EPSILON:
+            break
+        rechecked += 1
+        if rechecked % CANCEL_CHECK_INTERVAL == 0 and search_cancelled():
+            stats["cancelled"] = 1
+            break
+        quantities = [0] * len(ingredienti)
+        for pos, ingr_idx in enumerate(column_usable):
+            quantities[ingr_idx] = quantity_columns[pos][row]
+        tenths = [columns[param][row] for param in params_order]
+        score = score_from_tenths(tenths, ranges)
+        key = [quantities[ingr_idx] for ingr_idx in variable_indices]
+        if top is not None:
+            top.offer(score, key, quantities)
+        if score > best["score"] or (score == best["score"] and key < best["key"]):
+            best.update({"score": score, "quantities": quantities, "values": tenths_to_values(tenths), "key": key})
+            record_improvement(improvements, stats, quantities, score)
+    stats["valid"] = stats["examined"] - stats["skipped_required"] - stats["skipped_range"]
+    stats["index_rows"] = len(columns["gusto"])
+
+    result = {"best_score": best["score"], "best_quantities": best["quantities"],
+              "best_values": best["values"], "stats": stats, "improvements": improvements,
+              "top": top.results() if top else None}
+    if collected is not None:
+        result["rows"] = sorted(collected)
+    return result
+
+# Numero massimo di ricette candidate conservate per la risoluzione incrementale:
+# oltre questo limite la ricerca successiva riparte da zero
+INCREMENTAL_MAX_RECIPES = 500000
+
+@lru_cache(maxsize=8)
+def delta_tables(variable_indices, lower_bounds):
+    """
+    Intervalli raggiungibili da ogni virtù (in decimi interi) per la ricerca delta.
+    """
+    tenths = coefficients_in_tenths()
+    return [contribution_bounds(variable_indices, lower_bounds, tenths[k]) for k in range(4)]
+
+def delta_worker_process(params):
+    """
+    Worker della ricerca incrementale ("delta"). Esplora lo stesso albero della ricerca a
+    somma limitata tenendo i valori in decimi interi e visita solo le ricette nel box dei
+    nuovi range (vedi tenths_box) che non stavano in quello precedente (params["old_box"];
+    None per una ricerca completa). Un sottoalbero viene scartato se nessun completamento
+    può entrare nel nuovo box, oppure se tutti i completamenti stanno nel vecchio box:
+    quelle ricette sono già tra le candidate conservate.
+    Le ricette visitate vengono valutate come in bounded_worker_process e, se stanno nel
+    nuovo box, restituite come indici "appiattiti" in "recipes" (None se superano
+    params["max_recipes"]).
+    """
+    prefix = params["prefix"]
+    variable_indices = params["variable_indices"]
+    lower_bounds = params["lower_bounds"]
+    ranges = normalize_ranges(params["ranges"])
+    old_box = params.get("old_box")
+    max_recipes = params.get("max_recipes", INCREMENTAL_MAX_RECIPES)
+    improvements = [] if params.get("trace") else None   # Miglioramenti del best, se tracciati
+    top = TopK(params["top_k"]) if params.get("top_k", 1) > 1 else None
+
+    best = {"score": -float('inf'), "quantities": None, "values": None}
+    stats = {
+        "examined": 0,
+        "skipped_total": 0,
+        "skipped_required": 0,
+        "skipped_range": 0,
+        "valid": 0,
+        "pruned_range": 0,
+        "pruned_retained": 0
+    }
+    total_vars = len(variable_indices)
+    base = MAX_QUANTITY + 1
+    box = tenths_box(ranges)
+    tenths = coefficients_in_tenths()
+    virtue_bounds = delta_tables(tuple(variable_indices), tuple(lower_bounds))
+    recipes = []
+
+    suffix_min = [0] * (total_vars + 1)
+    for pos in range(total_vars - 1, -1, -1):
+        suffix_min[pos] = suffix_min[pos + 1] + lower_bounds[pos]
+
+    quantities = [0] * len(ingredienti)
+    partial = [0] * 4
+    prefix_index = 0
+    for pos, qty in enumerate(prefix):
+        ingr_idx = variable_indices[pos]
+        quantities[ingr_idx] = qty
+        for k in range(4):
+            partial[k] += qty * tenths[k][ingr_idx]
+        prefix_index = prefix_index * base + qty
+
+    def evaluate(index):
+        nonlocal recipes
+        stats["examined"] += 1
+        if not tenths_in_box(partial, box):
+            stats["skipped_range"] += 1
+            return
+        if recipes is not None:
+            recipes.append(index)
+            if len(recipes) > max_recipes:
+                recipes = None
+        stats["valid"] += 1
+        score = score_from_tenths(partial, ranges)
+        if top is not None and score >= top.threshold():
+            top.offer(score, [quantities[ingr_idx] for ingr_idx in variable_indices], quantities)
+        if score > best["score"]:
+            best["score"] = score
+            best["quantities"] = quantities.copy()
+            best["values"] = tenths_to_values(partial)
+            record_improvement(improvements, stats, best["quantities"], score)
+
+    def promising(pos, remaining):
+        inside_old = old_box is not None
+        for k in range(4):
+            reach_min = partial[k] + virtue_bounds[k][0][pos][remaining]
+            reach_max = partial[k] + virtue_bounds[k][1][pos][remaining]
+            if reach_max < box[k][0] or reach_min > box[k][1]:
+                stats["pruned_range"] += 1
+                return False
+            if inside_old and not (old_box[k][0] <= reach_min and reach_max <= old_box[k][1]):
+                inside_old = False
+        if inside_old:
+            stats["pruned_retained"] += 1
+            return False
+        return True
+
+    nodes = [0]
+
+    def visit(pos, remaining, index):
+        nodes[0] += 1
+        if nodes[0] % CANCEL_CHECK_INTERVAL == 0:
+            if search_cancelled():
+                raise SearchCancelled()
+            report_progress(params, stats, best["score"], best["quantities"])
+        if not promising(pos, remaining):
+            return
+        if pos == total_vars:
+            evaluate(index)
+            return
+        ingr_idx = variable_indices[pos]
+        unit = [tenths[k][ingr_idx] for k in range(4)]
+        max_qty = min(MAX_QUANTITY, remaining - suffix_min[pos + 1])
+        for qty in range(lower_bounds[pos], max_qty + 1):
+            quantities[ingr_idx] = qty
+            for k in range(4):
+                partial[k] += qty * unit[k]
+            visit(pos + 1, remaining - qty, index * base + qty)
+            for k in range(4):
+                partial[k] -= qty * unit[k]
+        quantities[ingr_idx] = 0
+
+    remaining = MAX_TOTAL_UNITS - sum(prefix)
+    if remaining >= suffix_min[len(prefix)] and not search_cancelled():
+        try:
+            visit(len(prefix), remaining, prefix_index)
+        except SearchCancelled:
+            pass
+    if search_cancelled():
+        stats["cancelled"] = 1
+
+    return {"best_score": best["score"], "best_quantities": best["quantities"],
+            "best_values": best["values"], "stats": stats, "improvements": improvements,
+            "top": top.results() if top else None, "recipes": recipes}
+
+class IncrementalState:
+    """
+    Stato della risoluzione incrementale tra una ricerca e la successiva: le ricette
+    candidate dell'ultima ricerca (quelle nel box in decimi dei suoi range e con i suoi
+    ingredienti obbligatori), nel formato colonnare dell'indice di fattibilità.
+    plan() decide come rispondere alla ricerca successiva:
+      - "filter": stessi ingredienti, range solo ristretti e obbligatori solo aggiunti:
+        basta filtrare le ricette conservate;
+      - "delta": stessi ingredienti e obbligatori solo aggiunti, ma qualche range è stato
+        allargato: le ricette conservate vengono filtrate e si cercano solo quelle fuori
+        dal vecchio box (vedi delta_worker_process);
+      - "full": nessuno stato utilizzabile, la ricerca riparte da zero.
+    Oltre max_recipes ricette lo stato non viene conservato.
+    """
+    def __init__(self, max_recipes=INCREMENTAL_MAX_RECIPES):
+        self.max_recipes = max_recipes
+        self.clear()
+
+    def clear(self):
+        self.usable_indices = None
+        self.required_indices = None
+        self.box = None
+        self.columns = None
+
+    def __len__(self):
+        return len(self.columns["gusto"]) if self.columns is not None else 0
+
+    def plan(self, usable_indices, required_indices, box):
+        if (self.columns is None or list(usable_indices) != self.usable_indices
+                or not set(required_indices) >= set(self.required_indices)):
+            return "full"
+        if all(old_low <= low and high <= old_high for (low, high), (old_low, old_high) in zip(box, self.box)):
+            return "filter"
+        return "delta"
+
+    def can_retain(self, usable_indices, required_indices, ranges):
+        """
+        True se le ricette nei range sono al più max_recipes, secondo il limite superiore
+        di feasibility_preview: solo allora una ricerca completa può conservarle tutte.
+        """
+        if not set(required_indices) <= set(usable_indices):
+            return False
+        return feasibility_preview(usable_indices, required_indices, ranges)["max_feasible"] <= self.max_recipes
+
+    def retain(self, usable_indices, required_indices, box, columns):
+        """
+        Conserva le ricette candidate di una ricerca completata (o svuota lo stato se
+        columns è None o contiene troppe ricette).
+        """
+        if columns is None or len(columns["gusto"]) > self.max_recipes:
+            self.clear()
+            return
+        self.usable_indices = list(usable_indices)
+        self.required_indices = list(required_indices)
+        self.box = [tuple(bounds) for bounds in box]
+        self.columns = columns
+
+def update_incremental_state(incremental, mode, strategy, results, usable_indices, required_indices,
+                             ranges, index_path, cancelled):
+    """
+    Aggiorna lo stato incrementale dopo una ricerca: con "filter" resta invariato (le
+    ricette conservate coprono ancora i range più larghi), altrimenti conserva le
+    candidate della nuova ricerca, cioè le righe raccolte dall'indice oppure le ricette
+    conservate ancora nei range unite a quelle trovate dai worker delta.
+    Una ricerca completa annullata svuota lo stato; una delta annullata lo lascia invariato.
+    Una ricerca completa con un'altra strategia non raccoglie le candidate e svuota lo stato.
+    """
+    if mode == "filter":
+        return
+    if cancelled or strategy not in ("index", "delta"):
+        if mode == "full":
+            incremental.clear()
+        return
+    if strategy == "index":
+        columns = None
+        if results and "rows" in results[0]:
+            columns = select_rows(load_feasibility_index(index_path)[1], results[0]["rows"])
+    else:
+        recipes = []
+        columns = None
+        for res in results:
+            if res["chunk_id"] < 0:
+                columns = select_rows(incremental.columns, res["rows"])
+            elif res["recipes"] is None or recipes is None:
+                recipes = None
+            else:
+                recipes.extend(res["recipes"])
+        if recipes is None or len(recipes) > incremental.max_recipes:
+            columns = None
+        else:
+            found = recipe_columns(usable_indices, recipes)
+            columns = found if columns is None else {name: columns[name] + found[name] for name in found}
+    incremental.retain(usable_indices, required_indices, tenths_box(ranges), columns)
+
+# Strategie di ricerca disponibili per find_optimal_combination
+# Obiettivi della ricerca: score, costo minimo, score meno costo pesato, frontiera di Pareto
+OBJECTIVES = ("score", "min_cost", "weighted", "pareto")
+
+STRATEGIES = ("anytime", "bounded", "branch_and_bound", "exact", "flat", "index", "meet_in_the_middle", "numpy",
+              "odometer")
+
+# Strategie eseguite in un solo task nel processo chiamante, senza il pool di processi
+SEQUENTIAL_STRATEGIES = ("exact", "index", "retained", "meet_in_the_middle")
+
+def cached_search(cache, cache_key):
+    """
+    Restituisce il risultato salvato in cache per cache_key, con i tempi riportati a quelli
+    della lettura (il tempo della ricerca originale resta in "cached_execution_time"),
+    oppure None se la ricerca non è in cache.
+    """
+    from time import time
+
+    lookup_start = time()
+    cached = cache.get(cache_key)
+    if cached is None:
+        return None
+    quantities, values, total_stats = cached
+    lookup_time = time() - lookup_start
+    total_stats.update({
+        "cached_execution_time": total_stats["execution_time"],
+        "execution_time": lookup_time,
+        "latency": lookup_time,
+        "pool_warm": True,
+        "pool_startup_time": 0.0,
+        "cache_hit": True,
+        "cache_hits": cache.hits,
+        "cache_misses": cache.misses
+    })
+    logger.info(f"Risultato trovato nella cache ({lookup_time * 1000:.1f} ms)")
+    return quantities, values, total_stats
+
+def resolve_strategy(strategy, usable_indices, required_indices, ranges, index_dir=None, incremental=None):
+    """
+    Strategia effettivamente eseguita per la strategia richiesta, con i dati che le
+    servono: restituisce (strategia, percorso dell'indice o None, modalità incrementale
+    o None, parametri delle ricette conservate o None).
+      - "index" senza un indice per questi ingredienti diventa "anytime";
+      - con un IncrementalState le ricette conservate vengono filtrate ("retained") o
+        completate con la ricerca delle sole ricette fuori dal vecchio box ("delta");
+        una ricerca completa usa "delta" solo se le candidate restano sotto max_recipes
+        (vedi IncrementalState.can_retain), altrimenti la strategia richiesta con il suo
+        bound sullo score.
+    """
+    index_path = None
+    if strategy == "index":
+        index_path = feasibility_index_path(usable_indices, index_dir)
+        if index_path is None:
+            logger.info("Nessun indice di fattibilità per questi ingredienti: uso la strategia 'anytime'")
+            strategy = "anytime"
+    if incremental is None:
+        return strategy, index_path, None, None
+
+    incremental_mode = incremental.plan(usable_indices, required_indices, tenths_box(ranges))
+    retained_params = None
+    if incremental_mode != "full":
+        retained_params = {
+            "columns": incremental.columns,
+            "column_usable": incremental.usable_indices,
+            "collect": incremental_mode == "delta"
+        }
+    if incremental_mode == "filter":
+        strategy = "retained"
+    elif incremental_mode == "delta":
+        strategy = "delta"
+    elif strategy != "index" and incremental.can_retain(usable_indices, required_indices, ranges):
+        strategy = "delta"
+    return strategy, index_path, incremental_mode, retained_params
+
+def search_tasks(strategy, objective, usable_indices, required_indices, ranges, num_workers,
+                 index_path=None, incremental=None, incremental_mode=None, retained_params=None):
+    """
+    Suddivide una ricerca nei task della strategia indicata, che è quella effettiva
+    ("index" senza indice diventa "anytime", la risoluzione incrementale "retained" o
+    "delta"). Restituisce (funzione del worker, parametri dei task, combinazioni da
+    esaminare o None se l'avanzamento si misura sui chunk); senza task se un ingrediente
+    obbligatorio non è utilizzabile.
+    """
+    base = MAX_QUANTITY + 1
+    total_vars = len(usable_indices)
+    worker_params = []
+    search_space = None
+    if strategy in ("flat", "numpy", "odometer"):
+        worker_function = {"flat": worker_process, "numpy": numpy_worker_process,
+                           "odometer": odometer_worker_process}[strategy]
+        flat_space = base ** total_vars
+        search_space = flat_space
+        num_chunks = max(1, min(num_workers * CHUNKS_PER_WORKER, flat_space // MIN_FLAT_CHUNK))
+        partition_size = flat_space // num_chunks
+        for i in range(num_chunks):
+            start_index = i * partition_size
+            end_index = (i + 1) * partition_size if i != num_chunks - 1 else flat_space
+            params = {
+                "start_index": start_index,
+                "end_index": end_index,
+                "variable_indices": usable_indices,
+                "required_indices": required_indices,
+                "ranges": ranges,
+                "worker_id": i
+            }
+            worker_params.append(params)
+    elif strategy == "index":
+        worker_function = index_worker_process
+        lower_bounds = [1 if idx in required_indices else 0 for idx in usable_indices]
+        if all(idx in usable_indices for idx in required_indices):
+            worker_params.append({
+                "index_path": index_path,
+                "variable_indices": usable_indices,
+                "lower_bounds": lower_bounds,
+                "ranges": ranges,
+                "collect": incremental is not None,
+                "worker_id": 0
+            })
+    elif strategy == "retained":
+        worker_function = index_worker_process
+        lower_bounds = [1 if idx in required_indices else 0 for idx in usable_indices]
+        worker_params.append(dict(retained_params, variable_indices=usable_indices,
+                                  lower_bounds=lower_bounds, ranges=ranges, worker_id=0))
+    elif strategy in ("exact", "meet_in_the_middle"):
+        worker_function = exact_worker_process if strategy == "exact" else meet_in_the_middle_worker_process
+        lower_bounds = [1 if idx in required_indices else 0 for idx in usable_indices]
+        if all(idx in usable_indices for idx in required_indices):
+            worker_params.append({
+                "variable_indices": usable_indices,
+                "lower_bounds": lower_bounds,
+                "ranges": ranges,
+                "worker_id": 0
+            })
+    else:
+        if strategy == "branch_and_bound" and objective == "pareto":
+            worker_function = pareto_worker_process
+        elif strategy in ("branch_and_bound", "anytime"):
+            worker_function = branch_and_bound_worker_process
+        elif strategy == "delta":
+            worker_function = delta_worker_process
+        else:
+            worker_function = bounded_worker_process
+        lower_bounds = [1 if idx in required_indices else 0 for idx in usable_indices]
+        # Un ingrediente obbligatorio non sbloccato rende impossibile ogni combinazione
+        if all(idx in usable_indices for idx in required_indices):
+            bounded_total = count_bounded_combinations(lower_bounds)
+            logger.info(f"Combinazioni con totale <= {MAX_TOTAL_UNITS}: {bounded_total:,}\n")
+            # Il branch and bound salta interi sottoalberi: per lui l'avanzamento
+            # si misura sui chunk completati
+            if strategy == "bounded":
+                search_space = bounded_total
+            # Fissa abbastanza variabili iniziali da avere molti più chunk che worker
+            depth = 0
+            prefixes = [[]]
+            while depth < total_vars and len(prefixes) < CHUNKS_PER_WORKER * num_workers:
+                depth += 1
+                prefixes = bounded_prefixes(lower_bounds, depth)
+            for i, prefix in enumerate(prefixes):
+                worker_params.append({
+                    "prefix": prefix,
+                    "variable_indices": usable_indices,
+                    "lower_bounds": lower_bounds,
+                    "ranges": ranges,
+                    "worker_id": i
+                })
+            if strategy == "delta":
+                for params in worker_params:
+                    params["old_box"] = incremental.box if incremental_mode == "delta" else None
+                    params["max_recipes"] = incremental.max_recipes
+    return worker_function, worker_params, search_space
+
+def run_search_tasks(tasks, pool, num_workers, tracker, sequential=False, retained_task=None,
+                     show_heuristic=False, anytime=False, top_k=1):
+    """
+    Esegue i task di una ricerca e restituisce (risultati dei chunk, istante di inizio,
+    pool già attivo, tempo di avvio del pool). Con sequential i task girano nel processo
+    chiamante, altrimenti nel pool (quello passato o uno temporaneo chiuso alla fine).
+    retained_task (le ricette conservate della risoluzione incrementale) viene eseguito
+    prima degli altri nel processo chiamante; con show_heuristic la ricetta euristica
+    viene comunicata subito al tracker e, con anytime, entra nei risultati e il suo
+    score fa da punto di partenza dei task (solo con top_k = 1).
+    """
+    from time import time
+
+    pool_warm = True
+    pool_startup_time = 0.0
+    results = []
+    if sequential:
+        # Il solver esatto, il meet in the middle e l'interrogazione dell'indice (o delle ricette
+        # conservate) sono sequenziali: non serve avviare il pool di processi. Girano nel processo
+        # chiamante e usano direttamente l'evento di annullamento del pool.
+        def forward_progress(message):
+            tracker.update(message)
+            tracker.emit()
+
+        if pool is not None:
+            pool.begin_search()
+        init_worker(pool.cancel_event if pool is not None else None,
+                    forward_progress if tracker.progress_callback is not None else None)
+        start_time = time()
+        try:
+            for task in tasks:
+                results.append(run_chunk(task))
+                tracker.chunk_done(results[-1])
+            tracker.emit(force=True)
+        finally:
+            init_worker(None)
+            if pool is not None:
+                pool.end_search()
+        return results, start_time, pool_warm, pool_startup_time
+
+    solver_pool = pool if pool is not None else SolverPool(num_workers)
+    # Un annullamento arrivato dopo la ricerca precedente non deve fermare questa
+    solver_pool.begin_search()
+    try:
+        pool_warm = solver_pool.is_running()
+        _, pool_startup_time = solver_pool.get()
+        start_time = time()
+        if retained_task is not None:
+            results.append(run_chunk(retained_task))
+        if show_heuristic:
+            init_worker(solver_pool.cancel_event)
+            try:
+                heuristic = run_chunk((heuristic_worker_process, dict(tasks[0][1], worker_id=-1)))
+            finally:
+                init_worker(None)
+            tracker.upper_bound = heuristic["upper_bound"]
+            tracker.offer(heuristic["best_score"], heuristic["best_quantities"])
+            tracker.emit(force=True)
+            if anytime:
+                results.append(heuristic)
+                if top_k == 1 and heuristic["best_quantities"] is not None:
+                    for _, params in tasks:
+                        params["seed_score"] = heuristic["best_score"]
+        results += collect_results(solver_pool, tasks, tracker)
+    finally:
+        solver_pool.end_search()
+        if pool is None:
+            solver_pool.shutdown()
+    return results, start_time, pool_warm, pool_startup_time
+
+def merge_results(results, strategy, objective, usable_indices, ranges, top_k=1, costs=None):
+    """
+    Unisce i risultati dei chunk: somma i contatori delle statistiche, sceglie il best
+    (a parità di score la ricetta con indice più basso sugli ingredienti usable_indices),
+    unisce le migliori top_k ricette in "top_combinations" e, con objective = "pareto",
+    le frontiere dei chunk in "pareto_frontier". Per gli obiettivi di costo lo score
+    delle ricette viene ricalcolato dai valori. Restituisce (quantities, values, score,
+    valore dell'obiettivo, statistiche); le ricette sono PackedRecipe.
+    """
+    # I chunk arrivano in ordine sparso: a parità di score vince la combinazione
+    # con indice più basso, come nella ricerca sequenziale
+    results.sort(key=lambda res: res["chunk_id"])
+
+    def recipe_key(quantities):
+        return [quantities[idx] for idx in usable_indices]
+
+    best_score = -float('inf')
+    best_quantities = None
+    best_values = None
+    total_stats = {"examined": 0, "skipped_total": 0, "skipped_required": 0, "skipped_range": 0, "valid": 0}
+    if strategy == "branch_and_bound" and objective == "pareto":
+        total_stats.update({"pruned_range": 0})
+    elif strategy in ("branch_and_bound", "anytime"):
+        total_stats.update({"pruned_range": 0, "pruned_score": 0, "pruned_cost": 0})
+    if strategy == "delta":
+        total_stats.update({"pruned_range": 0, "pruned_retained": 0})
+    if strategy == "exact":
+        total_stats.update({"dp_states": 0, "dp_peak_states": 0})
+    if strategy == "meet_in_the_middle":
+        total_stats.update({"dp_states": 0, "dp_peak_states": 0, "mitm_left_states": 0, "mitm_right_states": 0})
+    
+    for res in results:
+        if res["best_score"] > best_score or (
+                res["best_quantities"] is not None and res["best_score"] == best_score
+                and recipe_key(res["best_quantities"]) < recipe_key(best_quantities)):
+            best_score = res["best_score"]
+            best_quantities = res["best_quantities"]
+            best_values = res["best_values"]
+        for key in total_stats:
+            total_stats[key] += res["stats"].get(key, 0)
+    
+    best_quantities = pack_quantities(best_quantities)
+    # Unisce le migliori top_k ricette dei worker (con top_k = 1 c'è solo il best)
+    if top_k > 1:
+        merged = [entry for res in results for entry in (res.get("top") or [])]
+        merged.sort(key=lambda entry: (-entry[0], recipe_key(entry[1])))
+    else:
+        merged = [(best_score, best_quantities, best_values)] \
+            if best_quantities is not None else []
+    total_stats["top_combinations"] = [{"quantities": pack_quantities(quantities), "values": values, "score": score}
+                                       for score, quantities, values in merged[:top_k]]
+    best_objective = best_score
+    if objective in ("min_cost", "weighted"):
+        # Per gli obiettivi di costo i worker confrontano il valore dell'obiettivo
+        for entry in total_stats["top_combinations"]:
+            entry.update({"objective": entry["score"], "cost": recipe_cost(entry["quantities"], costs),
+                          "score": calculate_score(entry["values"], ranges)})
+        if best_values is not None:
+            best_score = calculate_score(best_values, ranges)
+    if objective == "pareto":
+        frontier = pareto_frontier(point for res in results for point in res["frontier"])
+        total_stats["pareto_frontier"] = [dict(zip(PARETO_OBJECTIVES, point[:4]), quantities=point[5],
+                                               values=point[5].values())
+                                          for point in frontier]
+    return best_quantities, best_values, best_score, best_objective, total_stats
+
+def log_search_statistics(total_stats, objective="score"):
+    """
+    Scrive sul log le statistiche finali di una ricerca (total_stats di find_optimal_combination).
+    """
+    strategy = total_stats["strategy"]
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("\nSearch statistics:")
+        logger.info("-" * 30)
+        logger.info(f"Total theoretical combinations: {total_stats['total_combinations']:,}")
+        logger.info(f"Examined combinations: {total_stats['examined_combinations']:,}")
+        logger.info(f"Skipped for total > 25: {total_stats['skipped_total']:,}")
+        logger.info(f"Skipped for missing required ingredients: {total_stats['skipped_required']:,}")
+        logger.info(f"Skipped for values out of range: {total_stats['skipped_range']:,}")
+        logger.info(f"Valid combinations: {total_stats['valid_combinations']:,}")
+        if strategy == "branch_and_bound":
+            logger.info(f"Subtrees pruned for values out of range: {total_stats['pruned_range']:,}")
+        if strategy == "branch_and_bound" and objective != "pareto":
+            logger.info(f"Subtrees pruned for score bound: {total_stats['pruned_score']:,}")
+            logger.info(f"Subtrees pruned for cost bound: {total_stats['pruned_cost']:,}")
+        if objective == "pareto":
+            logger.info(f"Pareto frontier: {len(total_stats['pareto_frontier']):,} recipes")
+        if total_stats.get("best_cost") is not None:
+            logger.info(f"Objective: {objective} ({total_stats['cost_tier']} prices), best cost: {total_stats['best_cost']:g}")
+        logger.info(f"Execution time: {total_stats['execution_time']:.2f} seconds")
+        if total_stats["cancelled"]:
+            logger.info("Search cancelled: best result found so far")
+        logger.info(f"Latency: {total_stats['latency']:.2f} seconds "
+                    f"({'warm' if total_stats['pool_warm'] else 'cold'} pool, startup {total_stats['pool_startup_time']:.2f} seconds)")
+        logger.info(f"Workers: {total_stats['num_workers']}, chunks: {total_stats['num_chunks']:,}")
+    for entry in total_stats["worker_timings"]:
+        logger.debug(f"  Worker pid {entry['pid']}: {entry['chunks']} chunks, {entry['busy_time']:.2f} seconds")
+
+def find_optimal_combination(required_ingredients, ranges, unlocked_ingredients, strategy="bounded",
+                             num_workers=None, pool=None, progress_callback=None, cache=None,
+                             index_dir=None, incremental=None, top_k=1, objective="score",
+                             cost_weight=1.0, cost_tier="normal", trait=None, preprocess=True):
+    """
+    Cerca la combinazione ottimale che rispetti:
+      - Totale unità <= 25;
+      - Almeno una unità per ogni ingrediente richiesto;
+      - Valori (gusto, colore, gradazione, schiuma) nei range specificati.
+    Strategie disponibili:
+      - "bounded": ricerca ricorsiva che genera solo le combinazioni con totale <= 25 e
+        con gli ingredienti obbligatori già presenti; i chunk sono i prefissi delle prime
+        variabili;
+      - "branch_and_bound": come "bounded", ma scarta i sottoalberi in cui una virtù non può
+        più rientrare nel proprio range o in cui lo score non può superare il migliore trovato;
+        le statistiche riportano quanti sottoalberi sono stati tagliati;
+      - "anytime": una ricerca euristica veloce (vedi heuristic_worker_process), eseguita nel
+        processo chiamante, trova subito una buona ricetta e uno score massimo teorico; poi il
+        "branch_and_bound", che parte dallo score trovato, la migliora fino all'ottimo. Con
+        progress_callback la ricetta euristica viene comunicata appena pronta, con la distanza
+        ("gap") dallo score massimo; total_stats riporta "heuristic_score", "heuristic_time",
+        "upper_bound" e "gap" (0 se la ricerca è terminata, perché la ricetta è ottima).
+        Con progress_callback anche "bounded", "branch_and_bound" e la ricerca incrementale
+        completa mostrano subito la ricetta euristica, che però non entra nel risultato;
+      - "exact": programmazione dinamica sugli stati raggiungibili (valori in decimi interi)
+        che non enumera le combinazioni; viene eseguita nel processo chiamante;
+      - "meet_in_the_middle": calcola gli stati raggiungibili da ciascuna metà degli
+        ingredienti e li unisce con interrogazioni per intervallo sui range (vedi
+        meet_in_the_middle_worker_process); anche questa nel processo chiamante;
+      - "flat": lo spazio delle combinazioni teoriche viene "appiattito" e suddiviso
+        in intervalli uguali, scartando a posteriori le combinazioni non valide;
+      - "numpy": stessa suddivisione di "flat", ma ogni worker valuta blocchi di indici
+        con operazioni vettorizzate (richiede NumPy); il vincitore è identico a "flat";
+      - "odometer": stessa suddivisione e stesso risultato di "flat", ma ogni worker passa da
+        una combinazione alla successiva aggiornando totale e valori solo per le cifre
+        cambiate (vedi odometer_worker_process);
+      - "index": interroga l'indice di fattibilità precalcolato (vedi build_index_files)
+        in index_dir, nel processo chiamante; l'indice contiene tutte le ricette e viene
+        costruito solo per pochi ingredienti sbloccati: se non esiste un indice per gli ingredienti
+        utilizzabili viene usata la strategia "anytime" (total_stats["strategy"] riporta
+        la strategia effettivamente usata).
+    Il lavoro è diviso in circa CHUNKS_PER_WORKER chunk per worker, assegnati dinamicamente
+    ai processi liberi (imap_unordered): le combinazioni valide si concentrano su pochi
+    chunk e una divisione fissa lascerebbe i worker sbilanciati. num_workers vale di
+    default il numero di CPU; total_stats riporta chunk e tempo di lavoro di ogni processo.
+    Se viene passato un SolverPool i suoi processi vengono riutilizzati (e num_workers è
+    quello del pool); altrimenti viene creato un pool temporaneo chiuso a fine ricerca.
+    total_stats riporta se il pool era già attivo ("pool_warm"), il tempo di avvio dei
+    processi ("pool_startup_time") e la latenza complessiva ("latency").
+    Una ricerca annullata con SolverPool.cancel() termina entro una frazione di secondo
+    e restituisce il miglior risultato trovato fino a quel momento ("cancelled" è True).
+    Se viene passato progress_callback, durante la ricerca viene chiamato (al massimo
+    ogni PROGRESS_INTERVAL secondi) con l'avanzamento e il miglior risultato trovato
+    finora (vedi ProgressTracker).
+    Con top_k > 1 ogni worker conserva le sue migliori top_k ricette distinte in un heap
+    di dimensione fissa (vedi TopK); le liste vengono unite e total_stats["top_combinations"]
+    contiene le migliori top_k ricette (dizionari con "quantities", "values", "score"),
+    a partire da quella restituita.
+    Se viene passato un IncrementalState, la ricerca riusa le ricette candidate della
+    precedente: se i range sono solo stati ristretti e gli obbligatori solo aggiunti le
+    filtra ("retained"), se qualche range è stato allargato cerca solo le ricette fuori
+    dal vecchio box ("delta"), altrimenti esegue una ricerca completa "delta" (o interroga
+    l'indice, con la strategia "index") conservandone le candidate per la volta successiva.
+    La ricerca completa "delta" viene usata solo se le ricette nei range sono sicuramente
+    al più max_recipes (vedi IncrementalState.can_retain): altrimenti viene eseguita la
+    strategia richiesta, con i suoi bound sullo score, e non si conserva nulla.
+    total_stats riporta la modalità ("incremental") e le ricette conservate
+    ("retained_recipes").
+    Se viene passata una ResultCache, una ricerca già eseguita con gli stessi ingredienti
+    e range viene restituita senza ricalcolo ("cache_hit" è True e le statistiche della
+    ricerca sono quelle originali); total_stats riporta i contatori "cache_hits" e
+    "cache_misses". Le ricerche annullate non vengono salvate.
+    Con objective = "min_cost" viene cercata la ricetta nei range dal costo minimo, con
+    objective = "weighted" quella che massimizza score - cost_weight * costo (cost_weight
+    deve essere non negativo, altrimenti il bound sul costo non vale); i costi per
+    unità sono quelli della fascia cost_tier del CSV delle varietà (vedi load_costs).
+    Gli obiettivi di costo richiedono la strategia "branch_and_bound", che scarta i
+    sottoalberi anche in base al costo minimo raggiungibile; l'IncrementalState viene
+    ignorato. total_stats riporta "best_cost" e "best_objective" (le voci di
+    "top_combinations" hanno "cost" e "objective"), mentre "best_score" resta lo score.
+    Con objective = "pareto" (anch'esso con "branch_and_bound") total_stats["pareto_frontier"]
+    contiene le ricette non dominate per score, costo, bonus gourmet e probabilità del
+    tratto trait (di tutti i tratti se None), ciascuna con "quantities", "values" e gli
+    obiettivi di PARETO_OBJECTIVES, per score decrescente; la ricetta restituita è
+    quella con lo score migliore.
+    Con preprocess (default) gli ingredienti vengono ridotti prima della ricerca (vedi
+    reduce_ingredients), tranne che con l'indice o con un IncrementalState: total_stats
+    riporta "reduction" con gli ingredienti tolti, resi obbligatori e accorpati e il
+    fattore di riduzione dello spazio delle combinazioni ("factor").
+    Statistiche iniziali e finali vengono scritte sul log "calculator" (silenzioso
+    di default, vedi configure_logging); al livello TRACE vengono riportati anche
+    i miglioramenti del best di ogni chunk e total_stats contiene "improvements".
+    La ricetta restituita e le "quantities" di "top_combinations" e "pareto_frontier"
+    sono PackedRecipe, utilizzabili come liste di quantità.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Strategia sconosciuta: {strategy}")
+    if strategy == "numpy" and not numpy_available():
+        raise ImportError("La strategia 'numpy' richiede NumPy installato.")
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Obiettivo sconosciuto: {objective}")
+    if objective != "score" and strategy != "branch_and_bound":
+        raise ValueError(f"L'obiettivo '{objective}' richiede la strategia 'branch_and_bound'.")
+    if cost_weight < 0:
+        # Il bound di score - cost_weight * costo assume che il costo non aumenti il valore
+        raise ValueError(f"Il peso del costo deve essere non negativo: {cost_weight}")
+    costs = load_costs(cost_tier) if objective != "score" else None
+    if costs is not None:
+        # Le ricette conservate sono scelte in base allo score, non al costo
+        incremental = None
+
+    from time import time
+
+    if pool is not None:
+        num_workers = pool.num_workers
+    elif num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    ranges = normalize_ranges(ranges)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Range in uso:")
+        for param, (low, high) in ranges.items():
+            logger.debug(f"  {param.capitalize()}: {low} - {high}  (valori accettati: [{low}, {high + 1.0}))")
+
+    # Combina gli ingredienti sbloccati con quelli sempre disponibili, in ordine di indice:
+    # l'ordine decide gli spareggi a parità di score, quindi non deve dipendere da come
+    # è stato costruito unlocked_ingredients (il risultato è riutilizzabile dalla cache)
+    usable_indices = sorted(set(unlocked_ingredients) |
+                            {ingredienti.index(ingr) for ingr in ALWAYS_AVAILABLE})
+
+    # Determina gli indici degli ingredienti richiesti.
+    required_indices = set()
+    for ing in required_ingredients:
+        if isinstance(ing, int):
+            required_indices.add(ing)
+        else:
+            try:
+                required_indices.add(ingredienti.index(ing))
+            except ValueError:
+                pass
+    required_indices = sorted(required_indices)
+
+    cache_key = None
+    if cache is not None:
+        cache_key = search_key(usable_indices, required_indices, ranges, top_k,
+                               {"name": objective, "tier": cost_tier, "weight": float(cost_weight),
+                                "trait": trait, "data": INGREDIENT_TABLE.source}
+                               if costs is not None else None)
+        cached = cached_search(cache, cache_key)
+        if cached is not None:
+            return cached
+
+    total_vars = len(usable_indices)
+    base = MAX_QUANTITY + 1
+    total_theoretical = base ** total_vars
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("=== Statistiche Iniziali ===")
+        logger.info(f"Ingredienti sbloccati totali: {total_vars}")
+        logger.info(f"Ingredienti richiesti: {len(required_indices)}")
+        logger.info(f"Combinazioni teoriche: {total_theoretical:,}")
+        logger.info("============================\n")
+
+    strategy, index_path, incremental_mode, retained_params = resolve_strategy(
+        strategy, usable_indices, required_indices, ranges, index_dir, incremental)
+
+    # Riduzione degli ingredienti: l'indice e la risoluzione incrementale lavorano
+    # sull'insieme completo degli ingredienti utilizzabili, quindi ne restano esclusi
+    reduction = None
+    if preprocess and strategy in STRATEGIES and strategy != "index":
+        reduction = reduce_ingredients(usable_indices, required_indices, ranges,
+                                       collapse=top_k == 1 and objective == "score")
+        usable_indices, required_indices = reduction["usable"], reduction["required"]
+        logger.info(f"Riduzione degli ingredienti: {len(reduction['removed'])} tolti, "
+                    f"{len(reduction['forced'])} resi obbligatori, "
+                    f"{sum(len(group) for group in reduction['collapsed'])} accorpati "
+                    f"(spazio ridotto di {reduction['factor']:,.1f} volte)\n")
+
+    worker_function, worker_params, search_space = search_tasks(
+        strategy, objective, usable_indices, required_indices, ranges, num_workers,
+        index_path, incremental, incremental_mode, retained_params)
+
+    if reduction is not None and reduction["infeasible"]:
+        # Nessuna ricetta può rispettare i range: non serve avviare la ricerca
+        worker_params = []
+
+    search_id = pool.next_search_id() if pool is not None else 0
+    trace = logger.isEnabledFor(TRACE)
+    for params in worker_params:
+        params["search_id"] = search_id
+        params["trace"] = trace
+        params["top_k"] = top_k
+        if objective == "pareto":
+            params.update({"costs": costs, "gourmet": gourmet_bonuses(), "trait_chances": trait_chances(trait)})
+        elif costs is not None:
+            params.update({"objective": objective, "costs": costs, "cost_weight": cost_weight})
+    tasks = [(worker_function, params) for params in worker_params]
+    tracker = ProgressTracker(progress_callback, len(tasks), search_space, search_id)
+    retained_task = None
+    if strategy == "delta" and incremental_mode == "delta" and tasks:
+        # Le ricette conservate che stanno nei nuovi range si filtrano nel processo chiamante;
+        # quelle fuori dal vecchio box le cercano i worker
+        lower_bounds = [1 if idx in required_indices else 0 for idx in usable_indices]
+        retained_task = (index_worker_process, dict(retained_params, variable_indices=usable_indices,
+                                                    lower_bounds=lower_bounds, ranges=ranges, top_k=top_k,
+                                                    worker_id=-1))
+    # La ricetta euristica è pronta subito: viene mostrata come primo risultato e, con
+    # "anytime", il branch and bound parte dal suo score
+    show_heuristic = bool(tasks) and objective == "score" and (strategy == "anytime" or (
+        progress_callback is not None and incremental_mode in (None, "full")
+        and strategy in ("bounded", "branch_and_bound", "delta")))
+    request_start = time()
+    results, start_time, pool_warm, pool_startup_time = run_search_tasks(
+        tasks, pool, num_workers, tracker, sequential=strategy in SEQUENTIAL_STRATEGIES,
+        retained_task=retained_task, show_heuristic=show_heuristic, anytime=strategy == "anytime", top_k=top_k)
+    end_time = time()
+
+    best_global_quantities, best_global_values, best_global_score, best_objective, total_stats = merge_results(
+        results, strategy, objective, usable_indices, ranges, top_k, costs)
+
+    # Rinomina le chiavi per rispettare quanto aspettato da main.py
+    total_stats["examined_combinations"] = total_stats.pop("examined")
+    total_stats["valid_combinations"] = total_stats.pop("valid")
+    
+    total_stats.update({
+        "total_combinations": total_theoretical,
+        "execution_time": end_time - start_time,
+        "best_score": best_global_score if best_global_score > -float('inf') else None,
+        "strategy": strategy,
+        "num_workers": 1 if strategy in SEQUENTIAL_STRATEGIES else num_workers,
+        "num_chunks": len(tasks),
+        "completed_chunks": sum(1 for res in results if res["chunk_id"] >= 0),
+        "cancelled": (any(res["stats"].get("cancelled") for res in results)
+                      or sum(1 for res in results if res["chunk_id"] >= 0) < len(tasks)),
+        "worker_timings": worker_timings(results),
+        "pool_warm": pool_warm,
+        "pool_startup_time": pool_startup_time,
+        "latency": end_time - request_start
+    })
+    if strategy == "anytime":
+        heuristic = next((res for res in results if res["chunk_id"] == -1), None)
+        upper_bound = heuristic["upper_bound"] if heuristic is not None else None
+        if total_stats["best_score"] is not None and not total_stats["cancelled"]:
+            upper_bound = total_stats["best_score"]
+        total_stats.update({
+            "heuristic_score": (heuristic["best_score"]
+                                if heuristic is not None and heuristic["best_quantities"] is not None else None),
+            "heuristic_time": heuristic["elapsed"] if heuristic is not None else None,
+            "upper_bound": upper_bound,
+            "gap": (max(0.0, upper_bound - total_stats["best_score"])
+                    if upper_bound is not None and total_stats["best_score"] is not None else None)
+        })
+    if reduction is not None:
+        total_stats["reduction"] = {key: reduction[key]
+                                    for key in ("removed", "forced", "collapsed", "infeasible", "factor")}
+    if costs is not None:
+        total_stats.update({
+            "objective": objective,
+            "cost_tier": cost_tier,
+            "best_objective": best_objective if best_global_quantities is not None else None,
+            "best_cost": recipe_cost(best_global_quantities, costs) if best_global_quantities is not None else None
+        })
+    if trace:
+        total_stats["improvements"] = log_improvements(results)
+    if incremental is not None:
+        update_incremental_state(incremental, incremental_mode, strategy, results, usable_indices,
+                                 required_indices, ranges, index_path, total_stats["cancelled"])
+        total_stats.update({"incremental": incremental_mode, "retained_recipes": len(incremental)})
+    if cache is not None:
+        total_stats.update({"cache_hit": False, "cache_hits": cache.hits, "cache_misses": cache.misses})
+        if not total_stats["cancelled"]:
+            cache.put(cache_key, (best_global_quantities, best_global_values, total_stats))
+
+    log_search_statistics(total_stats, objective)
+
+    return best_global_quantities, best_global_values, total_stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Strumenti del calcolatore di ricette")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build-index",
+                                       help="costruisce l'indice di fattibilità per i prefissi dell'ordine di sblocco")
+    build_parser.add_argument("--max-unlocked", type=int, default=INDEX_MAX_UNLOCKED,
+                              help=f"numero massimo di ingredienti sbloccati (default {INDEX_MAX_UNLOCKED})")
+    build_parser.add_argument("--dir", default=None, help="cartella dei file dell'indice")
+    args = parser.parse_args()
+
+    configure_logging("INFO")
+    if args.command == "build-index":
+        build_index_files(args.max_unlocked, args.dir)
@@ -1,14 +1,22 @@
+import os
 import sys
+from time import perf_counter
+
+# Istante di avvio di main.py: i tempi di startup della finestra sono misurati da qui
+STARTUP_START = perf_counter()
+
 from PySide6.QtCore import Qt, Signal, QRect, QPoint, QThread, QTimer
 from PySide6.QtGui import QPainter, QPen, QColor, QFont, QIcon, QFontDatabase, QPainterPath, QPalette
 from PySide6.QtWidgets import (
     QWidget, QApplication, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QMainWindow, 
-    QPushButton, QCheckBox, QTextEdit, QScrollArea, QFrame, QGraphicsDropShadowEffect, QSizePolicy
+    QPushButton, QCheckBox, QTextEdit, QScrollArea, QFrame, QSizePolicy,
+    QListWidget
 )
 from math import cos, sin, pi
 
 # Import calculator functions and data from calculator.py
-from calculator import ingredienti, INGREDIENTI_ORDINE_SBLOCCO, UNLOCKABLE_INGREDIENTS, find_optimal_combination, ALWAYS_AVAILABLE
+from calculator import ingredienti, INGREDIENTI_ORDINE_SBLOCCO, UNLOCKABLE_INGREDIENTS, find_optimal_combination, ALWAYS_AVAILABLE, SolverPool, configure_logging
+from calculator import ResultCache, IncrementalState, default_cache_path, feasibility_preview, PARETO_MAX_INGREDIENTS
 
 class SpinningLoader(QWidget):
     def __init__(self, parent=None, size=32, color=QColor(74, 158, 255)):
@@ -60,17 +68,58 @@ class SpinningLoader(QWidget):
 
 class CalculationWorker(QThread):
     finished = Signal(tuple)
+    progress = Signal(dict)
     
-    def __init__(self, required_ingredients, ranges, unlocked_ingredients):
+    def __init__(self, required_ingredients, ranges, unlocked_ingredients, solver_pool=None, result_cache=None,
+                 incremental_state=None, objective="score"):
         super().__init__()
         self.required_ingredients = required_ingredients
         self.ranges = ranges
         self.unlocked_ingredients = unlocked_ingredients
+        self.solver_pool = solver_pool
+        self.result_cache = result_cache
+        self.incremental_state = incremental_state
+        self.objective = objective
         
     def run(self):
-        result = find_optimal_combination(self.required_ingredients, self.ranges, self.unlocked_ingredients)
+        # L'avanzamento arriva dal thread di calcolo: il segnale lo consegna al thread della GUI.
+        # Se è stato costruito l'indice di fattibilità (python calculator.py build-index) la
+        # risposta è immediata, altrimenti compare subito una ricetta euristica (con la distanza
+        # dallo score massimo teorico) che la ricerca completa migliora fino all'ottimo
+        if self.objective == "pareto":
+            # La frontiera di Pareto (score, costo, gourmet, tratti) si calcola con il branch and bound
+            result = find_optimal_combination(self.required_ingredients, self.ranges, self.unlocked_ingredients,
+                                              strategy="branch_and_bound", pool=self.solver_pool,
+                                              progress_callback=self.progress.emit, cache=self.result_cache,
+                                              objective="pareto")
+            self.finished.emit(result)
+            return
+        result = find_optimal_combination(self.required_ingredients, self.ranges, self.unlocked_ingredients,
+                                          strategy="index", pool=self.solver_pool,
+                                          progress_callback=self.progress.emit, cache=self.result_cache,
+                                          incremental=self.incremental_state, top_k=TOP_RESULTS)
         self.finished.emit(result)
 
+    def cancel(self):
+        # I worker si fermano al prossimo controllo e restituiscono il miglior risultato trovato.
+        # Finiti i task (unione dei risultati, cache, stato incrementale) non c'è più nulla
+        # da annullare: cancel_search() non ha effetto e non ferma la ricerca successiva
+        if self.solver_pool is not None:
+            self.solver_pool.cancel_search()
+
+class FeasibilityWorker(QThread):
+    finished = Signal(dict)
+
+    def __init__(self, required_ingredients, ranges, unlocked_ingredients):
+        super().__init__()
+        self.required_ingredients = required_ingredients
+        self.ranges = ranges
+        self.unlocked_ingredients = unlocked_ingredients
+
+    def run(self):
+        # Le tabelle dei valori raggiungibili restano in cache finché non cambiano gli ingredienti
+        self.finished.emit(feasibility_preview(self.unlocked_ingredients, self.required_ingredients, self.ranges))
+
 class SquareSlider(QWidget):
     valueChanged = Signal(int, int)
 
@@ -85,6 +134,8 @@ class SquareSlider(QWidget):
         self._cell_spacing = 2
         self._selection_start = None
         self._current_cell = None
+        # Valori raggiungibili da almeno una ricetta (None: tutti); gli altri sono in grigio
+        self._reachable = None
         self._font = QFont("Alegreya", 11)
         self._font.setBold(True)
         self.setMinimumHeight(45)
@@ -112,10 +163,11 @@ class SquareSlider(QWidget):
 
         for i in range(self.num_cells):
             rect = self.cellRect(i)
+            reachable = self._reachable is None or i in self._reachable
             if self._low <= i <= self._high:
-                painter.setBrush(QColor(100, 150, 250))
+                painter.setBrush(QColor(100, 150, 250) if reachable else QColor(90, 105, 140))
             else:
-                painter.setBrush(QColor(200, 200, 200))
+                painter.setBrush(QColor(200, 200, 200) if reachable else QColor(120, 120, 120))
             
             if self._selection_start is not None and i == self._current_cell:
                 painter.setBrush(QColor(150, 200, 250))
@@ -129,7 +181,7 @@ class SquareSlider(QWidget):
             text_height = metrics.height()
             text_x = rect.x() + (rect.width() - text_width) / 2
             text_y = rect.y() + (rect.height() + text_height) / 2 - 3
-            painter.setPen(QColor("black"))
+            painter.setPen(QColor("black") if reachable else QColor(70, 70, 70))
             painter.drawText(int(text_x), int(text_y), text)
 
     def mousePressEvent(self, event):
@@ -186,6 +238,12 @@ class SquareSlider(QWidget):
             self.valueChanged.emit(self._low, self._high)
             self.update()
 
+    def setReachable(self, values):
+        reachable = set(values) if values is not None else None
+        if reachable != self._reachable:
+            self._reachable = reachable
+            self.update()
+
     def setLowHigh(self, low, high):
         if low > high:
             low, high = high, low
@@ -242,20 +300,179 @@ class OutlinedLabel(QLabel):
         painter.strokePath(path, pen)
         painter.setPen(self.text_color)
         painter.fillPath(path, self.text_color)
+# Numero di ricette mostrate per ogni ricerca: la migliore e le alternative
+TOP_RESULTS = 5
+
+# Attesa (in millisecondi) dall'ultimo cambio di range o ingredienti prima di aggiornare
+# l'anteprima di fattibilità: durante il trascinamento degli slider non viene ricalcolata
+FEASIBILITY_DEBOUNCE_MS = 40
+
+# Foglio di stile unico dell'applicazione: viene analizzato una sola volta invece di un
+# foglio per widget; i widget vengono selezionati tramite objectName. Lo sfondo compare
+# solo quando la finestra ha la proprietà backgroundLoaded (dopo il primo disegno)
+APP_STYLESHEET = """
+    * {
+        font-family: Alegreya;
+        font-weight: bold;
+    }
+    QLabel {
+        background: none;
+        background-color: transparent;
+    }
+    QMainWindow[backgroundLoaded="true"] {
+        background-image: url(background.jpg);
+        background-repeat: no-repeat;
+        background-position: center;
+    }
+    QFrame#panel {
+        background-color: rgba(30, 30, 30, 180);
+        border-radius: 10px;
+    }
+    QFrame#headerSeparator {
+        background-color: rgba(255, 255, 255, 0);
+        width: 1px;
+    }
+    QFrame#contentSeparator {
+        background-color: rgba(255, 255, 255, 100);
+        width: 1px;
+    }
+    QLabel#columnHeader {
+        color: white;
+        font-size: 13px;
+        padding: 2px;
+    }
+    QLabel#ingredientLabel {
+        color: white;
+        font-size: 14px;
+        padding: 1px;
+    }
+    QCheckBox#ingredientCheck {
+        color: white;
+        font-size: 14px;
+    }
+    QLabel#rangeLabel {
+        color: white;
+        font-size: 14px;
+    }
+    QLabel#reachLabel {
+        color: rgb(190, 190, 190);
+        font-size: 12px;
+    }
+    QLabel#feasibilityLabel {
+        color: white;
+        font-size: 13px;
+        padding: 2px;
+    }
+    QScrollArea#ingredientsScroll {
+        border: none;
+        background-color: transparent;
+    }
+    QScrollArea#ingredientsScroll QScrollBar:vertical {
+        width: 12px;
+        background: rgba(0, 0, 0, 100);
+        border-radius: 6px;
+    }
+    QScrollArea#ingredientsScroll QScrollBar::handle:vertical {
+        background: rgba(255, 255, 255, 150);
+        border-radius: 6px;
+        min-height: 20px;
+    }
+    QScrollArea#ingredientsScroll QScrollBar::add-line:vertical,
+    QScrollArea#ingredientsScroll QScrollBar::sub-line:vertical {
+        height: 0px;
+    }
+    QScrollArea#ingredientsScroll QScrollBar::add-page:vertical,
+    QScrollArea#ingredientsScroll QScrollBar::sub-page:vertical {
+        background: none;
+    }
+    QPushButton#actionButton {
+        font-size: 20px;
+        padding: 8px;
+        background-color: rgba(30, 30, 30, 180);
+        color: #FFD700;  /* Colore oro */
+        border-radius: 10px;
+        border: 3px solid black;  /* Bordo nero per l'outline */
+    }
+    QPushButton#actionButton:hover {
+        background-color: rgba(50, 50, 50, 200);
+    }
+    QPushButton#actionButton:pressed {
+        background-color: rgba(20, 20, 20, 200);
+        padding-top: 10px;
+    }
+    QPushButton#actionButton:disabled {
+        background-color: rgba(30, 30, 30, 100);
+        color: rgba(255, 215, 0, 128);  /* Oro semi-trasparente quando disabilitato */
+    }
+    QTextEdit#resultText {
+        background-color: rgba(30, 30, 30, 180);
+        color: white;
+        border-radius: 10px;
+        padding: 8px;
+        font-size: 14px;
+    }
+    QLabel#loadingLabel {
+        color: white;
+        font-size: 14px;
+        padding: 5px;
+    }
+    QListWidget#frontierList {
+        background-color: rgba(30, 30, 30, 180);
+        color: white;
+        border-radius: 10px;
+        padding: 4px;
+        font-size: 13px;
+    }
+    QListWidget#frontierList::item:selected {
+        background-color: rgba(255, 215, 0, 90);
+    }
+"""
+
+def setup_application(app):
+    """
+    Carica i font Alegreya e applica font e foglio di stile comuni a tutta l'applicazione.
+    """
+    font_id = QFontDatabase.addApplicationFont("fonts/Alegreya-Regular.ttf")
+    font_id_bold = QFontDatabase.addApplicationFont("fonts/Alegreya-Bold.ttf")
+
+    if font_id == -1 or font_id_bold == -1:
+        print("Warning: Could not load Alegreya font. Falling back to system font.")
+
+    global_font = QFont("Alegreya", 12)
+    global_font.setBold(True)
+    app.setFont(global_font)
+    app.setStyleSheet(APP_STYLESHEET)
+
 class MainWindow(QMainWindow):
+    # Emesso quando l'avvio è completo, con i tempi (in secondi da STARTUP_START) di
+    # "window" (finestra costruita), "first_paint" (primo disegno) e "ready" (sfondo,
+    # pool e cache caricati dopo il primo disegno)
+    startupFinished = Signal(dict)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Ale Abbey Monastery Brewery Tycoon Calculator")
         self.setMinimumSize(1366, 800)  # Dimensione minima della finestra
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
-        self.setStyleSheet("""
-            QMainWindow {
-                background-image: url(background.jpg);
-                background-repeat: no-repeat;
-                background-position: center;
-            }
-        """)
+        # Pool di processi condiviso da tutte le ricerche e risultati delle ricerche già
+        # eseguite: vengono creati dopo il primo disegno della finestra (finish_startup)
+        self.solver_pool = None
+        self.result_cache = None
+        # Ricette candidate dell'ultima ricerca: se si restringe un range o si aggiunge un
+        # ingrediente obbligatorio la ricerca successiva le filtra invece di ripartire da zero
+        self.incremental_state = IncrementalState()
+        self.worker = None
+        self.startup_times = {}
+
+        # Anteprima di fattibilità: ricalcolata in background, FEASIBILITY_DEBOUNCE_MS dopo
+        # l'ultimo cambio di range o di ingredienti
+        self.feasibility_worker = None
+        self.feasibility_pending = False
+        self.feasibility_timer = QTimer(self)
+        self.feasibility_timer.setSingleShot(True)
+        self.feasibility_timer.setInterval(FEASIBILITY_DEBOUNCE_MS)
+        self.feasibility_timer.timeout.connect(self.update_feasibility)
 
         central_widget = QWidget(self)
         self.setCentralWidget(central_widget)
@@ -277,22 +494,7 @@ class MainWindow(QMainWindow):
         ingredients_frame = QFrame(self)
         ingredients_frame.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         ingredients_frame.setFrameShape(QFrame.StyledPanel)
-        ingredients_frame.setStyleSheet("""
-            QFrame {
-                background-color: rgba(30, 30, 30, 180);
-                border-radius: 10px;
-            }
-            QLabel {
-                background: none;
-                background-color: transparent;
-            }
-        """)
-        ingredients_shadow = QGraphicsDropShadowEffect()
-        ingredients_shadow.setBlurRadius(15)
-        ingredients_shadow.setXOffset(3)
-        ingredients_shadow.setYOffset(3)
-        ingredients_shadow.setColor(QColor(0, 0, 0, 160))
-        ingredients_frame.setGraphicsEffect(ingredients_shadow)
+        ingredients_frame.setObjectName("panel")
 
         ingredients_layout = QVBoxLayout(ingredients_frame)
         ingredients_label = OutlinedLabel(" Lista Ingredienti", self)
@@ -316,8 +518,8 @@ class MainWindow(QMainWindow):
         left_header.setSpacing(0)
         
         left_header.addStretch(3)
-        left_header.addWidget(QLabel("Sbloccato", self), stretch=1, alignment=Qt.AlignCenter)
-        left_header.addWidget(QLabel("Obbligatorio", self), stretch=1, alignment=Qt.AlignCenter)
+        left_header.addWidget(self.column_header("Sbloccato"), stretch=1, alignment=Qt.AlignCenter)
+        left_header.addWidget(self.column_header("Obbligatorio"), stretch=1, alignment=Qt.AlignCenter)
         
         # Header colonna destra
         right_header = QHBoxLayout()
@@ -325,64 +527,27 @@ class MainWindow(QMainWindow):
         right_header.setSpacing(0)
         
         right_header.addStretch(3)
-        right_header.addWidget(QLabel("Sbloccato", self), stretch=1, alignment=Qt.AlignCenter)
-        right_header.addWidget(QLabel("Obbligatorio", self), stretch=1, alignment=Qt.AlignCenter)
+        right_header.addWidget(self.column_header("Sbloccato"), stretch=1, alignment=Qt.AlignCenter)
+        right_header.addWidget(self.column_header("Obbligatorio"), stretch=1, alignment=Qt.AlignCenter)
         
         # Aggiunta degli header al layout principale
         header_separator = QFrame()
         header_separator.setFrameShape(QFrame.VLine)
         header_separator.setFrameShadow(QFrame.Sunken)
-        header_separator.setStyleSheet("""
-            QFrame {
-                background-color: rgba(255, 255, 255, 0);
-                width: 1px;
-            }
-        """)
+        header_separator.setObjectName("headerSeparator")
         
         header_layout.addLayout(left_header)
         header_layout.addSpacing(10)
         header_layout.addWidget(header_separator)
         header_layout.addSpacing(5)
         header_layout.addLayout(right_header)
-        
-        # Stile per le label degli header
-        for label in self.findChildren(QLabel):
-            if label.parent() == self and label.text() in ["Sbloccato", "Obbligatorio"]:
-                label.setStyleSheet("""
-                    color: white;
-                    font-family: Alegreya;
-                    font-size: 13px;
-                    font-weight: bold;
-                    padding: 2px;
-                """)
-                
+
         ingredients_layout.addLayout(header_layout)
                 # Area scrollabile per gli ingredienti
         scroll_area = QScrollArea(self)
         scroll_area.setWidgetResizable(True)
         scroll_area.setMinimumHeight(150)
-        scroll_area.setStyleSheet("""
-            QScrollArea {
-                border: none;
-                background-color: transparent;
-            }
-            QScrollBar:vertical {
-                width: 12px;
-                background: rgba(0, 0, 0, 100);
-                border-radius: 6px;
-            }
-            QScrollBar::handle:vertical {
-                background: rgba(255, 255, 255, 150);
-                border-radius: 6px;
-                min-height: 20px;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background: none;
-            }
-        """)
+        scroll_area.setObjectName("ingredientsScroll")
         # Widget per la lista degli ingredienti
         ing_widget = QWidget()
         ing_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
@@ -413,6 +578,12 @@ class MainWindow(QMainWindow):
 
         # Calcoliamo il punto medio della lista ingredienti
         mid_point = len(INGREDIENTI_ORDINE_SBLOCCO) // 2
+
+        # Palette dei checkbox degli ingredienti sbloccati, condivisa da tutte le righe
+        palette = QPalette()
+        palette.setColor(QPalette.Active, QPalette.Highlight, QColor("#90EE90"))  # Verde per checkbox attivi
+        palette.setColor(QPalette.Inactive, QPalette.Highlight, QColor("#90EE90"))  # Verde anche per stato inattivo
+        palette.setColor(QPalette.Disabled, QPalette.Highlight, QColor("#808080"))  # Grigio per disabilitati
         
         # Creazione delle righe per ogni ingrediente
         for i, ingr in enumerate(INGREDIENTI_ORDINE_SBLOCCO):
@@ -421,49 +592,26 @@ class MainWindow(QMainWindow):
             row_layout.setContentsMargins(0, 0, 0, 0)
             
             ingr_label = QLabel(ingr, self)
-            ingr_label.setStyleSheet("""
-                color: white;
-                font-family: Alegreya;
-                font-size: 14px;
-                font-weight: bold;
-                padding: 1px;
-            """)
+            ingr_label.setObjectName("ingredientLabel")
             ingr_label.setFixedHeight(16)
             ingr_label.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
             row_layout.addWidget(ingr_label, stretch=3, alignment=Qt.AlignLeft)
 
             unlocked_cb = QCheckBox(self)
-            unlocked_cb.setStyleSheet("""
-                QCheckBox {
-                    color: white;
-                    font-family: Alegreya;
-                    font-size: 14px;
-                    font-weight: bold;
-                }
-            """)
-            
-            palette = QPalette()
-            palette.setColor(QPalette.Active, QPalette.Highlight, QColor("#90EE90"))  # Verde per checkbox attivi
-            palette.setColor(QPalette.Inactive, QPalette.Highlight, QColor("#90EE90"))  # Verde anche per stato inattivo
-            palette.setColor(QPalette.Disabled, QPalette.Highlight, QColor("#808080"))  # Grigio per disabilitati
-            
+            unlocked_cb.setObjectName("ingredientCheck")
             unlocked_cb.setPalette(palette)
                         
             if ingr in ALWAYS_AVAILABLE:
                 unlocked_cb.setChecked(True)
                 unlocked_cb.setEnabled(False)
+            unlocked_cb.toggled.connect(lambda _: self.schedule_feasibility())
+            unlocked_cb.toggled.connect(lambda _: self.update_pareto_button())
             self.unlocked_checkboxes[ingr] = unlocked_cb
             row_layout.addWidget(unlocked_cb, stretch=1, alignment=Qt.AlignCenter)
 
             required_cb = QCheckBox(self)
-            required_cb.setStyleSheet("""
-                    QCheckBox {
-                    color: white;
-                    font-family: Alegreya;
-                    font-size: 14px;
-                    font-weight: bold;
-                }
-            """)
+            required_cb.setObjectName("ingredientCheck")
+            required_cb.toggled.connect(lambda _: self.schedule_feasibility())
             self.required_checkboxes[ingr] = required_cb
             row_layout.addWidget(required_cb, stretch=1, alignment=Qt.AlignCenter)
 
@@ -475,12 +623,7 @@ class MainWindow(QMainWindow):
         content_separator = QFrame()
         content_separator.setFrameShape(QFrame.VLine)
         content_separator.setFrameShadow(QFrame.Sunken)
-        content_separator.setStyleSheet("""
-            QFrame {
-                background-color: rgba(255, 255, 255, 100);
-                width: 1px;
-            }
-        """)
+        content_separator.setObjectName("contentSeparator")
         
         list_layout.addWidget(left_column_widget)
         list_layout.addSpacing(10)
@@ -504,26 +647,12 @@ class MainWindow(QMainWindow):
         virtues_frame = QFrame(self)
         virtues_frame.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         virtues_frame.setFrameShape(QFrame.StyledPanel)
-        virtues_frame.setStyleSheet("""
-            QFrame {
-                background-color: rgba(30, 30, 30, 180);
-                border-radius: 10px;
-            }
-            QLabel {
-                background: none;
-                background-color: transparent;
-            }
-        """)
-        virtues_shadow = QGraphicsDropShadowEffect()
-        virtues_shadow.setBlurRadius(15)
-        virtues_shadow.setXOffset(3)
-        virtues_shadow.setYOffset(3)
-        virtues_shadow.setColor(QColor(0, 0, 0, 160))
-        virtues_frame.setGraphicsEffect(virtues_shadow)
+        virtues_frame.setObjectName("panel")
 
         self.parameters = ["gusto", "colore", "gradazione", "schiuma"]
         self.sliders = {}
         self.param_labels = {}
+        self.reach_labels = {}
 
         virtues_layout = QVBoxLayout(virtues_frame)
         # Titolo principale del pannello Virtù con OutlinedLabel
@@ -559,15 +688,17 @@ class MainWindow(QMainWindow):
             title_layout.addWidget(title_label, alignment=Qt.AlignLeft)
             
             title_layout.addStretch()
-            
+
+            # Intervallo raggiungibile dalla virtù con gli ingredienti scelti
+            reach_label = QLabel("", self)
+            reach_label.setFixedHeight(25)
+            reach_label.setObjectName("reachLabel")
+            title_layout.addWidget(reach_label)
+            self.reach_labels[param] = reach_label
+
             range_label = QLabel("min 0 - max 10", self)
             range_label.setFixedHeight(25)
-            range_label.setStyleSheet("""
-                color: white;
-                font-family: Alegreya;
-                font-size: 14px;
-                font-weight: bold;
-            """)
+            range_label.setObjectName("rangeLabel")
             title_layout.addWidget(range_label)
             self.param_labels[param] = range_label
             
@@ -583,27 +714,23 @@ class MainWindow(QMainWindow):
             slider = SquareSlider(0, 10, self)
             slider.setMinimumHeight(40)
             slider.valueChanged.connect(lambda low, high, p=param: self.updateParameterLabel(p, low, high))
+            slider.valueChanged.connect(lambda low, high: self.schedule_feasibility())
             self.sliders[param] = slider
             
             param_layout.addWidget(slider)
             virtues_layout.addLayout(param_layout)
+
+        # Ricette possibili con gli ingredienti e i range scelti (vedi update_feasibility)
+        self.feasibility_label = QLabel("", self)
+        self.feasibility_label.setObjectName("feasibilityLabel")
+        self.feasibility_label.setWordWrap(True)
+        virtues_layout.addWidget(self.feasibility_label)
         
         # Pannello Risultati
         results_frame = QFrame(self)
         results_frame.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         results_frame.setFrameShape(QFrame.StyledPanel)
-        results_frame.setStyleSheet("""
-            QFrame {
-                background-color: rgba(30, 30, 30, 180);
-                border-radius: 10px;
-            }
-        """)
-        results_shadow = QGraphicsDropShadowEffect()
-        results_shadow.setBlurRadius(15)
-        results_shadow.setXOffset(3)
-        results_shadow.setYOffset(3)
-        results_shadow.setColor(QColor(0, 0, 0, 160))
-        results_frame.setGraphicsEffect(results_shadow)
+        results_frame.setObjectName("panel")
 
         results_layout = QVBoxLayout(results_frame)
 
@@ -611,59 +738,32 @@ class MainWindow(QMainWindow):
         self.compute_button = QPushButton("Trova Ricetta", self)
         icon = QIcon("search_icon.png")
         self.compute_button.setIcon(icon)
-        self.compute_button.setStyleSheet("""
-            QPushButton {
-                font-size: 20px;
-                font-family: Alegreya;
-                padding: 8px;
-                background-color: rgba(30, 30, 30, 180);
-                color: #FFD700;  /* Colore oro */
-                border-radius: 10px;
-                font-weight: bold;
-                border: 3px solid black;  /* Bordo nero per l'outline */
-            }
-            QPushButton:hover {
-              background-color: rgba(50, 50, 50, 200);
-            }
-            QPushButton:pressed {
-                background-color: rgba(20, 20, 20, 200);
-                padding-top: 10px;
-            }
-            QPushButton:disabled {
-                background-color: rgba(30, 30, 30, 100);
-                color: rgba(255, 215, 0, 128);  /* Oro semi-trasparente quando disabilitato */
-            }
-        """)
-        button_shadow = QGraphicsDropShadowEffect()
-        button_shadow.setBlurRadius(15)
-        button_shadow.setXOffset(3)
-        button_shadow.setYOffset(3)
-        button_shadow.setColor(QColor(0, 0, 0, 160))
-        self.compute_button.setGraphicsEffect(button_shadow)
+        self.compute_button.setObjectName("actionButton")
         self.compute_button.clicked.connect(self.compute_combination)
-        results_layout.addWidget(self.compute_button)
+
+        # Pulsante per annullare una ricerca in corso
+        self.cancel_button = QPushButton("Annulla", self)
+        self.cancel_button.setObjectName("actionButton")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_computation)
+
+        # Pulsante per calcolare la frontiera di Pareto tra score, costo, gourmet e tratti
+        self.pareto_button = QPushButton("Frontiera", self)
+        self.pareto_button.setObjectName("actionButton")
+        self.pareto_button.clicked.connect(self.compute_frontier)
+        self.update_pareto_button()
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(self.compute_button, 3)
+        buttons_layout.addWidget(self.pareto_button, 2)
+        buttons_layout.addWidget(self.cancel_button, 1)
+        results_layout.addLayout(buttons_layout)
 
         # Results text area
         self.result_text = QTextEdit(self)
         self.result_text.setReadOnly(True)
         self.result_text.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.result_text.setStyleSheet("""
-            QTextEdit {
-                background-color: rgba(30, 30, 30, 180);
-                color: white;
-                border-radius: 10px;
-                padding: 8px;
-                font-family: Alegreya;
-                font-size: 14px;
-                font-weight: bold;
-            }
-        """)
-        result_shadow = QGraphicsDropShadowEffect()
-        result_shadow.setBlurRadius(15)
-        result_shadow.setXOffset(3)
-        result_shadow.setYOffset(3)
-        result_shadow.setColor(QColor(0, 0, 0, 160))
-        self.result_text.setGraphicsEffect(result_shadow)
+        self.result_text.setObjectName("resultText")
 
         self.loading_widget = QWidget(self.result_text)
         loading_layout = QHBoxLayout(self.loading_widget)
@@ -674,43 +774,73 @@ class MainWindow(QMainWindow):
         loading_layout.addWidget(self.spinner)
         
         self.loading_label = QLabel("Ricerca in corso...\nAttendi mentre calcolo la combinazione ottimale...", self)
-        self.loading_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-family: Alegreya;
-                font-size: 14px;
-                font-weight: bold;
-                padding: 5px;
-                background-color: transparent;
-            }
-        """)
+        self.loading_label.setObjectName("loadingLabel")
         loading_layout.addWidget(self.loading_label)
         loading_layout.addStretch()
         
         self.loading_widget.hide()
         results_layout.addWidget(self.result_text)
 
+        # Ricette della frontiera di Pareto: selezionandone una viene mostrata nei risultati
+        self.frontier_list = QListWidget(self)
+        self.frontier_list.setObjectName("frontierList")
+        self.frontier_list.currentRowChanged.connect(self.show_frontier_entry)
+        self.frontier_list.hide()
+        self.frontier = []
+        results_layout.addWidget(self.frontier_list)
+
         # Aggiunta dei pannelli al layout inferiore
         bottom_layout.addWidget(virtues_frame, 3)
         bottom_layout.addWidget(results_frame, 4)
 
         # Aggiunta del layout inferiore al layout principale
         main_layout.addLayout(bottom_layout)
+        self.startup_times["window"] = perf_counter() - STARTUP_START
+
+    def column_header(self, text):
+        label = QLabel(text, self)
+        label.setObjectName("columnHeader")
+        return label
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        # Primo disegno: il resto dell'avvio prosegue al prossimo giro del ciclo degli eventi
+        if "first_paint" not in self.startup_times:
+            self.startup_times["first_paint"] = perf_counter() - STARTUP_START
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """
+        Completa l'avvio dopo il primo disegno: sfondo, pool di processi e cache
+        dei risultati. Viene chiamato anche prima di una ricerca, nel caso non sia ancora avvenuto.
+        """
+        if self.solver_pool is not None:
+            return
+        # Pool di processi condiviso da tutte le ricerche: i processi partono al primo
+        # calcolo e vengono chiusi alla chiusura della finestra
+        self.solver_pool = SolverPool()
+        # Risultati delle ricerche già eseguite, conservati anche tra un avvio e l'altro
+        self.result_cache = ResultCache(default_cache_path())
+        self.setProperty("backgroundLoaded", True)
+        self.style().unpolish(self)
+        self.style().polish(self)
+        self.update()
+        self.schedule_feasibility()
+        self.startup_times["ready"] = perf_counter() - STARTUP_START
+        self.startupFinished.emit(dict(self.startup_times))
 
     def updateParameterLabel(self, param, low, high):
         label = self.param_labels.get(param)
         if label:
             label.setText(f"min {low} - max {high}")
 
-    def compute_combination(self):
-        self.compute_button.setEnabled(False)
-        self.result_text.clear()
-        self.loading_widget.show()
-        self.spinner.start()
-        
+    def current_selection(self):
+        """
+        Ingredienti obbligatori, ingredienti sbloccati (indici) e range scelti nella finestra.
+        """
         required_ingredients = []
         unlocked_ingredients = []
-        
+
         for ingr in ingredienti:
             if self.required_checkboxes[ingr].isChecked():
                 required_ingredients.append(ingredienti.index(ingr))
@@ -721,20 +851,144 @@ class MainWindow(QMainWindow):
         for param in self.parameters:
             slider = self.sliders[param]
             ranges[param] = (slider.low(), slider.high())
+        return required_ingredients, ranges, unlocked_ingredients
+
+    def schedule_feasibility(self):
+        # Ogni cambio riavvia l'attesa: l'anteprima parte solo quando i cambi si fermano
+        self.feasibility_timer.start()
+
+    def update_feasibility(self):
+        # Un solo calcolo alla volta: i cambi arrivati nel frattempo vengono ripresi alla fine
+        if self.feasibility_worker is not None:
+            self.feasibility_pending = True
+            return
+        self.feasibility_worker = FeasibilityWorker(*self.current_selection())
+        self.feasibility_worker.finished.connect(self.on_feasibility_ready)
+        self.feasibility_worker.start()
+
+    def on_feasibility_ready(self, preview):
+        self.feasibility_worker.wait()
+        self.feasibility_worker.deleteLater()
+        self.feasibility_worker = None
+        if self.feasibility_pending:
+            self.feasibility_pending = False
+            self.update_feasibility()
+            return
 
-        self.worker = CalculationWorker(required_ingredients, ranges, unlocked_ingredients)
+        for param in self.parameters:
+            self.sliders[param].setReachable(preview['reachable'][param])
+            interval = preview['intervals'][param]
+            self.reach_labels[param].setText(f"raggiungibile {interval[0]:.1f} - {interval[1]:.1f}"
+                                             if interval is not None else "non raggiungibile")
+        if preview['recipes'] == 0:
+            text = "❌ Nessuna ricetta possibile con gli ingredienti obbligatori selezionati"
+        elif preview['infeasible']:
+            unreachable = [param.capitalize() for param in self.parameters if preview['in_range'][param] == 0]
+            text = (f"❌ Nessuna delle {preview['recipes']:,} ricette possibili rispetta il range di "
+                    f"{', '.join(unreachable)}")
+        else:
+            text = (f"Ricette possibili: {preview['recipes']:,}, "
+                    f"nei range al più {preview['max_feasible']:,}")
+        self.feasibility_label.setText(text)
+
+    def compute_combination(self):
+        self.start_calculation("score")
+
+    def compute_frontier(self):
+        self.start_calculation("pareto")
+
+    def update_pareto_button(self):
+        # La frontiera visita tutte le ricette valide: oltre PARETO_MAX_INGREDIENTS ingredienti
+        # la ricerca durerebbe minuti, quindi il pulsante viene disattivato
+        available = len(self.current_selection()[2]) <= PARETO_MAX_INGREDIENTS
+        self.pareto_button.setEnabled(available and self.worker is None)
+        self.pareto_button.setToolTip("" if available else
+                                      f"La frontiera è disponibile con al massimo {PARETO_MAX_INGREDIENTS} "
+                                      f"ingredienti sbloccati (compresi quelli sempre disponibili)")
+
+    def start_calculation(self, objective):
+        self.finish_startup()
+        self.compute_button.setEnabled(False)
+        self.pareto_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.frontier_list.hide()
+        self.frontier_list.clear()
+        self.frontier = []
+        self.result_text.clear()
+        self.loading_widget.show()
+        self.spinner.start()
+
+        required_ingredients, ranges, unlocked_ingredients = self.current_selection()
+
+        self.worker = CalculationWorker(required_ingredients, ranges, unlocked_ingredients,
+                                        self.solver_pool, self.result_cache, self.incremental_state, objective)
         self.worker.finished.connect(self.on_calculation_complete)
+        self.worker.progress.connect(self.on_progress)
         self.worker.start()
 
+    def cancel_computation(self):
+        if self.worker is not None:
+            self.cancel_button.setEnabled(False)
+            self.loading_label.setText("Annullamento in corso...")
+            self.worker.cancel()
+
+    def on_progress(self, info):
+        # Se il calcolo è già terminato il messaggio è in ritardo: il risultato finale resta
+        if self.worker is None:
+            return
+        # Le righe vuote iniziali lasciano spazio all'indicatore di caricamento sovrapposto
+        progress_text = "\n\n\n"
+        progress_text += f"Avanzamento: {info['progress'] * 100:.0f}%"
+        if info['eta'] is not None:
+            progress_text += f" (tempo stimato rimanente: {info['eta']:.0f} secondi)"
+        progress_text += "\n"
+        progress_text += f"Combinazioni esaminate: {info['examined']:,} ({info['rate']:,.0f} al secondo)\n"
+        progress_text += f"Chunk completati: {info['completed_chunks']}/{info['num_chunks']}\n"
+
+        if info['best_quantities'] is not None:
+            progress_text += f"\nMigliore combinazione trovata finora (score {info['best_score']:.2f}):\n"
+            progress_text += "-" * 30 + "\n"
+            for ingr, qty in zip(ingredienti, info['best_quantities']):
+                if qty > 0:
+                    progress_text += f"{ingr}: {qty} unità\n"
+            if info.get('gap') is not None:
+                progress_text += f"\nDistanza dallo score massimo teorico ({info['upper_bound']:.2f}): {info['gap']:.2f}\n"
+        self.result_text.setPlainText(progress_text)
+
     def on_calculation_complete(self, result):
         self.spinner.stop()
         self.loading_widget.hide()
+        self.cancel_button.setEnabled(False)
+        self.loading_label.setText("Ricerca in corso...\nAttendi mentre calcolo la combinazione ottimale...")
     
         quantities, values, stats = result
+
+        if quantities and self.worker.objective == "pareto":
+            self.show_frontier(stats)
+            self.compute_button.setEnabled(True)
+            self.worker.deleteLater()
+            self.worker = None
+            self.update_pareto_button()
+            return
     
         if quantities:
-            result_text = "✅ Combinazione ottimale trovata!\n\n"
-            result_text += f"⏱️ Tempo impiegato: {stats['execution_time']:.2f} secondi\n\n"
+            if stats['cancelled']:
+                result_text = "⚠️ Ricerca annullata: migliore combinazione trovata finora\n"
+                if stats.get('gap') is not None:
+                    result_text += (f"📏 Distanza dallo score massimo teorico "
+                                    f"({stats['upper_bound']:.2f}): {stats['gap']:.2f}\n")
+                result_text += "\n"
+            else:
+                result_text = "✅ Combinazione ottimale trovata!\n\n"
+            result_text += f"⏱️ Tempo impiegato: {stats['execution_time']:.2f} secondi\n"
+            if stats.get('cache_hit'):
+                result_text += (f"💾 Risultato dalla cache (calcolo originale: "
+                                f"{stats['cached_execution_time']:.2f} secondi)\n")
+            elif stats.get('incremental') in ("filter", "delta"):
+                result_text += "♻️ Ricalcolo incrementale a partire dalla ricerca precedente\n"
+            if not stats['pool_warm']:
+                result_text += f"⏱️ Avvio dei processi di calcolo: {stats['pool_startup_time']:.2f} secondi\n"
+            result_text += "\n"
         
             result_text += "Ingredienti da utilizzare:\n"
             result_text += "-" * 30 + "\n"
@@ -746,6 +1000,15 @@ class MainWindow(QMainWindow):
             result_text += "-" * 30 + "\n"
             for key, val in values.items():
                 result_text += f"{key.capitalize()}: {val:.1f}\n"
+
+            alternatives = stats.get('top_combinations', [])[1:]
+            if alternatives:
+                result_text += "\nAlternative:\n"
+                result_text += "-" * 30 + "\n"
+                for rank, entry in enumerate(alternatives, start=2):
+                    recipe = ", ".join(f"{ingr} {qty}" for ingr, qty in zip(ingredienti, entry['quantities']) if qty > 0)
+                    virtues = ", ".join(f"{key.capitalize()} {val:.1f}" for key, val in entry['values'].items())
+                    result_text += f"{rank}. Score {entry['score']:.2f}: {recipe}\n   ({virtues})\n"
         
             result_text += "\nStatistiche della ricerca:\n"
             result_text += "-" * 30 + "\n"
@@ -755,9 +1018,14 @@ class MainWindow(QMainWindow):
             result_text += f"Scartate per ingredienti obbligatori: {stats['skipped_required']:,}\n"
             result_text += f"Scartate per valori fuori range: {stats['skipped_range']:,}\n"
             result_text += f"Combinazioni valide: {stats['valid_combinations']:,}\n"
+        elif stats['cancelled']:
+            result_text = "⚠️ Ricerca annullata prima di trovare una combinazione valida.\n\n"
+            result_text += f"⏱️ Tempo di ricerca: {stats['execution_time']:.2f} secondi\n"
         else:
             result_text = "❌ Nessuna combinazione valida trovata!\n\n"
             result_text += f"⏱️ Tempo di ricerca: {stats['execution_time']:.2f} secondi\n"
+            if stats.get('cache_hit'):
+                result_text += "💾 Risultato dalla cache\n"
             result_text += "Possibili cause:\n"
             result_text += "-" * 30 + "\n"
             result_text += "• Range dei valori troppo restrittivo\n"
@@ -785,32 +1053,71 @@ class MainWindow(QMainWindow):
         self.result_text.setPlainText(result_text)
         self.compute_button.setEnabled(True)
         self.worker.deleteLater()
+        self.worker = None
+        self.update_pareto_button()
+
+    def show_frontier(self, stats):
+        # Una riga per ricetta non dominata, dallo score più alto; la prima viene selezionata
+        self.frontier = stats['pareto_frontier']
+        self.frontier_header = ""
+        if stats['cancelled']:
+            self.frontier_header += "⚠️ Ricerca annullata: frontiera parziale\n"
+        self.frontier_header += (f"📈 Frontiera di Pareto: {len(self.frontier):,} ricette non dominate "
+                                 f"su {stats['valid_combinations']:,} valide "
+                                 f"({stats['execution_time']:.2f} secondi)\n\n")
+        for entry in self.frontier:
+            self.frontier_list.addItem(f"Score {entry['score']:.2f} · Costo {entry['cost']:g} · "
+                                       f"Gourmet {entry['gourmet']:g} · Tratti {entry['trait_chance']:g}")
+        self.frontier_list.show()
+        self.frontier_list.setCurrentRow(0)
+
+    def show_frontier_entry(self, row):
+        if not 0 <= row < len(self.frontier):
+            return
+        entry = self.frontier[row]
+        result_text = self.frontier_header
+        result_text += f"Ricetta {row + 1} della frontiera:\n"
+        result_text += f"Score {entry['score']:.2f}, costo {entry['cost']:g}, "
+        result_text += f"bonus gourmet {entry['gourmet']:g}, probabilità tratti {entry['trait_chance']:g}\n\n"
+        result_text += "Ingredienti da utilizzare:\n"
+        result_text += "-" * 30 + "\n"
+        for ingr, qty in zip(ingredienti, entry['quantities']):
+            if qty > 0:
+                result_text += f"{ingr}: {qty} unità\n"
+        result_text += "\nValori ottenuti:\n"
+        result_text += "-" * 30 + "\n"
+        for key, val in entry['values'].items():
+            result_text += f"{key.capitalize()}: {val:.1f}\n"
+        self.result_text.setPlainText(result_text)
+
+    def closeEvent(self, event):
+        # Una ricerca in corso viene annullata e attesa prima di chiudere i processi:
+        # il thread di calcolo non deve sopravvivere alla finestra
+        self.feasibility_timer.stop()
+        if self.feasibility_worker is not None:
+            self.feasibility_worker.wait()
+        if self.worker is not None and self.worker.isRunning():
+            self.cancel_computation()
+            self.worker.wait()
+        if self.solver_pool is not None:
+            self.solver_pool.shutdown()
+            self.result_cache.close()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
+    # Log della ricerca disattivato di default; ad esempio CALCULATOR_LOG_LEVEL=TRACE
+    # riporta anche i miglioramenti del best trovati dai worker
+    if os.environ.get("CALCULATOR_LOG_LEVEL"):
+        configure_logging(os.environ["CALCULATOR_LOG_LEVEL"])
+
     app = QApplication(sys.argv)
-    
-    font_id = QFontDatabase.addApplicationFont("fonts/Alegreya-Regular.ttf")
-    font_id_bold = QFontDatabase.addApplicationFont("fonts/Alegreya-Bold.ttf")
-    
-    if font_id == -1 or font_id_bold == -1:
-        print("Warning: Could not load Alegreya font. Falling back to system font.")
-    
-    global_font = QFont("Alegreya", 12)
-    global_font.setBold(True)
-    app.setFont(global_font)
-    
-    app.setStyleSheet("""
-        * {
-            font-family: Alegreya;
-            font-weight: bold;
-        }
-        QLabel {
-            background: none;
-            background-color: transparent;
-        }
-    """)
-    
+    setup_application(app)
+
     window = MainWindow()
+    # Con CALCULATOR_STARTUP_TIMES i tempi di avvio vengono stampati appena la finestra è pronta
+    if os.environ.get("CALCULATOR_STARTUP_TIMES"):
+        window.startupFinished.connect(
+            lambda times: print(", ".join(f"{name} {seconds:.3f} s" for name, seconds in times.items())))
     window.show()
     sys.exit(app.exec())
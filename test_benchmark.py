@@ -0,0 +1,29 @@
+"""
+Test dei benchmark: le misure vengono eseguite in piccolo e confrontate con le soglie
+attese, così una regressione fa fallire la suite invece di comparire solo nei numeri stampati.
+"""
+
+import pickle
+
+import pytest
+
+from benchmark import benchmark_recipe_memory, benchmark_startup, random_recipes
+from calculator import PackedRecipe
+
+def test_packed_recipe_round_trip():
+    for quantities in random_recipes(1000, seed=1):
+        packed = PackedRecipe.from_quantities(quantities)
+        assert list(packed) == quantities
+        assert pickle.loads(pickle.dumps(packed)) == packed
+
+def test_packed_recipe_memory():
+    measures = benchmark_recipe_memory(2000)
+    # Una lista di 32 quantità occupa circa 4 volte una PackedRecipe
+    assert measures["packed"] * 3 <= measures["list"]
+    assert measures["packed_pickle"] < measures["list_pickle"]
+
+def test_startup_within_budget():
+    # L'avvio viene misurato in un processo separato con QT_QPA_PLATFORM=offscreen
+    pytest.importorskip("PySide6")
+    _, within_budget = benchmark_startup(repetitions=1)
+    assert within_budget
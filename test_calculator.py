@@ -0,0 +1,121 @@
+"""
+Test del calcolatore: le ricerche vengono eseguite sui primi prefissi dell'ordine di
+sblocco, abbastanza piccoli da poter essere confrontati con una ricerca esaustiva.
+"""
+
+import itertools
+
+import pytest
+
+from calculator import (IncrementalState, MAX_QUANTITY, MAX_TOTAL_UNITS, SCORE_TOLERANCE, SolverPool,
+                        build_index_files, calculate_score, calculate_values, find_optimal_combination,
+                        ingredienti, unlock_prefix_indices, values_in_ranges)
+
+# Range larghi: quasi tutte le ricette sono valide
+WIDE_RANGES = {"gusto": (0, 30), "colore": (0, 30), "gradazione": (0, 30), "schiuma": (0, 30)}
+
+# Range stretti: poche ricette valide
+NARROW_RANGES = {"gusto": (3, 5), "colore": (0, 3), "gradazione": (3, 6), "schiuma": (4, 7)}
+
+# Range in cui, con 5 ingredienti sbloccati, le tre ricette migliori hanno lo stesso vettore
+# di valori, e range più larghi che li contengono
+TIED_RANGES = {"gusto": (3, 4), "colore": (0, 1), "gradazione": (1, 2), "schiuma": (0, 1)}
+AROUND_TIED_RANGES = {"gusto": (2, 5), "colore": (-1, 2), "gradazione": (0, 3), "schiuma": (0, 2)}
+TIED_UNLOCKED = 5
+
+@pytest.fixture(scope="module")
+def pool():
+    with SolverPool(1) as solver_pool:
+        yield solver_pool
+
+def brute_force_top(usable, ranges, top_k):
+    # Tutte le ricette valide, dalla migliore: a parità di score vince l'indice più basso
+    found = []
+    for combo in itertools.product(range(MAX_QUANTITY + 1), repeat=len(usable)):
+        if sum(combo) > MAX_TOTAL_UNITS:
+            continue
+        quantities = [0] * len(ingredienti)
+        for ingr_idx, qty in zip(usable, combo):
+            quantities[ingr_idx] = qty
+        values = calculate_values(quantities)
+        if values_in_ranges(values, ranges):
+            found.append((-calculate_score(values, ranges), combo, quantities))
+    found.sort(key=lambda entry: entry[:2])
+    return [quantities for _, _, quantities in found[:top_k]]
+
+def top_quantities(stats):
+    return [list(entry["quantities"]) for entry in stats["top_combinations"]]
+
+@pytest.fixture(scope="module")
+def tied_top():
+    return brute_force_top(unlock_prefix_indices(TIED_UNLOCKED), TIED_RANGES, 5)
+
+@pytest.fixture(scope="module")
+def index_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("index"))
+    build_index_files(TIED_UNLOCKED, path)
+    return path
+
+def gui_search(ranges, unlocked, pool, incremental, index_dir):
+    # Gli stessi argomenti usati da CalculationWorker in main.py
+    return find_optimal_combination([], ranges, unlocked, strategy="index", pool=pool, top_k=5,
+                                    incremental=incremental, index_dir=index_dir)
+
+def test_gui_search_keeps_score_pruning(pool, tmp_path):
+    # Con range larghi le candidate non possono essere conservate: la ricerca completa
+    # usa la strategia richiesta (senza indice, "anytime") e non la "delta"
+    incremental = IncrementalState(max_recipes=1000)
+    _, _, stats = gui_search(WIDE_RANGES, unlock_prefix_indices(4), pool, incremental, str(tmp_path))
+    assert stats["strategy"] != "delta"
+    assert stats["incremental"] == "full"
+    assert len(incremental) == 0
+
+def test_gui_search_retains_few_candidates(pool, tmp_path):
+    incremental = IncrementalState()
+    _, _, stats = gui_search(NARROW_RANGES, unlock_prefix_indices(4), pool, incremental, str(tmp_path))
+    assert stats["strategy"] == "delta"
+    assert len(incremental) == stats["valid_combinations"]
+    narrower = dict(NARROW_RANGES, gusto=(4, 5))
+    _, _, stats = gui_search(narrower, unlock_prefix_indices(4), pool, incremental, str(tmp_path))
+    assert stats["incremental"] == "filter"
+
+def test_index_top_k_keeps_ties(tied_top, index_dir):
+    _, _, stats = find_optimal_combination([], TIED_RANGES, unlock_prefix_indices(TIED_UNLOCKED),
+                                           strategy="index", top_k=5, index_dir=index_dir)
+    assert stats["strategy"] == "index"
+    assert top_quantities(stats) == tied_top
+
+@pytest.mark.parametrize("with_index", [True, False])
+def test_filter_top_k_keeps_ties(pool, tmp_path, tied_top, index_dir, with_index):
+    # Le candidate vengono raccolte dall'indice oppure dalla ricerca "delta"
+    search_dir = index_dir if with_index else str(tmp_path)
+    incremental = IncrementalState()
+    gui_search(AROUND_TIED_RANGES, unlock_prefix_indices(TIED_UNLOCKED), pool, incremental, search_dir)
+    _, _, stats = gui_search(TIED_RANGES, unlock_prefix_indices(TIED_UNLOCKED), pool, incremental, search_dir)
+    assert stats["incremental"] == "filter"
+    assert top_quantities(stats) == tied_top
+
+def test_cancel_after_search_does_not_stop_next(pool):
+    # Un annullamento richiesto a ricerca finita (ad esempio durante l'unione dei risultati)
+    # non ha effetto; un annullamento rimasto attivo viene azzerato all'inizio della ricerca
+    find_optimal_combination([], WIDE_RANGES, unlock_prefix_indices(4), strategy="anytime", pool=pool)
+    pool.cancel_search()
+    assert not pool.cancel_requested()
+    pool.cancel()
+    _, _, stats = find_optimal_combination([], WIDE_RANGES, unlock_prefix_indices(4), strategy="anytime", pool=pool)
+    assert not stats.get("cancelled")
+
+def test_calculate_score_low_tolerance():
+    # Un valore fino a SCORE_TOLERANCE sotto il lower bound è nel range, uno oltre no
+    values = {"gusto": 4.0, "colore": 1.0, "gradazione": 1.5, "schiuma": 0.5}
+    assert calculate_score(dict(values, gusto=3 - SCORE_TOLERANCE + 0.01), TIED_RANGES) > 0
+    assert values_in_ranges(dict(values, gusto=3 - SCORE_TOLERANCE + 0.01), TIED_RANGES)
+    assert calculate_score(dict(values, gusto=3 - SCORE_TOLERANCE - 0.01), TIED_RANGES) < 0
+    assert not values_in_ranges(dict(values, gusto=3 - SCORE_TOLERANCE - 0.01), TIED_RANGES)
+
+def test_exact_best_breaks_ties_by_index(tied_top):
+    # A parità di score vince la ricetta con indice più basso anche nel solver esatto
+    quantities, _, stats = find_optimal_combination([], TIED_RANGES, unlock_prefix_indices(TIED_UNLOCKED),
+                                                    strategy="exact")
+    assert stats["strategy"] == "exact"
+    assert list(quantities) == tied_top[0]